@@ -9,8 +9,6 @@ Current adaptor classes are:
 import logging
 from collections import OrderedDict
 
-from tpot import TPOTClassifier, TPOTRegressor
-
 from automatminer.automl.config.tpot_configs import (
     TPOT_CLASSIFIER_CONFIG,
     TPOT_REGRESSOR_CONFIG,
@@ -18,7 +16,7 @@ from automatminer.automl.config.tpot_configs import (
 from automatminer.utils.pkg import set_fitted, check_fitted
 from automatminer.utils.ml import is_greater_better, regression_or_classification
 from automatminer.utils.log import log_progress, AMM_LOG_FIT_STR
-from automatminer.utils.ml import AMM_CLF_NAME, AMM_REG_NAME
+from automatminer.utils.ml import AMM_CLF_NAME, AMM_REG_NAME, to_matrix
 from automatminer.automl.base import DFMLAdaptor
 
 __authors__ = [
@@ -101,9 +99,12 @@ class TPOTAdaptor(DFMLAdaptor):
             TPOTAdaptor (self)
 
         """
+        # TPOT is slow to import, so it is only imported when needed
+        from tpot import TPOTClassifier, TPOTRegressor
+
         # Prevent goofy pandas casting by casting to native
         y = df[target].values
-        X = df.drop(columns=target).values
+        X = to_matrix(df.drop(columns=target), sparse=self.accepts_sparse)
 
         # Determine learning type based on whether classification or regression
         self.mode = regression_or_classification(df[target])
@@ -284,6 +285,12 @@ class SinglePipelineAdaptor(DFMLAdaptor):
             not need to be a BaseEstimator or Pipeline.
         classifier (sklearn Pipeline or BaseEstimator-like): The object you want
             to use for machine learning classification.
+        accepts_sparse (bool): Whether the regressor and classifier accept
+            sparse (scipy CSR) feature matrices, like most sklearn tree
+            ensembles and XGBoost. If True, sparse features (see
+            AutoFeaturizer's sparse_features argument) are passed to them
+            without being densified. False by default, as many estimators
+            (and pipelines, e.g., with a StandardScaler) do not.
 
     Attributes:
         The following unique attributes are set during fitting.
@@ -292,8 +299,9 @@ class SinglePipelineAdaptor(DFMLAdaptor):
             (classification)
     """
 
-    def __init__(self, regressor, classifier):
+    def __init__(self, regressor, classifier, accepts_sparse=False):
         self.mode = None
+        self.accepts_sparse = accepts_sparse
         self._regressor = regressor
         self._classifier = classifier
         self._features = None
@@ -319,7 +327,7 @@ class SinglePipelineAdaptor(DFMLAdaptor):
 
         # Prevent goofy pandas casting by casting to native
         y = df[target].values.tolist()
-        X = df.drop(columns=target).values.tolist()
+        X = to_matrix(df.drop(columns=target), sparse=self.accepts_sparse)
         self._features = df.drop(columns=target).columns.tolist()
         self._fitted_target = target
         self._best_pipeline.fit(X, y)
@@ -10,6 +10,7 @@ import numpy as np
 import pandas as pd
 from automatminer.base import DFTransformer
 from automatminer.utils.log import AMM_LOG_PREDICT_STR, log_progress
+from automatminer.utils.ml import to_matrix
 from automatminer.utils.pkg import AutomatminerError, check_fitted
 
 logger = logging.getLogger(__name__)
@@ -24,6 +25,10 @@ class DFMLAdaptor(DFTransformer):
     and @set_fitted if necessary!
     """
 
+    # Whether the best pipeline accepts sparse (scipy CSR) feature matrices.
+    # If False, sparse features are densified before predicting.
+    accepts_sparse = False
+
     @property
     @abc.abstractmethod
     def fitted_target(self) -> str:
@@ -147,7 +152,8 @@ class DFMLAdaptor(DFTransformer):
                 "".format(not_in_df, not_in_model)
             )
         else:
-            X = df[self.features].values  # rectify feature order
+            # rectify feature order
+            X = to_matrix(df[self.features], sparse=self.accepts_sparse)
             y_pred = self.best_pipeline.predict(X)
             df[output_col or (target + " predicted")] = y_pred
 
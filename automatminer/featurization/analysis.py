@@ -0,0 +1,445 @@
+"""
+Caches of structure analyses shared by all the featurizers applied to a
+structure.
+
+Many structure featurizers compute the same neighbor lists and local
+environments (e.g., Voronoi tessellations and CrystalNN neighbors) of a
+structure independently. While a NeighborCache is active for a structure, the
+results of these analyses are memoized, so they are computed once per
+structure and reused by every featurizer.
+
+Similarly, several structure featurizers (e.g., GlobalSymmetryFeatures,
+GlobalInstabilityIndex and StructuralComplexity) run their own spglib symmetry
+analysis of a structure. While a SymmetryCache is active, these featurizers
+share one SpacegroupAnalyzer per structure and symmetry tolerance.
+
+The analysis methods (and the SpacegroupAnalyzer of the matminer structure
+featurizers) are only replaced while a cache is active, and are restored when
+it exits.
+"""
+
+import os
+import json
+import pickle
+import hashlib
+import logging
+import tempfile
+import functools
+import importlib
+from collections import OrderedDict
+
+from pymatgen import Structure
+
+from automatminer.featurization.cache import _stable_repr
+
+__author__ = ["Alex Dunn <ardunn@lbl.gov>"]
+
+logger = logging.getLogger(__name__)
+
+# The (module, class, method) of the analyses memoized while a NeighborCache
+# is active. The first argument of each method (or self, for Structure
+# methods) is the structure being analyzed.
+AMM_CACHED_ANALYSES = [
+    ("pymatgen.analysis.local_env", "VoronoiNN", "get_voronoi_polyhedra"),
+    ("pymatgen.analysis.local_env", "VoronoiNN", "get_all_voronoi_polyhedra"),
+    ("pymatgen.analysis.local_env", "VoronoiNN", "get_nn_info"),
+    ("pymatgen.analysis.local_env", "VoronoiNN", "get_all_nn_info"),
+    ("pymatgen.analysis.local_env", "CrystalNN", "get_nn_info"),
+    ("pymatgen.analysis.local_env", "CrystalNN", "get_nn_data"),
+    ("pymatgen.core.structure", "Structure", "get_all_neighbors"),
+]
+
+# The maximum number of symmetry analyses held in memory by a SymmetryCache
+AMM_SYMMETRY_CACHE_SIZE = 1000
+
+# The NeighborCache and SymmetryCache active in this process, if any
+_ACTIVE = None
+_ACTIVE_SYMMETRY = None
+
+# The (owner, name, original) of each patched attribute, and the number of
+# active caches using the patches, keyed by patch set
+_PATCHED = {}
+_PATCH_COUNTS = {}
+_MISSING = object()
+
+
+class NeighborCache:
+    """
+    A memo of neighbor analyses of a single structure at a time, optionally
+    backed by an on-disk store.
+
+    Use activate as a context manager around all featurizers applied to a
+    structure:
+
+        cache = NeighborCache()
+        with cache.activate(structure):
+            rows = [f.featurize(structure) for f in featurizers]
+
+    Args:
+        store_dir (str): If set, a directory in which the analyses of each
+            structure are saved, so they are reused by later featurizations
+            of the same structure (in any process).
+
+    Attributes:
+        hits (int): The number of analyses reused.
+        misses (int): The number of analyses computed.
+    """
+
+    def __init__(self, store_dir=None):
+        self.store_dir = store_dir
+        self.hits = 0
+        self.misses = 0
+        self._structure = None
+        self._structure_key = None
+        self._results = {}
+        self._modified = False
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        state["_structure"] = None
+        state["_results"] = {}
+        return state
+
+    def activate(self, structure):
+        """
+        Memoize the analyses of a structure until the returned context exits.
+
+        Args:
+            structure (Structure): The structure. Entries which are not
+                structures are allowed, but nothing is memoized for them.
+
+        Returns:
+            (NeighborCache): self, as a context manager.
+        """
+        self._structure = structure if isinstance(structure, Structure) else None
+        self._structure_key = None
+        self._results = {}
+        self._modified = False
+        if self._structure is not None and self.store_dir:
+            self._load()
+        return self
+
+    def __enter__(self):
+        global _ACTIVE
+        _patch("neighbors", _neighbor_patches)
+        _ACTIVE = self
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        global _ACTIVE
+        _ACTIVE = None
+        _unpatch("neighbors")
+        if self._modified and self.store_dir:
+            self._dump()
+        self._structure = None
+        self._results = {}
+
+    def _get_or_compute(self, method, owner, args, kwargs):
+        """
+        Get a memoized analysis, or compute and memoize it.
+        """
+        if self._is_structure(owner):
+            owner_repr, call_args = None, args
+        elif args and self._is_structure(args[0]):
+            owner_repr, call_args = _owner_repr(owner), args[1:]
+        else:
+            return method(owner, *args, **kwargs)
+
+        key = [owner_repr, method.__name__, _stable_repr(call_args)]
+        key = json.dumps(key + [_stable_repr(kwargs)], sort_keys=True, default=str)
+        if key in self._results:
+            self.hits += 1
+        else:
+            self.misses += 1
+            self._results[key] = method(owner, *args, **kwargs)
+            self._modified = True
+        return _copy_containers(self._results[key])
+
+    def _is_structure(self, obj):
+        """
+        Whether an object is the active structure, or a structure with the
+        same lattice, sites (in the same order) and site properties.
+        """
+        if obj is self._structure:
+            return True
+        elif isinstance(obj, Structure) and len(obj) == len(self._structure):
+            return _structure_key(obj) == self._get_structure_key()
+        return False
+
+    def _get_structure_key(self):
+        if self._structure_key is None:
+            self._structure_key = _structure_key(self._structure)
+        return self._structure_key
+
+    def _store_path(self):
+        return os.path.join(self.store_dir, self._get_structure_key() + ".pkl")
+
+    def _load(self):
+        results = _load_pickle(self._store_path())
+        if results is not None:
+            self._results = results
+
+    def _dump(self):
+        _dump_pickle(self._results, self.store_dir, self._store_path())
+
+
+class SymmetryCache:
+    """
+    A memo of the symmetry analyses of structures, optionally backed by an
+    on-disk store.
+
+    While active, the matminer structure featurizers constructing a
+    SpacegroupAnalyzer get a memoized analyzer, keyed on the structure and
+    its symprec and angle_tolerance, instead of running spglib again. Unlike
+    a NeighborCache, analyses are kept (up to maxsize) after the context
+    exits, so a cache shared by a FeaturizerPool lives for an entire
+    fit/transform.
+
+        cache = SymmetryCache()
+        with cache.activate():
+            rows = [f.featurize(structure) for f in featurizers]
+
+    Args:
+        maxsize (int): The maximum number of analyses held in memory. The
+            least recently used analyses are discarded first.
+        store_dir (str): If set, a directory in which the analyses are saved,
+            so they are reused by later fits/transforms (in any process).
+
+    Attributes:
+        hits (int): The number of analyses reused.
+        misses (int): The number of analyses computed.
+    """
+
+    def __init__(self, maxsize=AMM_SYMMETRY_CACHE_SIZE, store_dir=None):
+        self.maxsize = maxsize
+        self.store_dir = store_dir
+        self.hits = 0
+        self.misses = 0
+        self._analyzers = OrderedDict()
+
+    def __len__(self):
+        return len(self._analyzers)
+
+    def activate(self, structure=None):
+        """
+        Memoize symmetry analyses until the returned context exits.
+
+        Args:
+            structure (Structure): Unused, as all structures are memoized.
+                Accepted so a SymmetryCache can be activated per entry like a
+                NeighborCache.
+
+        Returns:
+            (SymmetryCache): self, as a context manager.
+        """
+        return self
+
+    def __enter__(self):
+        global _ACTIVE_SYMMETRY
+        _patch("symmetry", _symmetry_patches)
+        _ACTIVE_SYMMETRY = self
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        global _ACTIVE_SYMMETRY
+        _ACTIVE_SYMMETRY = None
+        _unpatch("symmetry")
+
+    def get_analyzer(self, structure, symprec=0.01, angle_tolerance=5.0):
+        """
+        Get the memoized symmetry analysis of a structure, or compute and
+        memoize it.
+
+        Args:
+            structure (Structure): The structure.
+            symprec (float): The spglib distance tolerance.
+            angle_tolerance (float): The spglib angle tolerance.
+
+        Returns:
+            (SpacegroupAnalyzer): The analyzer of the structure.
+        """
+        key = (_structure_key(structure), float(symprec), float(angle_tolerance))
+        if key in self._analyzers:
+            self.hits += 1
+            self._analyzers.move_to_end(key)
+            return self._analyzers[key]
+
+        path = None
+        if self.store_dir:
+            name = hashlib.sha1(json.dumps(key).encode("utf-8")).hexdigest()
+            path = os.path.join(self.store_dir, name + ".pkl")
+        analyzer = _load_pickle(path) if path else None
+        if analyzer is not None:
+            self.hits += 1
+        else:
+            from pymatgen.symmetry.analyzer import SpacegroupAnalyzer
+
+            self.misses += 1
+            analyzer = SpacegroupAnalyzer(
+                structure, symprec=symprec, angle_tolerance=angle_tolerance
+            )
+            if path:
+                _dump_pickle(analyzer, self.store_dir, path)
+
+        self._analyzers[key] = analyzer
+        while len(self._analyzers) > self.maxsize:
+            self._analyzers.popitem(last=False)
+        return analyzer
+
+
+def _structure_key(structure):
+    """
+    Get an order-sensitive hash of the exact lattice, sites and site
+    properties of a structure, as analyses refer to sites by index.
+    """
+    h = hashlib.sha1(structure.lattice.matrix.tobytes())
+    h.update(structure.frac_coords.tobytes())
+    species = [site.species_string for site in structure]
+    h.update(json.dumps(species).encode("utf-8"))
+    if structure.site_properties:
+        h.update(_stable_repr(structure.site_properties).encode("utf-8"))
+    return h.hexdigest()
+
+
+def _load_pickle(path):
+    """
+    Load a saved analysis; None if it does not exist or cannot be loaded.
+    """
+    if os.path.exists(path):
+        try:
+            with open(path, "rb") as f:
+                return pickle.load(f)
+        except Exception as e:
+            logger.warning(
+                "Could not load analyses from {} due to {}.".format(path, e)
+            )
+    return None
+
+
+def _dump_pickle(obj, store_dir, path):
+    """
+    Save an analysis atomically, so concurrent workers never read partially
+    written files.
+    """
+    os.makedirs(store_dir, exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=store_dir)
+    try:
+        with os.fdopen(fd, "wb") as f:
+            pickle.dump(obj, f)
+        os.replace(tmp_path, path)
+    except BaseException:
+        os.remove(tmp_path)
+        raise
+
+
+def _owner_repr(owner):
+    """
+    A representation of a near neighbor method and its parameters.
+    """
+    return [owner.__class__.__name__, _stable_repr(vars(owner))]
+
+
+def _copy_containers(result):
+    """
+    Copy the lists and dicts of an analysis, so featurizers modifying them in
+    place do not modify the memoized analysis. Sites are not copied.
+    """
+    if isinstance(result, list):
+        return [_copy_containers(r) for r in result]
+    elif isinstance(result, dict):
+        return {k: _copy_containers(v) for k, v in result.items()}
+    return result
+
+
+def _memoized(method):
+    """
+    Wrap an analysis method so it uses the active NeighborCache, if any.
+    """
+
+    @functools.wraps(method)
+    def wrapper(owner, *args, **kwargs):
+        if _ACTIVE is None or _ACTIVE._structure is None:
+            return method(owner, *args, **kwargs)
+        return _ACTIVE._get_or_compute(method, owner, args, kwargs)
+
+    wrapper._amm_original = method
+    return wrapper
+
+
+def _spacegroup_analyzer(structure, symprec=0.01, angle_tolerance=5.0):
+    """
+    Replaces SpacegroupAnalyzer in the matminer structure featurizers, getting
+    analyzers from the active SymmetryCache, if any.
+    """
+    from pymatgen.symmetry.analyzer import SpacegroupAnalyzer
+
+    if _ACTIVE_SYMMETRY is None or not isinstance(structure, Structure):
+        return SpacegroupAnalyzer(
+            structure, symprec=symprec, angle_tolerance=angle_tolerance
+        )
+    return _ACTIVE_SYMMETRY.get_analyzer(structure, symprec, angle_tolerance)
+
+
+def _neighbor_patches():
+    """
+    Get the wrapped analysis methods in AMM_CACHED_ANALYSES, as (owner, name,
+    wrapper) tuples.
+    """
+    patches = []
+    for module_name, cls_name, name in AMM_CACHED_ANALYSES:
+        cls = getattr(importlib.import_module(module_name), cls_name)
+        patches.append((cls, name, _memoized(getattr(cls, name))))
+    return patches
+
+
+def _patch(key, get_patches):
+    """
+    Patch attributes (e.g., analysis methods) until _unpatch is called as many
+    times as _patch, so nested caches share the patches.
+
+    Args:
+        key (str): The name of the patch set.
+        get_patches (callable): A function getting the patches, as (owner,
+            name, replacement) tuples.
+
+    Returns:
+        None
+    """
+    count = _PATCH_COUNTS.get(key, 0)
+    _PATCH_COUNTS[key] = count + 1
+    if count:
+        return
+    patched = []
+    for owner, name, replacement in get_patches():
+        patched.append((owner, name, vars(owner).get(name, _MISSING)))
+        setattr(owner, name, replacement)
+    _PATCHED[key] = patched
+
+
+def _unpatch(key):
+    """
+    Restore the attributes patched by _patch, once no cache uses them.
+
+    Args:
+        key (str): The name of the patch set.
+
+    Returns:
+        None
+    """
+    _PATCH_COUNTS[key] -= 1
+    if _PATCH_COUNTS[key]:
+        return
+    for owner, name, original in reversed(_PATCHED.pop(key)):
+        if original is _MISSING:
+            delattr(owner, name)
+        else:
+            setattr(owner, name, original)
+
+
+def _symmetry_patches():
+    """
+    Get the replacement of the SpacegroupAnalyzer used by the matminer
+    structure featurizers, as an (owner, name, replacement) tuple.
+    """
+    structure_featurizers = importlib.import_module("matminer.featurizers.structure")
+    return [(structure_featurizers, "SpacegroupAnalyzer", _spacegroup_analyzer)]
@@ -3,10 +3,44 @@ Base classes for sets of featurizers.
 """
 
 import abc
+import copy
+import functools
 from typing import List
 
 __authors__ = ["Alex Dunn <ardunn@lbl.gov>", "Alex Ganose <aganose@lbl.gov>"]
 
+# The featurizers of each featurizer set, constructed once per process. Keyed
+# by (FeaturizerSet class, set name).
+_PROTOTYPES = {}
+
+
+def memoized_set(func):
+    """
+    Decorator turning a method returning a list of featurizers into a
+    featurizer set property whose featurizers are constructed only once per
+    process (e.g., ElementProperty.from_preset loads data tables from disk).
+
+    Each access returns fresh copies of the featurizers, so featurizers fit
+    or modified by one user of a set do not affect other users, minus the
+    featurizers in exclude.
+
+    Args:
+        func (callable): The method constructing the set, which should not
+            apply exclude itself.
+
+    Returns:
+        (property): The featurizer set property.
+    """
+
+    @functools.wraps(func)
+    def wrapper(self):
+        key = (type(self), func.__name__)
+        if key not in _PROTOTYPES:
+            _PROTOTYPES[key] = func(type(self)())
+        return self._get_featurizers(copy.deepcopy(_PROTOTYPES[key]))
+
+    return property(wrapper)
+
 
 class FeaturizerSet(abc.ABC):
     """Abstract class for defining sets of featurizers.
@@ -21,12 +55,20 @@ class FeaturizerSet(abc.ABC):
 
     Each set returned is a list of matminer featurizer objects. The choice of
     featurizers for a given set is at the discrtetion of the implementor.
+    Sets should be defined with the memoized_set decorator, so their
+    featurizers are only constructed once per process.
+
+    The class names of all featurizers which may be in any of the sets are
+    registered in featurizer_names, so featurizers can be validated without
+    constructing the sets.
 
     Args:
         exclude (list of str, optional): A list of featurizer class names that
             will be excluded from the set of featurizers returned.
     """
 
+    featurizer_names = frozenset()
+
     def __init__(self, exclude=None):
         self.exclude = exclude if exclude else []
 
@@ -0,0 +1,580 @@
+"""
+Caching of features computed by AutoFeaturizer.
+"""
+
+import os
+import glob
+import json
+import uuid
+import pickle
+import hashlib
+import logging
+import tempfile
+
+import numpy as np
+import pandas as pd
+from matminer.utils.io import store_dataframe_as_json, load_dataframe_from_json
+
+try:
+    import pyarrow
+    import pyarrow.parquet as pq
+    import pyarrow.feather as feather
+except ImportError:
+    pyarrow, pq, feather = None, None, None
+
+from automatminer.utils.pkg import AutomatminerError
+
+__author__ = ["Alex Dunn <ardunn@lbl.gov>"]
+
+logger = logging.getLogger(__name__)
+
+# Number of decimals kept when hashing floating point data (e.g., lattice
+# vectors and fractional coordinates) of an input object.
+AMM_HASH_DECIMALS = 6
+
+# Supported formats for the cache_src of AutoFeaturizer, by file extension.
+AMM_CACHE_FORMATS = {".json": "json", ".parquet": "parquet", ".feather": "feather"}
+
+# The number of rows in each row group of parquet caches. Loading a subset of
+# the samples only decodes the row groups containing them.
+AMM_PARQUET_ROW_GROUP_SIZE = 10000
+
+# The number of shards of a featurizer in a SampleFeatureCache above which
+# they are merged into a single shard when loaded.
+AMM_SAMPLE_CACHE_MAX_SHARDS = 64
+
+
+def hash_entry(entry, decimals=AMM_HASH_DECIMALS) -> str:
+    """
+    Get a content-based hash of a featurizer input object.
+
+    Compositions are hashed on their species and amounts. Structures are hashed
+    on their lattice, and on the species, fractional coordinates and
+    properties of their sites, in order, as some featurizers (e.g.,
+    MinimumRelativeDistances) give per-site features. Compacted entries (e.g.,
+    CompactElectronicStructure) are hashed on their content hash, and other
+    MSONable objects on their dict representation; everything else is hashed
+    on its repr.
+
+    Args:
+        entry (object): The input object, e.g., a pymatgen Composition or
+            Structure.
+        decimals (int): Floats are rounded to this many decimals before
+            hashing.
+
+    Returns:
+        (str): A hex digest uniquely identifying the entry.
+    """
+    cls = entry.__class__.__name__
+    if hasattr(entry, "lattice") and hasattr(entry, "sites"):
+        matrix = np.round(entry.lattice.matrix, decimals) + 0.0
+        sites = []
+        for site in entry.sites:
+            fcoords = np.round(site.frac_coords, decimals) + 0.0
+            sites.append((site.species_string, fcoords.tolist()))
+        properties = _stable_repr(entry.site_properties)
+        representation = [matrix.tolist(), sites, properties]
+    elif hasattr(entry, "items") and hasattr(entry, "reduced_formula"):
+        representation = sorted(
+            [str(sp), round(float(amt), decimals)] for sp, amt in entry.items()
+        )
+    elif hasattr(entry, "content_hash"):
+        representation = entry.content_hash()
+    elif hasattr(entry, "as_dict"):
+        representation = entry.as_dict()
+    else:
+        representation = repr(entry)
+    digest = json.dumps([cls, representation], sort_keys=True, default=str)
+    return hashlib.sha1(digest.encode("utf-8")).hexdigest()
+
+
+def hash_featurizer(featurizer) -> str:
+    """
+    Get a hash identifying a featurizer by its class, parameters, and feature
+    labels.
+
+    Feature labels are included so that fittable featurizers fit to different
+    data (e.g., BagofBonds with different bond types) do not share features.
+
+    Args:
+        featurizer (BaseFeaturizer): A (fitted) matminer featurizer.
+
+    Returns:
+        (str): A hex digest identifying the featurizer.
+    """
+    digest = json.dumps(
+        [
+            featurizer.__class__.__name__,
+            _stable_repr(featurizer),
+            list(featurizer.feature_labels()),
+        ],
+        default=str,
+    )
+    return hashlib.sha1(digest.encode("utf-8")).hexdigest()
+
+
+def _stable_repr(obj, _seen=frozenset()):
+    """
+    A representation of an object's parameters which does not depend on memory
+    addresses, so it is stable across processes and sessions.
+
+    Args:
+        obj (object): Any object, typically a featurizer or one of its params.
+
+    Returns:
+        (str, list, dict): A json-serializable representation.
+    """
+    if isinstance(obj, (str, int, float, bool)) or obj is None:
+        return obj
+    seen = _seen | {id(obj)}
+    if isinstance(obj, (list, tuple, set)):
+        return [_stable_repr(o, seen) for o in obj]
+    elif isinstance(obj, dict):
+        return {
+            str(k): _stable_repr(v, seen) for k, v in sorted(obj.items(), key=str)
+        }
+    elif hasattr(obj, "get_params"):
+        params = obj.get_params(deep=False)
+        return [obj.__class__.__name__, _stable_repr(params, seen)]
+    elif isinstance(obj, np.ndarray):
+        return obj.tolist()
+    elif obj.__class__.__repr__ is object.__repr__:
+        # e.g., near neighbor methods, which are configured by their attributes
+        if hasattr(obj, "__dict__") and id(obj) not in _seen:
+            return [obj.__class__.__name__, _stable_repr(vars(obj), seen)]
+        return obj.__class__.__name__
+    else:
+        return repr(obj)
+
+
+class SampleFeatureCache:
+    """
+    A content-addressed, per-sample cache of featurizer outputs.
+
+    Features are keyed on the hash of the input object (see hash_entry) and
+    the hash of the featurizer (see hash_featurizer), so features computed for
+    a material in one dataset, fold, or pipeline can be reused for the same
+    material in any other, regardless of the dataframe index.
+
+    Each featurizer gets a directory in cache_dir holding shards, i.e., pickle
+    files mapping entry hashes to feature vectors. Each flush writes only the
+    new features, to a new shard with a unique name (written to a temporary
+    file, then renamed), so concurrent processes never overwrite each other's
+    features. Shards are read lazily and merged on load, and are compacted
+    into one shard once there are more than AMM_SAMPLE_CACHE_MAX_SHARDS.
+
+    Args:
+        cache_dir (str): The directory holding the cache. Created if it does
+            not exist.
+
+    Attributes:
+        hits (int): The number of samples restored from the cache.
+        misses (int): The number of samples not found in the cache.
+    """
+
+    def __init__(self, cache_dir):
+        self.cache_dir = cache_dir
+        self.hits = 0
+        self.misses = 0
+        self._features = {}
+        self._pending = {}
+        os.makedirs(cache_dir, exist_ok=True)
+
+    def lookup(self, featurizer, keys) -> dict:
+        """
+        Get the cached feature vectors of a featurizer for a set of entries.
+
+        Args:
+            featurizer (BaseFeaturizer): The featurizer.
+            keys ([str]): Entry hashes, as given by hash_entry.
+
+        Returns:
+            (dict): Mapping of entry hash to feature vector, for only those
+                entries present in the cache.
+        """
+        fkey = hash_featurizer(featurizer)
+        features = self._load(fkey)
+        found = {k: features[k] for k in set(keys) if k in features}
+        n_found = sum(k in found for k in keys)
+        self.hits += n_found
+        self.misses += len(keys) - n_found
+        return found
+
+    def update(self, featurizer, keys, rows) -> None:
+        """
+        Add feature vectors to the cache. Call flush to persist them.
+
+        Args:
+            featurizer (BaseFeaturizer): The featurizer used to compute rows.
+            keys ([str]): Entry hashes, as given by hash_entry.
+            rows ([list]): The feature vector of each entry.
+
+        Returns:
+            None
+        """
+        fkey = hash_featurizer(featurizer)
+        features = self._load(fkey)
+        pending = self._pending.setdefault(fkey, {})
+        for k, row in zip(keys, rows):
+            features[k] = row
+            pending[k] = row
+
+    def flush(self) -> None:
+        """
+        Atomically write all features added since the last flush to disk, as
+        a new shard per featurizer.
+
+        Returns:
+            None
+        """
+        for fkey, pending in self._pending.items():
+            if not pending:
+                continue
+            path = _write_shard(self._path(fkey), pending)
+            logger.debug(
+                "Wrote {} new samples to feature cache {}."
+                "".format(len(pending), path)
+            )
+        self._pending = {}
+
+    def __getstate__(self):
+        # Loaded features live on disk; don't carry them along when pickling
+        # (e.g., when saving a MatPipe).
+        state = self.__dict__.copy()
+        state["_features"] = {}
+        state["_pending"] = {}
+        return state
+
+    def _path(self, fkey):
+        return os.path.join(self.cache_dir, fkey)
+
+    def _load(self, fkey):
+        if fkey not in self._features:
+            self._features[fkey] = self._read(self._path(fkey))
+        return self._features[fkey]
+
+    @staticmethod
+    def _read(shard_dir):
+        """
+        Merge the shards of a featurizer, compacting them if there are more
+        than AMM_SAMPLE_CACHE_MAX_SHARDS.
+        """
+        paths = sorted(glob.glob(os.path.join(shard_dir, "*.pickle")))
+        features = {}
+        for path in paths:
+            try:
+                with open(path, "rb") as f:
+                    features.update(pickle.load(f))
+            except FileNotFoundError:
+                # Compacted by another process in the meantime
+                continue
+        if len(paths) > AMM_SAMPLE_CACHE_MAX_SHARDS:
+            _write_shard(shard_dir, features)
+            for path in paths:
+                try:
+                    os.remove(path)
+                except FileNotFoundError:
+                    pass
+        return features
+
+
+def _write_shard(shard_dir, features) -> str:
+    """
+    Write features to a new, uniquely named shard, atomically.
+
+    Args:
+        shard_dir (str): The directory of the shards of a featurizer.
+        features (dict): Mapping of entry hash to feature vector.
+
+    Returns:
+        (str): The path of the shard.
+    """
+    os.makedirs(shard_dir, exist_ok=True)
+    path = os.path.join(shard_dir, uuid.uuid4().hex + ".pickle")
+    fd, tmp_path = tempfile.mkstemp(dir=shard_dir, suffix=".tmp")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            pickle.dump(features, f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp_path, path)
+    except BaseException:
+        os.remove(tmp_path)
+        raise
+    return path
+
+
+class FeaturizationCheckpoint:
+    """
+    Checkpoints of the units of work of a featurization, so an interrupted
+    featurization can be resumed without repeating completed units.
+
+    A unit is the feature vectors of one featurizer on one chunk of entries.
+    Each completed unit is written atomically to its own file in
+    checkpoint_dir, named after the hashes of the featurizer and of the
+    entries in the chunk, so a restarted featurization of the same data finds
+    the units completed before the interruption.
+
+    Args:
+        checkpoint_dir (str): The directory holding the checkpoints. Created
+            if it does not exist.
+
+    Attributes:
+        restored (int): The number of units restored from checkpoints.
+        saved (int): The number of units checkpointed.
+    """
+
+    def __init__(self, checkpoint_dir):
+        self.checkpoint_dir = checkpoint_dir
+        self.restored = 0
+        self.saved = 0
+        os.makedirs(checkpoint_dir, exist_ok=True)
+
+    def load(self, fkey, keys, which):
+        """
+        Restore a checkpointed unit.
+
+        Args:
+            fkey (str): The featurizer hash, as given by hash_featurizer.
+            keys ([str]): Hashes of the entries in the chunk, as given by
+                hash_entry.
+            which ([bool]): Whether the featurizer is applied to each entry.
+
+        Returns:
+            ([list]): The feature vector of each entry (None for entries not
+                in which), or None if the unit has not been checkpointed.
+        """
+        path = self._path(fkey, keys, which)
+        if os.path.exists(path):
+            try:
+                with open(path, "rb") as f:
+                    rows = pickle.load(f)
+            except Exception as e:
+                logger.warning(
+                    "Could not load checkpoint {} due to {}. Featurizing "
+                    "again.".format(path, e)
+                )
+                return None
+            self.restored += 1
+            return rows
+        return None
+
+    def save(self, fkey, keys, which, rows) -> None:
+        """
+        Atomically checkpoint a completed unit.
+
+        Args:
+            fkey (str): The featurizer hash, as given by hash_featurizer.
+            keys ([str]): Hashes of the entries in the chunk, as given by
+                hash_entry.
+            which ([bool]): Whether the featurizer is applied to each entry.
+            rows ([list]): The feature vector of each entry.
+
+        Returns:
+            None
+        """
+        fd, tmp_path = tempfile.mkstemp(dir=self.checkpoint_dir, suffix=".tmp")
+        with os.fdopen(fd, "wb") as f:
+            pickle.dump(rows, f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp_path, self._path(fkey, keys, which))
+        self.saved += 1
+
+    def _path(self, fkey, keys, which):
+        digest = json.dumps([fkey, keys, [bool(w) for w in which]])
+        name = hashlib.sha1(digest.encode("utf-8")).hexdigest()
+        return os.path.join(self.checkpoint_dir, name + ".pickle")
+
+
+def get_cache_format(path) -> str:
+    """
+    Determine the storage format of a feature cache file from its extension.
+
+    Args:
+        path (str): The cache file path, e.g., "features.parquet".
+
+    Returns:
+        (str): "json", "parquet", or "feather".
+    """
+    ext = os.path.splitext(path)[1].lower()
+    if ext in AMM_CACHE_FORMATS:
+        return AMM_CACHE_FORMATS[ext]
+    elif "json" in path.lower():
+        # e.g., compressed json such as "features.json.gz"
+        return "json"
+    else:
+        raise ValueError(
+            "The cache file {} does not have a supported extension. Supported "
+            "extensions are {}.".format(path, list(AMM_CACHE_FORMATS.keys()))
+        )
+
+
+def store_feature_cache(df, path) -> None:
+    """
+    Atomically store a featurized dataframe in a cache file. The format is
+    determined by the file extension (see AMM_CACHE_FORMATS).
+
+    Parquet and feather files are columnar binary formats, which are much
+    faster to read and write than json for large dataframes, and allow reading
+    only the needed rows and columns (see load_feature_cache). They require
+    pyarrow and string column names. Sparse columns are stored dense.
+
+    Args:
+        df (pandas.DataFrame): The dataframe to store.
+        path (str): The cache file path.
+
+    Returns:
+        None
+    """
+    fmt = get_cache_format(path)
+    sparse_cols = [
+        c for c, dt in df.dtypes.items() if isinstance(dt, pd.SparseDtype)
+    ]
+    if sparse_cols:
+        df = df.copy(deep=False)
+        df[sparse_cols] = df[sparse_cols].sparse.to_dense()
+    dirname = os.path.dirname(os.path.abspath(path))
+    fd, tmp_path = tempfile.mkstemp(dir=dirname, suffix=".tmp")
+    os.close(fd)
+    try:
+        if fmt == "json":
+            store_dataframe_as_json(df, tmp_path)
+        else:
+            _check_columnar(df, fmt)
+            table = pyarrow.Table.from_pandas(df, preserve_index=True)
+            if fmt == "parquet":
+                pq.write_table(
+                    table, tmp_path, row_group_size=AMM_PARQUET_ROW_GROUP_SIZE
+                )
+            else:
+                # Uncompressed feather files can be memory-mapped without
+                # decompressing
+                feather.write_feather(table, tmp_path, compression="uncompressed")
+        os.replace(tmp_path, path)
+    finally:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+
+
+def load_feature_cache(path, index=None, columns=None) -> pd.DataFrame:
+    """
+    Load a featurized dataframe from a cache file. The format is determined by
+    the file extension (see AMM_CACHE_FORMATS).
+
+    Parquet and feather files are memory-mapped, and only the requested
+    columns are read. Only the requested rows of feather files are read into
+    memory; for parquet files, only the row groups (of
+    AMM_PARQUET_ROW_GROUP_SIZE rows) containing requested rows are decoded.
+
+    Args:
+        path (str): The cache file path.
+        index (pandas.Index, list): The index labels of the samples to load.
+            Labels not present in the cache are skipped. If None, all samples
+            are loaded.
+        columns ([str]): The columns to load. If None, all columns are loaded.
+
+    Returns:
+        (pandas.DataFrame): The cached samples present in index, in the order
+            of index.
+    """
+    fmt = get_cache_format(path)
+    if fmt == "json":
+        df = load_dataframe_from_json(path)
+        if columns is not None:
+            df = df[columns]
+        if index is not None:
+            df = df.iloc[_present_positions(df.index, index)]
+        return df
+
+    _check_columnar(None, fmt)
+    if fmt == "parquet":
+        pfile = pq.ParquetFile(path, memory_map=True)
+        schema = pfile.schema.to_arrow_schema()
+
+        def read(cols, positions=None):
+            if positions is None:
+                return pfile.read(columns=cols, use_pandas_metadata=False)
+            return _read_parquet_rows(pfile, cols, positions)
+
+    else:
+        table = feather.read_table(path, memory_map=True)
+        schema = table.schema
+
+        def read(cols, positions=None):
+            data = pyarrow.Table.from_arrays(
+                [table.column(c) for c in cols], names=cols
+            )
+            if positions is None:
+                return data
+            return data.take(pyarrow.array(positions, type=pyarrow.int64()))
+
+    pandas_metadata = schema.pandas_metadata or {}
+    index_cols = [
+        c for c in pandas_metadata.get("index_columns", []) if isinstance(c, str)
+    ]
+    if columns is None:
+        columns = [c for c in schema.names if c not in index_cols]
+
+    index_table = read(index_cols)
+    index_arrays = [index_table.column(c).to_pandas() for c in index_cols]
+    index_names = [None if c.startswith("__index_level_") else c for c in index_cols]
+    if len(index_arrays) == 1:
+        stored_index = pd.Index(index_arrays[0], name=index_names[0])
+    else:
+        stored_index = pd.MultiIndex.from_arrays(index_arrays, names=index_names)
+
+    if index is not None:
+        positions = _present_positions(stored_index, index)
+        data = read(list(columns), positions)
+    else:
+        positions = np.arange(len(stored_index))
+        data = read(list(columns))
+    df = data.replace_schema_metadata(None).to_pandas()
+    df.index = stored_index[positions]
+    return df
+
+
+def _read_parquet_rows(pfile, columns, positions):
+    """
+    Read rows of a parquet file, only decoding the row groups containing them.
+    """
+    metadata = pfile.metadata
+    sizes = [metadata.row_group(i).num_rows for i in range(metadata.num_row_groups)]
+    bounds = np.cumsum([0] + sizes)
+    row_groups = np.searchsorted(bounds, positions, side="right") - 1
+    needed = np.unique(row_groups)
+    if not len(needed):
+        return pfile.schema_arrow.empty_table().select(columns)
+    table = pfile.read_row_groups(
+        needed.tolist(), columns=columns, use_pandas_metadata=False
+    )
+    # The positions of the rows in the concatenated row groups read
+    starts = np.cumsum([0] + [sizes[g] for g in needed[:-1]])
+    local = positions - bounds[row_groups]
+    local += starts[np.searchsorted(needed, row_groups)]
+    return table.take(pyarrow.array(local, type=pyarrow.int64()))
+
+
+def _present_positions(stored_index, index) -> np.ndarray:
+    """
+    Get the positions in stored_index of the labels of index which are present
+    in stored_index.
+    """
+    positions = stored_index.get_indexer(pd.Index(index))
+    return positions[positions >= 0]
+
+
+def _check_columnar(df, fmt) -> None:
+    """
+    Ensure a columnar cache format can be used.
+    """
+    if pyarrow is None:
+        raise AutomatminerError(
+            "pyarrow is required for the {} feature cache format. Install "
+            "pyarrow or use a json cache_src.".format(fmt)
+        )
+    if df is not None:
+        if isinstance(df.columns, pd.MultiIndex) or not all(
+            isinstance(c, str) for c in df.columns
+        ):
+            raise AutomatminerError(
+                "The {} feature cache format requires string column names (no "
+                "multiindex). Use a json cache_src.".format(fmt)
+            )
@@ -0,0 +1,317 @@
+"""
+Compact, array-backed containers for electronic structure inputs, i.e.,
+densities of states and band structures.
+
+pymatgen CompleteDos and BandStructure objects (and their dicts) hold their
+energies, densities, k-points, eigenvalues and projections in nested lists and
+per-k-point objects. A CompactElectronicStructure holds all of these numbers
+in a single NumPy buffer, optionally memory-mapped from disk, and the pymatgen
+object is only materialized while it is being featurized.
+"""
+
+import os
+import json
+import hashlib
+import logging
+import tempfile
+
+import numpy as np
+
+__author__ = ["Alex Dunn <ardunn@lbl.gov>"]
+
+logger = logging.getLogger(__name__)
+
+# Numeric lists with fewer values than this are kept in the skeleton as is
+AMM_COMPACT_MIN_SIZE = 16
+
+# The key of the references to arrays in the buffer, in skeletons
+_ARRAY_KEY = "@amm_array"
+
+
+class CompactElectronicStructure:
+    """
+    A density of states or band structure stored as a skeleton of its dict
+    representation, in which every large array of floats (e.g., energies,
+    densities and eigenvalues) is replaced by a reference to a slice of one
+    float64 buffer.
+
+    The buffer may be memory-mapped from a file (see save and load), in which
+    case pickling the container (e.g., to send it to a featurization worker)
+    only pickles its skeleton and the path of the file.
+
+        compact = CompactElectronicStructure.from_object(dos)
+        dos = compact.to_object()
+
+    Args:
+        skeleton (dict): The dict representation of the object, with arrays
+            replaced by references to the buffer.
+        data (numpy.ndarray): The 1D float64 buffer.
+        path (str): The path of the saved container (without extension), if
+            the buffer is memory-mapped from it.
+    """
+
+    def __init__(self, skeleton, data, path=None):
+        self.skeleton = skeleton
+        self.data = data
+        self.path = path
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        if self.path:
+            state["data"] = None
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        if self.data is None:
+            self.data = np.load(self.path + ".npy", mmap_mode="r")
+
+    def __repr__(self):
+        return "CompactElectronicStructure({}, {} values)".format(
+            self.skeleton.get("@class"), self.data.size
+        )
+
+    @classmethod
+    def from_object(cls, obj):
+        """
+        Compact a pymatgen electronic structure object, or its dict.
+
+        Args:
+            obj (dict or MSONable): A CompleteDos, Dos, BandStructure or
+                BandStructureSymmLine object, or its dict representation.
+                Dicts are compacted without being converted to objects.
+
+        Returns:
+            (CompactElectronicStructure): The compacted object.
+        """
+        d = obj if isinstance(obj, dict) else obj.as_dict()
+        arrays = []
+        offset = [0]
+
+        def compact(o):
+            if isinstance(o, dict):
+                return {k: compact(v) for k, v in o.items()}
+            elif isinstance(o, (list, tuple, np.ndarray)):
+                array = _float_array(o)
+                if array is None:
+                    o = o.tolist() if isinstance(o, np.ndarray) else o
+                    return [compact(v) for v in o]
+                ref = {_ARRAY_KEY: [offset[0], list(array.shape)]}
+                arrays.append(array.ravel())
+                offset[0] += array.size
+                return ref
+            return o
+
+        skeleton = compact(d)
+        data = np.concatenate(arrays) if arrays else np.empty(0)
+        return cls(skeleton, data)
+
+    def to_dict(self) -> dict:
+        """
+        Get the dict representation of the object.
+
+        Returns:
+            (dict): As given by the as_dict method of the object.
+        """
+
+        def expand(o):
+            if isinstance(o, dict):
+                if _ARRAY_KEY in o:
+                    return self._get_ref(o).tolist()
+                return {k: expand(v) for k, v in o.items()}
+            elif isinstance(o, list):
+                return [expand(v) for v in o]
+            return o
+
+        return expand(self.skeleton)
+
+    def to_object(self):
+        """
+        Materialize the pymatgen object.
+
+        Returns:
+            (MSONable): The CompleteDos, BandStructure, etc.
+        """
+        from monty.json import MontyDecoder
+
+        return MontyDecoder().process_decoded(self.to_dict())
+
+    def get_array(self, *keys) -> np.ndarray:
+        """
+        Get an array of the object without materializing it. Arrays held in
+        the buffer are returned as (read-only, if memory-mapped) views.
+
+        Args:
+            *keys (str or int): The keys of the array in the dict
+                representation of the object, e.g., "densities", "1".
+
+        Returns:
+            (numpy.ndarray): The array.
+        """
+        o = self.skeleton
+        for k in keys:
+            o = o[k]
+        if isinstance(o, dict) and _ARRAY_KEY in o:
+            return self._get_ref(o)
+        return np.asarray(o)
+
+    @property
+    def efermi(self) -> float:
+        """The Fermi level."""
+        return self.skeleton.get("efermi")
+
+    @property
+    def energies(self) -> np.ndarray:
+        """The energies of a density of states."""
+        return self.get_array("energies")
+
+    @property
+    def densities(self) -> dict:
+        """The total densities of a density of states, keyed by spin."""
+        return {
+            s: self.get_array("densities", s) for s in self.skeleton["densities"]
+        }
+
+    @property
+    def eigenvalues(self) -> dict:
+        """
+        The (n_bands x n_kpoints) eigenvalues of a band structure, keyed by
+        spin.
+        """
+        return {s: self.get_array("bands", s) for s in self.skeleton["bands"]}
+
+    @property
+    def kpoints(self) -> np.ndarray:
+        """The fractional coordinates of the k-points of a band structure."""
+        return self.get_array("kpoints")
+
+    def content_hash(self) -> str:
+        """
+        Get a hash of the contents of the object.
+
+        Returns:
+            (str): A hex digest uniquely identifying the object.
+        """
+        skeleton = json.dumps(self.skeleton, sort_keys=True, default=str)
+        h = hashlib.sha1(skeleton.encode("utf-8"))
+        h.update(np.ascontiguousarray(self.data).tobytes())
+        return h.hexdigest()
+
+    def save(self, path) -> None:
+        """
+        Save the container, as a skeleton (path + ".json") and a buffer
+        (path + ".npy") which can be memory-mapped by load.
+
+        Args:
+            path (str): The path of the files, without extension.
+
+        Returns:
+            None
+        """
+        from monty.json import MontyEncoder
+
+        path = os.path.abspath(path)
+        skeleton = json.dumps(self.skeleton, cls=MontyEncoder).encode("utf-8")
+        for ext, write in (
+            (".npy", lambda f: np.save(f, np.asarray(self.data))),
+            (".json", lambda f: f.write(skeleton)),
+        ):
+            fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path))
+            try:
+                with os.fdopen(fd, "wb") as f:
+                    write(f)
+                os.replace(tmp_path, path + ext)
+            except BaseException:
+                os.remove(tmp_path)
+                raise
+
+    @classmethod
+    def load(cls, path, mmap=True):
+        """
+        Load a container saved with save.
+
+        Args:
+            path (str): The path of the files, without extension.
+            mmap (bool): If True, the buffer is memory-mapped (read-only)
+                instead of read into memory.
+
+        Returns:
+            (CompactElectronicStructure): The container.
+        """
+        with open(path + ".json", "r") as f:
+            skeleton = json.load(f)
+        data = np.load(path + ".npy", mmap_mode="r" if mmap else None)
+        return cls(skeleton, data, path=path if mmap else None)
+
+    def _get_ref(self, ref):
+        offset, shape = ref[_ARRAY_KEY]
+        size = int(np.prod(shape))
+        return self.data[offset:offset + size].reshape(shape)
+
+
+def compact_electronic_structures(entries, store_dir=None) -> list:
+    """
+    Compact densities of states or band structures (or their dicts).
+
+    Args:
+        entries ([object]): The objects or dicts. Entries which are already
+            compacted, and entries which are not objects or dicts (e.g., NaN),
+            are returned as is.
+        store_dir (str): If set, a directory in which the compacted entries
+            are saved (named by their content hash), and from which their
+            buffers are memory-mapped, so they are not held in memory.
+
+    Returns:
+        ([CompactElectronicStructure]): The compacted entries.
+    """
+    if store_dir:
+        os.makedirs(store_dir, exist_ok=True)
+    compacted = []
+    for e in entries:
+        if isinstance(e, dict) or (
+            hasattr(e, "as_dict") and not isinstance(e, CompactElectronicStructure)
+        ):
+            e = CompactElectronicStructure.from_object(e)
+            if store_dir:
+                path = os.path.join(store_dir, e.content_hash())
+                if not os.path.exists(path + ".json"):
+                    e.save(path)
+                e = CompactElectronicStructure.load(path)
+        compacted.append(e)
+    return compacted
+
+
+def materialize(entry):
+    """
+    Materialize a compacted entry as its pymatgen object. Other entries are
+    returned as is.
+
+    Args:
+        entry (object): The featurizer input.
+
+    Returns:
+        (object): The featurizer input, as accepted by the featurizers.
+    """
+    if isinstance(entry, CompactElectronicStructure):
+        return entry.to_object()
+    return entry
+
+
+def _float_array(values):
+    """
+    Convert a (nested) list of numbers to a float64 array, if it is
+    rectangular, contains floats and has at least AMM_COMPACT_MIN_SIZE values.
+    Otherwise, return None.
+    """
+    first = values
+    while isinstance(first, (list, tuple, np.ndarray)) and len(first):
+        first = first[0]
+    if isinstance(first, bool) or not isinstance(first, (int, float, np.number)):
+        return None
+    try:
+        array = np.array(values)
+    except ValueError:
+        return None
+    if array.dtype.kind != "f" or array.size < AMM_COMPACT_MIN_SIZE:
+        return None
+    return array.astype(np.float64, copy=False)
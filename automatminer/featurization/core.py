@@ -5,17 +5,15 @@ Classes for automatic featurization and core featurizer functionality.
 import os
 import math
 import logging
+import multiprocessing
 
+import pandas as pd
 from pymatgen import Composition
 from matminer.featurizers.conversions import (
     StrToComposition,
     DictToObject,
     StructureToComposition,
-    StructureToOxidStructure,
-    CompositionToOxidComposition,
 )
-from matminer.featurizers.function import FunctionFeaturizer
-from matminer.utils.io import store_dataframe_as_json, load_dataframe_from_json
 
 from automatminer.utils.log import (
     log_progress,
@@ -24,14 +22,47 @@ from automatminer.utils.log import (
 )
 from automatminer.utils.pkg import check_fitted, set_fitted
 from automatminer.base import DFTransformer
+from automatminer.featurization.analysis import NeighborCache, SymmetryCache
+from automatminer.featurization.cache import (
+    FeaturizationCheckpoint,
+    SampleFeatureCache,
+    hash_entry,
+    hash_featurizer,
+    get_cache_format,
+    load_feature_cache,
+    store_feature_cache,
+)
+from automatminer.featurization.compact import compact_electronic_structures
+from automatminer.featurization.engine import (
+    FeaturizerPool,
+    LimitExceededRow,
+    broadcast_rows,
+    features_to_frame,
+    fit_representatives,
+    match_structures,
+    unique_entries,
+)
+from automatminer.featurization.oxidation import (
+    AMM_OXI_MEMO_FILE,
+    get_oxidation_state_memo,
+    guess_oxidation_states,
+)
 from automatminer.featurization.sets import (
     CompositionFeaturizers,
     StructureFeaturizers,
     BSFeaturizers,
     DOSFeaturizers,
 )
-from automatminer.utils.pkg import AutomatminerError
-from automatminer.utils.ml import regression_or_classification
+from automatminer.featurization.vectorized import (
+    VectorizedFunctionFeaturizer,
+    is_vectorizable,
+)
+from automatminer.utils.pkg import AutomatminerError, compare_columns
+from automatminer.utils.ml import (
+    AMM_PRECISIONS,
+    downcast,
+    regression_or_classification,
+)
 
 __author__ = [
     "Alex Dunn <ardunn@lbl.gov>",
@@ -44,6 +75,25 @@ _COMMON_COL_ERR_STR = "composition_col/structure_col/bandstructure_col/dos_col"
 logger = logging.getLogger(__name__)
 
 
+def _wilson_interval(n_passed, n, z=1.96):
+    """
+    The Wilson score interval of a binomial proportion.
+
+    Args:
+        n_passed (int): The number of successes.
+        n (int): The number of trials.
+        z (float): The standard normal quantile of the confidence level.
+
+    Returns:
+        (float, float): The lower and upper bounds of the interval.
+    """
+    p = n_passed / n
+    denominator = 1 + z ** 2 / n
+    center = (p + z ** 2 / (2 * n)) / denominator
+    half_width = z * math.sqrt(p * (1 - p) / n + z ** 2 / (4 * n ** 2)) / denominator
+    return center - half_width, center + half_width
+
+
 class AutoFeaturizer(DFTransformer):
     """
     Automatically featurize a dataframe.
@@ -62,11 +112,71 @@ class AutoFeaturizer(DFTransformer):
     the correct column name is not present.
 
     Args:
-        cache_src (str): An absolute path to a json file holding feature
+        cache_src (str): An absolute path to a file holding feature
             information. If file exists, will read features (loc indexwise)
             from this file instead of featurizing. If this file does not exist,
             AutoFeaturizer will featurize normally, then save the features to a
-            new file. Only features (not featurizer input objects) will be saved
+            new file. Only features (not featurizer input objects) will be saved.
+            If the file exists but lacks some entries (by index), only those
+            entries are featurized and then merged into the cache.
+            The format is chosen by the file extension: ".json", or the
+            columnar binary formats ".parquet" and ".feather" (requires
+            pyarrow). Columnar caches are much faster to read and write for
+            large dataframes, and only the rows needed are loaded into memory.
+        sample_cache_dir (str): An absolute path to a directory holding a
+            per-sample feature cache. Features are keyed on a hash of each
+            input object (e.g., composition or structure) and of each
+            featurizer, so features computed once for a material are reused in
+            any later fit/transform/predict, by this or any other
+            AutoFeaturizer, regardless of the dataframe or its index. Only
+            samples not found in the cache are featurized. Samples on which a
+            featurizer exceeded sample_timeout or max_memory_mb are not
+            cached, so they are featurized again by later runs.
+        dedupe_structures (str): How to deduplicate structures before
+            structure featurization; each group of duplicate structures is
+            featurized once and the features are broadcast to all rows of the
+            group. None (default) does not deduplicate. "hash" groups
+            structures with identical lattices and sites (species, fractional
+            coordinates, up to 6 decimals, and site properties, in the same
+            order), which gives the same features. "matcher" groups structures which
+            pymatgen's StructureMatcher finds identical up to the choice of
+            cell, without rescaling (see AMM_MATCHER_KWARGS in
+            automatminer.featurization.engine); this also finds supercells
+            and other cell settings, but features depending on the cell
+            choice of a structure are taken from the first structure of its
+            group. Strained or distorted copies are not grouped.
+        share_neighbors (bool): If True, neighbor lists and local environments
+            (e.g., Voronoi tessellations and CrystalNN neighbors) of each
+            structure are computed once and shared by all structure
+            featurizers, instead of being recomputed by each featurizer.
+            While a structure is featurized, the pymatgen neighbor analysis
+            methods are wrapped (see automatminer.featurization.analysis), so
+            sharing is opt-in.
+        neighbor_cache_dir (str): An absolute path to a directory in which
+            the shared neighbor analyses of each structure are saved, so they
+            are reused in later fits/transforms. If set, neighbor analyses are
+            shared even if share_neighbors is False.
+        share_symmetry (bool): If True, the spglib symmetry analysis of each
+            structure (for each symmetry tolerance) is computed once per
+            fit/transform and shared by all structure featurizers using it
+            (e.g., GlobalSymmetryFeatures and StructuralComplexity). While a
+            structure is featurized, the SpacegroupAnalyzer of the matminer
+            structure featurizers is replaced (see
+            automatminer.featurization.analysis), so sharing is opt-in.
+        symmetry_cache_dir (str): An absolute path to a directory in which
+            the shared symmetry analyses are saved, so they persist across
+            fits/transforms. If set, symmetry analyses are shared even if
+            share_symmetry is False.
+        checkpoint_dir (str): An absolute path to a work directory in which
+            the features of each featurizer are checkpointed after every
+            chunk of checkpoint_size entries. If a transform is interrupted
+            (e.g., killed on a preemptible node), transforming the same data
+            again restores the completed chunks and only featurizes the rest.
+            Chunks with samples exceeding sample_timeout or max_memory_mb are
+            not checkpointed. The directory may be removed once the transform
+            completes.
+        checkpoint_size (int): The number of (unique) entries in each
+            checkpointed chunk. Only used if checkpoint_dir is set.
         preset (str): "express" or "heavy" or "debug" or "all. Determines by
             preset the featurizers that should be applied. See the Featurizer
             sets for specifics of each. Default is "express". Incompatible with
@@ -83,6 +193,14 @@ class AutoFeaturizer(DFTransformer):
 
         exclude ([str]): Class names of featurizers to exclude. Only used if
             you use a preset.
+        functionalize (bool): If True, add features from functions (e.g.,
+            1/x, x**2, log(x)) of the numeric features, with a
+            VectorizedFunctionFeaturizer. Function features which are
+            constant or duplicate other features on the first dataframe
+            transformed after fitting (e.g., by fit_transform) are pruned,
+            and are not added to any dataframe. If that dataframe is
+            transformed in chunks, all chunks are featurized before pruning,
+            so the other features of all chunks are held in memory.
         ignore_cols ([str]): Column names to be ignored/removed from any
             dataframe undergoing fitting or transformation. If columns are
             not ignored, they may be used later on for learning.
@@ -94,10 +212,62 @@ class AutoFeaturizer(DFTransformer):
             state.
         multiiindex (bool): If True, returns a multiindexed dataframe. Not
             recommended for use in MatPipe.
+        precision (str): If set, the precision ("float32" or "float64") of
+            float features. Integer and bool features are also downcast to the
+            most compact types holding their values. "float32" halves the
+            memory of wide featurized dataframes. If None, features are kept
+            with their original types (usually float64).
+        sparse_features (bool or [str]): If True, the numeric features of the
+            featurizers giving many mostly-zero features (see
+            StructureFeaturizers.sparse_names, e.g., BagofBonds) are stored as
+            sparse columns holding only nonzero values. Alternatively, a list
+            of the class names of the featurizers with sparse features. Sparse
+            features are kept sparse by DataCleaner, by the corr and tree
+            reducers of FeatureReducer and by SinglePipelineAdaptor (with
+            accepts_sparse=True, as in the single presets), and are otherwise
+            densified only when needed (e.g., by the pca reducer and TPOT).
+        compact_electronic (bool or str): If True, densities of states and
+            band structures (or their dicts) are converted to compact,
+            array-backed CompactElectronicStructures instead of pymatgen
+            objects, and each is only materialized as a pymatgen object while
+            it is being featurized. If a directory path, their arrays are also
+            saved there and memory-mapped, so they are not held in memory.
         do_precheck (bool): Execute a precheck on each featurizer before
             featurizing with it. See matminer prechecking for more info.
-        n_jobs (int): The number of parallel jobs to use during featurization
-            for each featurizer. Default is n_cores
+        precheck_sample_size (int): The number of randomly sampled rows used
+            to estimate the fraction of each column passing the precheck. If
+            the estimate is too close to min_precheck_frac to decide at 95%
+            confidence, all rows are prechecked. If None, all rows are always
+            prechecked.
+        max_featurization_mins (float): A time budget (in minutes) for
+            featurizing the fitted dataframe. If set, fit times each featurizer
+            on a random sample of budget_sample_size rows, extrapolates the
+            time needed to featurize all rows with n_jobs processes, and removes
+            the most expensive featurizers until the estimated total is within
+            the budget. Removed featurizers are added to removed_featurizers.
+            Time spent on conversions and oxidation state guessing is not
+            counted.
+        sample_timeout (float): The maximum time (in seconds) a featurizer may
+            spend on a single sample. Featurizers exceeding it are interrupted
+            and, if ignore_errors is True, give NaN features for the sample.
+            Featurizers which cannot be interrupted (e.g., hung in compiled
+            code) have their worker process killed and replaced. If set,
+            featurization always runs in worker processes, even if n_jobs
+            is 1.
+        max_memory_mb (float): The maximum memory (in MB, as address space)
+            each featurization worker process may allocate beyond its size
+            at startup. Featurizers exceeding it fail with a MemoryError and,
+            if ignore_errors is True, give NaN features for the sample. If
+            set, featurization always runs in worker processes, even if
+            n_jobs is 1.
+        max_tasks_per_worker (int): If set, featurization worker processes
+            are replaced by fresh ones after featurizing this many samples,
+            bounding the memory leaked or fragmented by featurizers.
+        n_jobs (int): The number of parallel jobs to use during featurization.
+            One pool of n_jobs processes is used for an entire transform, and
+            each task applies all featurizers of a featurizer type to one
+            input object, so inputs are only sent to workers once. Default is
+            n_cores.
                 composition_col="composition",
         composition_col (str): Name of the column containing structures to be
             featurized.
@@ -120,21 +290,50 @@ class AutoFeaturizer(DFTransformer):
             featurizers.
         auto_featurizer (bool): whether the featurizers are set automatically,
             or passed by the users.
-        fitted_input_df (pd.DataFrame): The dataframe which was fitted on
+        fitted_input_df (pd.DataFrame): The dataframe which was fitted on.
+            Released (set to None) once it is transformed (e.g., by
+            fit_transform), so its input objects can be freed.
         converted_input_df (pd.DataFrame): The converted dataframe which
-            was fitted on (i.e., strings converted to compositions).
+            was fitted on (i.e., strings converted to compositions). Released
+            with fitted_input_df.
         removed_featurizers ([BaseFeaturizer]): A list of featurizers removed
-            by prechecking methods, if applicable
+            by prechecking methods or the time budget, if applicable
+        featurizer_time_estimates (dict): If max_featurization_mins is set, the
+            estimated time (in seconds) to featurize the fitted dataframe with
+            each featurizer, keyed by featurizer type and then class name.
+        fit_from_cache (bool): True if fitting was skipped because cache_src
+            was found.
+        function_featurizer (VectorizedFunctionFeaturizer): If functionalize
+            is True, the function featurizer, fit on the features of the first
+            dataframe (or chunk) transformed after fitting.
+        featurizer_stats (dict): The performance of each featurizer during the
+            last featurization (fit_transform or transform), keyed by featurizer
+            type and then featurizer class name: CPU time (summed over
+            parallel jobs), samples featurized per CPU second, the numbers of
+            samples featurized and of samples which failed, and the fraction
+            of NaN features. Samples restored from caches or deduplicated are
+            not featurized, so are not counted; if every sample is restored
+            from cache_src, featurizer_stats is empty.
 
         Attributes not set during fitting and not specified by arguments:
 
         min_precheck_frac (float): The minimum fraction of a featuriser's input
             that can be valid (via featurizer.precheck(data).
+        budget_sample_size (int): The number of samples used to time each
+            featurizer if max_featurization_mins is set.
     """
 
     def __init__(
         self,
         cache_src=None,
+        sample_cache_dir=None,
+        dedupe_structures=None,
+        share_neighbors=False,
+        neighbor_cache_dir=None,
+        share_symmetry=False,
+        symmetry_cache_dir=None,
+        checkpoint_dir=None,
+        checkpoint_size=1000,
         preset=None,
         featurizers=None,
         exclude=None,
@@ -144,7 +343,15 @@ class AutoFeaturizer(DFTransformer):
         drop_inputs=True,
         guess_oxistates=True,
         multiindex=False,
+        precision=None,
+        sparse_features=False,
+        compact_electronic=False,
         do_precheck=True,
+        precheck_sample_size=1000,
+        max_featurization_mins=None,
+        sample_timeout=None,
+        max_memory_mb=None,
+        max_tasks_per_worker=None,
         n_jobs=None,
         composition_col="composition",
         structure_col="structure",
@@ -167,6 +374,14 @@ class AutoFeaturizer(DFTransformer):
             )
 
         self.cache_src = cache_src
+        self.sample_cache_dir = sample_cache_dir
+        self.dedupe_structures = dedupe_structures
+        self.share_neighbors = share_neighbors
+        self.neighbor_cache_dir = neighbor_cache_dir
+        self.share_symmetry = share_symmetry
+        self.symmetry_cache_dir = symmetry_cache_dir
+        self.checkpoint_dir = checkpoint_dir
+        self.checkpoint_size = checkpoint_size
         self.preset = "express" if preset is None else preset
         self.featurizers = featurizers
         self.exclude = exclude if exclude else []
@@ -177,12 +392,24 @@ class AutoFeaturizer(DFTransformer):
         self.ignore_errors = ignore_errors
         self.drop_inputs = drop_inputs
         self.multiindex = multiindex
+        self.precision = precision
+        self.sparse_features = sparse_features
+        self.compact_electronic = compact_electronic
         self.do_precheck = do_precheck
+        self.precheck_sample_size = precheck_sample_size
+        self.max_featurization_mins = max_featurization_mins
+        self.sample_timeout = sample_timeout
+        self.max_memory_mb = max_memory_mb
+        self.max_tasks_per_worker = max_tasks_per_worker
         self.n_jobs = n_jobs
         self.guess_oxistates = guess_oxistates
         self.features = []
         self.auto_featurizer = True if self.featurizers is None else False
         self.removed_featurizers = None
+        self.fit_from_cache = False
+        self.function_featurizer = None
+        self.featurizer_stats = {}
+        self.featurizer_time_estimates = {}
         self.composition_col = composition_col
         self.structure_col = structure_col
         self.bandstruct_col = bandstructure_col
@@ -217,9 +444,7 @@ class AutoFeaturizer(DFTransformer):
                 )
 
             for ftype, fset in self.featurizers.items():
-                _allowed = [
-                    f.__class__.__name__ for f in _supported_featurizers[ftype]().all
-                ]
+                _allowed = _supported_featurizers[ftype].featurizer_names
                 for f in fset:
                     if f.__class__.__name__ not in _allowed:
                         raise ValueError(
@@ -240,8 +465,7 @@ class AutoFeaturizer(DFTransformer):
 
         # Check if any featurizers need fitting (useful for MatPipe)
         needs_fit = False
-        fittable_fs = StructureFeaturizers().need_fit
-        self.fittable_fcls = set([f.__class__.__name__ for f in fittable_fs])
+        self.fittable_fcls = set(StructureFeaturizers.fittable_names)
 
         # Currently structure featurizers are the only featurizer types which
         # can be fittable
@@ -260,14 +484,42 @@ class AutoFeaturizer(DFTransformer):
                 "sets into the training."
             )
 
-        if self.cache_src and "json" not in self.cache_src.lower():
+        if self.dedupe_structures not in (None, "hash", "matcher"):
             raise ValueError(
-                "The cache_src filename does not contain json."
-                "JSON is the required file type for featurizer"
-                "caching."
+                "dedupe_structures must be None, 'hash', or 'matcher', not "
+                "{}".format(self.dedupe_structures)
             )
 
+        if not isinstance(self.checkpoint_size, int) or self.checkpoint_size < 1:
+            raise ValueError(
+                "checkpoint_size must be a positive integer, not {}."
+                "".format(self.checkpoint_size)
+            )
+
+        if self.precision not in (None,) + AMM_PRECISIONS:
+            raise ValueError(
+                "precision must be None or one of {}, not {}."
+                "".format(AMM_PRECISIONS, self.precision)
+            )
+
+        if self.cache_src:
+            # Raises ValueError if the format is not supported
+            cache_format = get_cache_format(self.cache_src)
+            if cache_format != "json" and self.multiindex:
+                raise AutomatminerError(
+                    "The {} feature cache format requires string column names "
+                    "(no multiindex). Use a json cache_src or set "
+                    "multiindex=False.".format(cache_format)
+                )
+
+        self._sample_cache = (
+            SampleFeatureCache(self.sample_cache_dir)
+            if self.sample_cache_dir
+            else None
+        )
+
         self.min_precheck_frac = 0.9
+        self.budget_sample_size = 20
 
     @log_progress(logger, AMM_LOG_FIT_STR)
     @set_fitted
@@ -296,7 +548,8 @@ class AutoFeaturizer(DFTransformer):
         Returns:
             (AutoFeaturizer): self
         """
-        if self.cache_src and os.path.exists(self.cache_src):
+        self.fit_from_cache = bool(self.cache_src and os.path.exists(self.cache_src))
+        if self.fit_from_cache:
             logger.info(
                 self._log_prefix + "Cache {} found. Fit aborted."
                 "".format(self.cache_src)
@@ -304,6 +557,8 @@ class AutoFeaturizer(DFTransformer):
             return self
 
         self.fitted_input_df = df
+        self.removed_featurizers = []
+        self.function_featurizer = None
         df = self._prescreen_df(df, inplace=True)
         df = self._add_composition_from_structure(df)
 
@@ -320,37 +575,13 @@ class AutoFeaturizer(DFTransformer):
 
                 # Remove invalid featurizers by looking at valid_fraction
                 if self.do_precheck:
-                    logger.debug(self._log_prefix + "Prechecking featurizers.")
-                    invalid_featurizers = []
-                    for f in featurizers:
-                        try:
-                            frac = f.precheck_dataframe(
-                                df, featurizer_type, return_frac=True
-                            )
-                            if frac < self.min_precheck_frac:
-                                invalid_featurizers.append(f)
-                                msg = (
-                                    "Will remove {} because it's fraction "
-                                    "passing the precheck for this "
-                                    "dataset ({}) was less than the minimum"
-                                    " ({})"
-                                    "".format(
-                                        f.__class__.__name__,
-                                        frac,
-                                        self.min_precheck_frac,
-                                    )
-                                )
-                                logger.info(self._log_prefix + msg)
-                        except (AttributeError, ValueError, KeyError) as E:
-                            logger.warning(
-                                self._log_prefix
-                                + "{} precheck failed with {}. Ignoring...."
-                                "".format(f, E)
-                            )
+                    invalid_featurizers = self._precheck(
+                        df[featurizer_type], featurizer_type, featurizers
+                    )
                     self.featurizers[featurizer_type] = [
                         f for f in featurizers if f not in invalid_featurizers
                     ]
-                    self.removed_featurizers = invalid_featurizers
+                    self.removed_featurizers += invalid_featurizers
                     featurizers = self.featurizers[featurizer_type]
 
                 # Fit the featurizers
@@ -365,14 +596,17 @@ class AutoFeaturizer(DFTransformer):
                             + "Fitting {}.".format(f.__class__.__name__)
                         )
 
-                    f.fit(df[featurizer_type].tolist())
-                    f.set_n_jobs(self.n_jobs)
+                    # Fit on the fewest entries giving the same fit
+                    entries = fit_representatives(f, df[featurizer_type])
+                    f.fit(entries)
                     self.features += f.feature_labels()
 
                     if log_fit:
                         logger.info(
-                            self._log_prefix + "Fit {} to {} samples in dataframe."
-                            "".format(f.__class__.__name__, df.shape[0])
+                            self._log_prefix + "Fit {} to {} representative "
+                            "samples of {} samples in dataframe.".format(
+                                f.__class__.__name__, len(entries), df.shape[0]
+                            )
                         )
             else:
                 logger.info(
@@ -380,12 +614,200 @@ class AutoFeaturizer(DFTransformer):
                     + "Featurizer type {} not in the dataframe to be"
                     " fitted. Skipping...".format(featurizer_type)
                 )
+        if self.max_featurization_mins is not None:
+            self._remove_costly_featurizers(df)
         self.converted_input_df = df
         return self
 
+    def _precheck(self, column, featurizer_type, featurizers):
+        """
+        Find the featurizers for which the fraction of entries passing their
+        precheck is less than min_precheck_frac.
+
+        If the column has more than precheck_sample_size entries, the fraction
+        is estimated on a random sample. If the Wilson score interval (95%
+        confidence) of the estimate contains min_precheck_frac, the sample is
+        inconclusive, and all entries are prechecked for that featurizer.
+        Prechecks run in parallel over n_jobs processes.
+
+        Args:
+            column (pandas.Series): The featurizer input objects.
+            featurizer_type (str): The featurizer type of the column.
+            featurizers ([BaseFeaturizer]): The featurizers to precheck.
+
+        Returns:
+            ([BaseFeaturizer]): The featurizers which should be removed.
+        """
+        logger.debug(self._log_prefix + "Prechecking featurizers.")
+        n_entries = column.shape[0]
+        sample_size = self.precheck_sample_size
+        sampled = sample_size is not None and sample_size < n_entries
+        if sampled:
+            entries = column.sample(n=sample_size, random_state=0).tolist()
+        else:
+            entries = column.tolist()
+
+        invalid_featurizers = []
+        pool = FeaturizerPool({featurizer_type: featurizers}, n_jobs=self.n_jobs)
+        with pool:
+            results = pool.precheck(featurizer_type, entries)
+            for i, (f, passed) in enumerate(zip(featurizers, results)):
+                passed = self._precheck_results(f, passed)
+                if not passed:
+                    continue
+
+                frac = sum(passed) / len(passed)
+                if sampled:
+                    low, high = _wilson_interval(sum(passed), len(passed))
+                    logger.debug(
+                        self._log_prefix + "{} precheck fraction estimated as "
+                        "{:.3f} ({:.3f}-{:.3f}) from {} samples.".format(
+                            f.__class__.__name__, frac, low, high, len(passed)
+                        )
+                    )
+                    if low < self.min_precheck_frac <= high:
+                        logger.debug(
+                            self._log_prefix + "Sampled precheck of {} is "
+                            "inconclusive, prechecking all {} entries."
+                            "".format(f.__class__.__name__, n_entries)
+                        )
+                        passed = self._precheck_results(
+                            f,
+                            pool.precheck(
+                                featurizer_type, column.tolist(), [[i]] * n_entries
+                            )[i],
+                        )
+                        if not passed:
+                            continue
+                        frac = sum(passed) / len(passed)
+
+                if frac < self.min_precheck_frac:
+                    invalid_featurizers.append(f)
+                    msg = (
+                        "Will remove {} because it's fraction "
+                        "passing the precheck for this "
+                        "dataset ({}) was less than the minimum"
+                        " ({})"
+                        "".format(f.__class__.__name__, frac, self.min_precheck_frac)
+                    )
+                    logger.info(self._log_prefix + msg)
+        return invalid_featurizers
+
+    def _precheck_results(self, featurizer, passed):
+        """
+        Check the precheck results of a featurizer for errors.
+
+        Args:
+            featurizer (BaseFeaturizer): The prechecked featurizer.
+            passed ([bool or Exception]): The precheck result of each entry,
+                or the exception raised by the precheck.
+
+        Returns:
+            ([bool]): The precheck results, or an empty list if any precheck
+                failed (in which case the featurizer is not removed).
+        """
+        errors = [p for p in passed if isinstance(p, Exception)]
+        if errors:
+            logger.warning(
+                self._log_prefix + "{} precheck failed with {}. "
+                "Ignoring....".format(featurizer, errors[0])
+            )
+            return []
+        return [bool(p) for p in passed]
+
+    def _remove_costly_featurizers(self, df):
+        """
+        Remove the most expensive featurizers until the estimated time to
+        featurize df is within max_featurization_mins.
+
+        Each featurizer is timed on the same random sample of rows, after an
+        untimed warm-up on one of them (so one-off costs, e.g., imports and
+        loading data tables, are not extrapolated), and its time is
+        extrapolated to all rows of df, split over n_jobs processes
+        (except for vectorized featurizers, which run in the main process).
+        Featurizers are kept from cheapest to most expensive while the total
+        estimated time remains within the budget.
+
+        Args:
+            df (pandas.DataFrame): The tidied dataframe which was fitted on.
+
+        Returns:
+            None
+        """
+        n_samples = min(self.budget_sample_size, df.shape[0])
+        sample = df.sample(n=n_samples, random_state=0)
+        featurizers = {
+            ftype: fs
+            for ftype, fs in self.featurizers.items()
+            if fs and ftype in df.columns
+        }
+        pool = FeaturizerPool(
+            featurizers,
+            n_jobs=1,
+            sample_timeout=self.sample_timeout,
+            max_memory_mb=self.max_memory_mb,
+        )
+        times = {}
+        with pool:
+            for featurizer_type in featurizers:
+                entries = sample[featurizer_type].tolist()
+                totals = pool.measurements[featurizer_type]
+                pool.featurize(featurizer_type, entries[:1])
+                warm_up = [t[0] for t in totals]
+                pool.featurize(featurizer_type, entries)
+                times[featurizer_type] = [t[0] - w for t, w in zip(totals, warm_up)]
+
+        n_jobs = self.n_jobs or multiprocessing.cpu_count()
+        scale = df.shape[0] / n_samples
+        costs = []
+        self.featurizer_time_estimates = {}
+        for featurizer_type, fs in featurizers.items():
+            estimates = self.featurizer_time_estimates.setdefault(
+                featurizer_type, {}
+            )
+            for f, elapsed in zip(fs, times[featurizer_type]):
+                # Vectorized featurizers run in the main process
+                jobs = 1 if is_vectorizable(f) else n_jobs
+                estimate = elapsed * scale / jobs
+                estimates[f.__class__.__name__] = estimate
+                costs.append((estimate, featurizer_type, f))
+
+        budget = self.max_featurization_mins * 60
+        total = 0.0
+        removed = []
+        for estimate, featurizer_type, f in sorted(costs, key=lambda c: c[0]):
+            if total + estimate <= budget:
+                total += estimate
+            else:
+                removed.append(f)
+                logger.info(
+                    self._log_prefix + "Will remove {} because its estimated "
+                    "featurization time ({:.1f}s) would exceed the "
+                    "featurization budget ({:.1f}s, {:.1f}s already used)."
+                    "".format(f.__class__.__name__, estimate, budget, total)
+                )
+        logger.info(
+            self._log_prefix + "Estimated featurization time is {:.1f}s "
+            "(budget {:.1f}s) after removing {} featurizers."
+            "".format(total, budget, len(removed))
+        )
+
+        for featurizer_type in featurizers:
+            self.featurizers[featurizer_type] = [
+                f for f in self.featurizers[featurizer_type] if f not in removed
+            ]
+        self.removed_featurizers += removed
+        self.features = [
+            label
+            for fs in featurizers.values()
+            for f in fs
+            if f not in removed
+            for label in f.feature_labels()
+        ]
+
     @log_progress(logger, AMM_LOG_TRANSFORM_STR)
     @check_fitted
-    def transform(self, df, target, prevent_cache_overwrite=False):
+    def transform(self, df, target, prevent_cache_overwrite=False, chunk_size=None):
         """
         Decorate a dataframe containing composition, structure, bandstructure,
         and/or DOS objects with descriptors.
@@ -395,121 +817,580 @@ class AutoFeaturizer(DFTransformer):
             target (str): The ML-target property contained in the df.
             prevent_cache_overwrite (bool): If True, does not try to write any
                 new features to the cache.
+            chunk_size (int): If set, featurize the dataframe in blocks of
+                chunk_size rows, each going through all featurizers before the
+                next is started. Limits the memory used by intermediate
+                dataframes; to also avoid holding all features in memory at
+                once, use transform_iter.
 
         Returns:
             df (pandas.DataFrame): Transformed dataframe containing features.
         """
         if self.cache_src and os.path.exists(self.cache_src):
-            logger.debug(
-                self._log_prefix + "Reading cache_src {}".format(self.cache_src)
+            if df is self.fitted_input_df:
+                self._release_fit_inputs()
+            return self._transform_from_cache(
+                df, target, prevent_cache_overwrite, chunk_size=chunk_size
             )
-            cached_df = load_dataframe_from_json(self.cache_src)
-            if not all([loc in cached_df.index for loc in df.index]):
-                raise AutomatminerError(
-                    "Feature cache does not contain all "
-                    "entries (by DataFrame index) needed "
-                    "to transform the input df."
+
+        df = self._featurize(df, chunk_size=chunk_size)
+        if (
+            self.cache_src
+            and not os.path.exists(self.cache_src)
+            and not prevent_cache_overwrite
+        ):
+            store_feature_cache(df, self.cache_src)
+        return df
+
+    @check_fitted
+    def transform_iter(self, df, target, chunk_size):
+        """
+        Featurize a dataframe in blocks of rows, yielding the features of each
+        block as soon as it has gone through all featurizers.
+
+        Peak memory depends on chunk_size rather than the size of the dataset,
+        so each block can be, for example, written to disk before the next one
+        is featurized (except for the first transform after fitting, if
+        functionalize; see functionalize). Does not read or write cache_src
+        (the per-sample cache, if enabled, is used).
+
+        Args:
+            df (pandas.DataFrame): The dataframe not containing features.
+            target (str): The ML-target property contained in the df.
+            chunk_size (int): The number of rows in each block.
+
+        Yields:
+            df (pandas.DataFrame): Transformed blocks of chunk_size rows
+                containing features, in the order of df.
+        """
+        logger.info(
+            self._log_prefix + "Featurizing {} samples in chunks of {}."
+            "".format(df.shape[0], chunk_size)
+        )
+        for chunk_df in self._featurize_iter(df, chunk_size):
+            yield chunk_df
+
+    def _featurize(self, df, chunk_size=None):
+        """
+        Featurize a dataframe with all featurizers, without using cache_src.
+
+        Args:
+            df (pandas.DataFrame): The dataframe not containing features.
+            chunk_size (int): If set, featurize the dataframe in blocks of
+                chunk_size rows.
+
+        Returns:
+            df (pandas.DataFrame): Transformed dataframe containing features.
+        """
+        if chunk_size is not None:
+            return pd.concat(list(self._featurize_iter(df, chunk_size)), sort=False)
+
+        with self._featurizer_pool() as pool:
+            if df is self.fitted_input_df:
+                return self._featurize_chunk(
+                    self._release_fit_inputs(), pool, converted=True
                 )
             else:
-                cached_subdf = cached_df.loc[df.index]
-                if target in cached_subdf.columns:
-                    if target not in df.columns:
-                        logger.warn(
-                            self._log_prefix
-                            + "Target not present in both cached df and input df."
-                            " Cannot perform comparison to ensure index match."
-                        )
-                    else:
-                        cached_targets = cached_subdf[target]
-                        input_targets = df[target]
-                        cached_type = regression_or_classification(cached_targets)
-                        input_type = regression_or_classification(input_targets)
-                        if cached_type != input_type:
-                            raise AutomatminerError(
-                                "Cached targets appear to be '{}' type, while "
-                                "input targets appear to be '{}'."
-                                "".format(cached_type, input_type)
-                            )
+                return self._featurize_chunk(df, pool)
 
-                        problems = {}
-                        for ix in input_targets.index:
-                            iv = input_targets[ix]
-                            cv = cached_targets[ix]
-                            if iv != cv:
-                                try:
-                                    if not math.isclose(iv, cv):
-                                        problems[ix] = [iv, cv]
-                                except TypeError:
-                                    pass
-                        if problems:
-                            logger.warning(
-                                self._log_prefix
-                                + "Mismatch between cached targets and input "
-                                "targets: \n{}".format(problems)
-                            )
+    def _featurize_iter(self, df, chunk_size):
+        """
+        Featurize a dataframe in blocks of chunk_size rows.
 
-                logger.info(
-                    self._log_prefix + "Restored {} features on {} samples from "
-                    "cache {}".format(
-                        len(cached_subdf.columns), len(df.index), self.cache_src
+        Args:
+            df (pandas.DataFrame): The dataframe not containing features.
+            chunk_size (int): The number of rows in each block.
+
+        Yields:
+            df (pandas.DataFrame): Transformed blocks containing features.
+        """
+        if not isinstance(chunk_size, int) or chunk_size < 1:
+            raise ValueError(
+                "chunk_size must be a positive integer, not {}.".format(chunk_size)
+            )
+        converted = df is self.fitted_input_df
+        if converted:
+            df = self._release_fit_inputs()
+        chunks = (
+            df.iloc[start:start + chunk_size]
+            for start in range(0, df.shape[0], chunk_size)
+        )
+        with self._featurizer_pool() as pool:
+            if self.functionalize and self.function_featurizer is None and len(df):
+                # Prune the function features on the features of all chunks,
+                # as when not chunked, so chunks have the same columns as an
+                # unchunked transform. The other features of all chunks are
+                # held until then.
+                parts = [
+                    self._apply_featurizers(chunk_df, pool, converted=converted)
+                    for chunk_df in chunks
+                ]
+                self._fit_function_featurizer(
+                    pd.concat(
+                        [self._feature_columns(*part) for part in parts], sort=False
                     )
                 )
-                return cached_subdf
-        else:
-            transforming_on_fitted = df is self.fitted_input_df
-            df = self._prescreen_df(df, inplace=True)
-
-            if transforming_on_fitted:
-                df = self.converted_input_df
+                while parts:
+                    yield self._finish_chunk(*parts.pop(0))
             else:
-                df = self._add_composition_from_structure(df)
+                for chunk_df in chunks:
+                    yield self._featurize_chunk(chunk_df, pool, converted=converted)
 
-            for featurizer_type, featurizers in self.featurizers.items():
-                if featurizer_type in df.columns:
-                    if not transforming_on_fitted:
-                        df = self._tidy_column(df, featurizer_type)
+    def _release_fit_inputs(self):
+        """
+        Stop referencing the dataframes fitted on, as they are not needed once
+        they are transformed. The input objects of the converted dataframe
+        are then freed as soon as they are featurized.
 
-                    for f in featurizers:
-                        logger.info(
-                            self._log_prefix + "Featurizing with {}."
-                            "".format(f.__class__.__name__)
-                        )
-                        df = f.featurize_dataframe(
-                            df,
+        Returns:
+            (pandas.DataFrame): The converted dataframe fitted on.
+        """
+        df = self.converted_input_df
+        self.fitted_input_df = None
+        self.converted_input_df = None
+        return df
+
+    def _featurizer_pool(self):
+        """
+        Get a pool of workers applying all featurizers of each featurizer type
+        in a single task per input object. Use as a context manager.
+
+        Returns:
+            (FeaturizerPool): The pool, started on first use.
+        """
+        analysis_caches = []
+        if self.share_neighbors or self.neighbor_cache_dir:
+            analysis_caches.append(NeighborCache(store_dir=self.neighbor_cache_dir))
+        if self.share_symmetry or self.symmetry_cache_dir:
+            analysis_caches.append(SymmetryCache(store_dir=self.symmetry_cache_dir))
+        return FeaturizerPool(
+            {ftype: fs for ftype, fs in self.featurizers.items() if fs},
+            n_jobs=self.n_jobs,
+            ignore_errors=self.ignore_errors,
+            analysis_caches=analysis_caches,
+            sample_timeout=self.sample_timeout,
+            max_memory_mb=self.max_memory_mb,
+            max_tasks_per_worker=self.max_tasks_per_worker,
+        )
+
+    def _featurize_chunk(self, df, pool, converted=False):
+        """
+        Featurize a dataframe (or block of rows) with all featurizers.
+
+        Args:
+            df (pandas.DataFrame): The dataframe not containing features.
+            pool (FeaturizerPool): The pool used to apply featurizers.
+            converted (bool): If True, the dataframe has already been
+                prescreened and its featurizer input columns tidied (e.g., it
+                is a part of converted_input_df).
+
+        Returns:
+            df (pandas.DataFrame): Transformed dataframe containing features.
+        """
+        df, top_level = self._apply_featurizers(df, pool, converted=converted)
+        return self._finish_chunk(df, top_level)
+
+    def _apply_featurizers(self, df, pool, converted=False):
+        """
+        Featurize a dataframe (or block of rows) with all featurizers, except
+        the function featurizer.
+
+        Args:
+            df (pandas.DataFrame): The dataframe not containing features.
+            pool (FeaturizerPool): The pool used to apply featurizers.
+            converted (bool): See _featurize_chunk.
+
+        Returns:
+            df (pandas.DataFrame): The dataframe containing features.
+            top_level ([str]): For each column, "Input Data" or the name of
+                the featurizer giving it.
+        """
+        if not converted:
+            df = self._prescreen_df(df, inplace=True)
+            df = self._add_composition_from_structure(df)
+
+        feature_blocks, block_owners = [], []
+        for featurizer_type, featurizers in self.featurizers.items():
+            if featurizer_type in df.columns:
+                if not converted:
+                    df = self._tidy_column(df, featurizer_type)
+
+                column = df[featurizer_type]
+                if self.drop_inputs:
+                    # Drop the inputs first, so converted input objects are
+                    # freed as soon as they are featurized
+                    df = df.drop(columns=[featurizer_type])
+                if featurizers:
+                    logger.info(
+                        self._log_prefix + "Featurizing {} with {}.".format(
                             featurizer_type,
-                            ignore_errors=self.ignore_errors,
-                            multiindex=self.multiindex,
-                            inplace=False,
+                            ", ".join(f.__class__.__name__ for f in featurizers),
                         )
-                    if self.drop_inputs:
-                        df = df.drop(columns=[featurizer_type])
-                else:
-                    logger.info(
+                    )
+                    block = self._featurize_column(
+                        column, featurizer_type, featurizers, pool
+                    )
+                    if self.precision:
+                        block = downcast(block, self.precision)
+                    feature_blocks.append(block)
+                    for f in featurizers:
+                        n_labels = len(f.feature_labels())
+                        block_owners += [f.__class__.__name__] * n_labels
+                del column
+            else:
+                logger.info(
+                    self._log_prefix
+                    + "Featurizer type {} not in the dataframe. "
+                    "Skipping...".format(featurizer_type)
+                )
+
+        # Assemble all features with a single concatenation
+        top_level = ["Input Data"] * df.shape[1] + block_owners
+        df = pd.concat([df] + feature_blocks, axis=1)
+        self.featurizer_stats = pool.get_stats()
+        if self._sample_cache:
+            self._sample_cache.flush()
+        return df, top_level
+
+    def _finish_chunk(self, df, top_level):
+        """
+        Add the function features to a featurized dataframe (or block of
+        rows), and set its column index.
+
+        Args:
+            df (pandas.DataFrame): The dataframe containing features, as
+                returned by _apply_featurizers.
+            top_level ([str]): As returned by _apply_featurizers.
+
+        Returns:
+            df (pandas.DataFrame): Transformed dataframe containing features.
+        """
+        if self.functionalize:
+            features = self._feature_columns(df, top_level)
+            if self.function_featurizer is None:
+                self._fit_function_featurizer(features)
+            function_block = self.function_featurizer.transform(features)
+            del features
+            if self.precision:
+                function_block = downcast(function_block, self.precision)
+            df = pd.concat([df, function_block], axis=1)
+            top_level += ["FunctionFeaturizer"] * function_block.shape[1]
+
+        if self.multiindex:
+            df.columns = pd.MultiIndex.from_arrays([top_level, df.columns])
+        return df
+
+    @staticmethod
+    def _feature_columns(df, top_level):
+        """
+        Get the features of a featurized dataframe, without the input data
+        (e.g., the target), as only the features are functionalized.
+        """
+        n_inputs = top_level.count("Input Data")
+        return df.iloc[:, n_inputs:]
+
+    def _fit_function_featurizer(self, features):
+        """
+        Fit the function featurizer, pruning the function features which are
+        constant or duplicate other features of a featurized dataframe.
+        """
+        self.function_featurizer = VectorizedFunctionFeaturizer()
+        self.function_featurizer.fit(features)
+        logger.info(
+            self._log_prefix + "Pruned {} constant or duplicate function "
+            "features.".format(self.function_featurizer.n_pruned)
+        )
+
+    def _transform_from_cache(
+        self, df, target, prevent_cache_overwrite=False, chunk_size=None
+    ):
+        """
+        Restore the features of a dataframe from cache_src.
+
+        Samples (by index) not present in the cache are featurized and, unless
+        prevent_cache_overwrite, merged into the cache, so only new samples
+        need to be featurized.
+
+        Args:
+            df (pandas.DataFrame): The dataframe not containing features.
+            target (str): The ML-target property contained in the df.
+            prevent_cache_overwrite (bool): If True, does not try to write any
+                new features to the cache.
+            chunk_size (int): If set, featurize missing entries in blocks of
+                chunk_size rows.
+
+        Returns:
+            df (pandas.DataFrame): Transformed dataframe containing features.
+        """
+        # Only the missing samples (if any) are featurized below
+        self.featurizer_stats = {}
+        logger.debug(
+            self._log_prefix + "Reading cache_src {}".format(self.cache_src)
+        )
+        cached_subdf = load_feature_cache(self.cache_src, index=df.index)
+        n_cached = len(cached_subdf.index)
+        missing = df.index[~df.index.isin(cached_subdf.index)]
+
+        if len(missing):
+            if self.fit_from_cache and self.needs_fit:
+                raise AutomatminerError(
+                    "Feature cache does not contain all entries (by DataFrame "
+                    "index) needed to transform the input df, and the missing "
+                    "entries cannot be featurized as the fittable featurizers "
+                    "were not fit (fitting was skipped as the cache was found)."
+                )
+            logger.info(
+                self._log_prefix + "Feature cache does not contain {} of {} "
+                "entries. Featurizing missing entries.".format(
+                    len(missing), len(df.index)
+                )
+            )
+            missing_df = self._featurize(df.loc[missing], chunk_size=chunk_size)
+            mismatch = compare_columns(cached_subdf, missing_df)
+            if mismatch["mismatch"]:
+                logger.warning(
+                    self._log_prefix + "Features of new entries do not match "
+                    "the features in the cache. Aligning to cached features: "
+                    "{}".format(mismatch)
+                )
+                missing_df = missing_df.reindex(columns=cached_subdf.columns)
+
+            if not prevent_cache_overwrite:
+                cached_df = load_feature_cache(self.cache_src)
+                store_feature_cache(
+                    pd.concat([cached_df, missing_df], sort=False), self.cache_src
+                )
+                logger.info(
+                    self._log_prefix + "Added {} entries to cache {}."
+                    "".format(len(missing), self.cache_src)
+                )
+            cached_subdf = pd.concat([cached_subdf, missing_df], sort=False)
+            cached_subdf = cached_subdf.loc[df.index]
+
+        if target in cached_subdf.columns:
+            if target not in df.columns:
+                logger.warn(
+                    self._log_prefix
+                    + "Target not present in both cached df and input df."
+                    " Cannot perform comparison to ensure index match."
+                )
+            else:
+                cached_targets = cached_subdf[target]
+                input_targets = df[target]
+                cached_type = regression_or_classification(cached_targets)
+                input_type = regression_or_classification(input_targets)
+                if cached_type != input_type:
+                    raise AutomatminerError(
+                        "Cached targets appear to be '{}' type, while "
+                        "input targets appear to be '{}'."
+                        "".format(cached_type, input_type)
+                    )
+
+                problems = {}
+                for ix in input_targets.index:
+                    iv = input_targets[ix]
+                    cv = cached_targets[ix]
+                    if iv != cv:
+                        try:
+                            if not math.isclose(iv, cv):
+                                problems[ix] = [iv, cv]
+                        except TypeError:
+                            pass
+                if problems:
+                    logger.warning(
                         self._log_prefix
-                        + "Featurizer type {} not in the dataframe. "
-                        "Skipping...".format(featurizer_type)
+                        + "Mismatch between cached targets and input "
+                        "targets: \n{}".format(problems)
                     )
-            if self.functionalize:
-                ff = FunctionFeaturizer()
-                ff.set_n_jobs(self.n_jobs)
-                cols = df.columns.tolist()
-                for ft in self.featurizers.keys():
-                    if ft in cols:
-                        cols.pop(ft)
-                df = ff.fit_featurize_dataframe(
-                    df,
-                    cols,
-                    ignore_errors=self.ignore_errors,
-                    multiindex=self.multiindex,
-                    inplace=False,
+
+        logger.info(
+            self._log_prefix + "Restored {} features on {} samples from "
+            "cache {}".format(len(cached_subdf.columns), n_cached, self.cache_src)
+        )
+        if self.sparse_features:
+            # Feature caches are stored dense
+            sparse_cols = [
+                label
+                for featurizers in self.featurizers.values()
+                for f in featurizers
+                if self._has_sparse_features(f)
+                for label in f.feature_labels()
+                if label in cached_subdf.columns
+            ]
+            cached_subdf[sparse_cols] = cached_subdf[sparse_cols].astype(
+                pd.SparseDtype(float, 0.0)
+            )
+        if self.precision:
+            cached_subdf = downcast(cached_subdf, self.precision, ignore=[target])
+        return cached_subdf
+
+    def _featurize_column(self, column, featurizer_type, featurizers, pool):
+        """
+        Featurize a column of input objects with all featurizers of its
+        featurizer type.
+
+        Compositions (and structures, if dedupe_structures is set) are
+        deduplicated before featurization: each unique (oxidation state
+        decorated) composition is featurized once, and its features are
+        broadcast to all rows containing it. If the per-sample cache is
+        enabled, features of entries already in the cache are restored, and
+        only the remaining unique entries are featurized (with only the
+        featurizers they are missing).
+
+        Args:
+            column (pandas.Series): The featurizer input objects.
+            featurizer_type (str): The featurizer type of the column.
+            featurizers ([BaseFeaturizer]): The featurizers to apply.
+            pool (FeaturizerPool): The pool used to apply featurizers.
+
+        Returns:
+            (pandas.DataFrame): The features of all featurizers, indexed like
+                column.
+        """
+        entries = column.tolist()
+        n_samples = len(entries)
+        inverse = None
+        if featurizer_type == self.composition_col:
+            entries, inverse = unique_entries(entries)
+        elif featurizer_type == self.structure_col:
+            if self.dedupe_structures == "hash":
+                entries, inverse = unique_entries(entries)
+            elif self.dedupe_structures == "matcher":
+                entries, inverse = match_structures(entries)
+        if inverse is not None:
+            logger.debug(
+                self._log_prefix + "Featurizing {} unique {} entries of {} "
+                "samples.".format(len(entries), featurizer_type, n_samples)
+            )
+
+        if self._sample_cache:
+            keys = [hash_entry(e) for e in entries]
+            found = [self._sample_cache.lookup(f, keys) for f in featurizers]
+            missing = {}
+            for i, k in enumerate(keys):
+                if k not in missing:
+                    which = [
+                        j for j, f_found in enumerate(found) if k not in f_found
+                    ]
+                    if which:
+                        missing[k] = (i, which)
+
+            if missing:
+                logger.debug(
+                    self._log_prefix + "{} of {} unique samples not present in "
+                    "feature cache for {} featurizers.".format(
+                        len(missing), len(set(keys)), featurizer_type
+                    )
+                )
+                results = self._featurize_entries(
+                    [entries[i] for i, _ in missing.values()],
+                    featurizer_type,
+                    featurizers,
+                    pool,
+                    [which for _, which in missing.values()],
                 )
-            if (
-                self.cache_src
-                and not os.path.exists(self.cache_src)
-                and not prevent_cache_overwrite
-            ):
-                store_dataframe_as_json(df, self.cache_src)
-            return df
+                for f, f_found, f_rows in zip(featurizers, found, results):
+                    new = {k: r for k, r in zip(missing, f_rows) if r is not None}
+                    # Features of samples exceeding the limits are not cached
+                    cacheable = {
+                        k: r
+                        for k, r in new.items()
+                        if not isinstance(r, LimitExceededRow)
+                    }
+                    self._sample_cache.update(
+                        f, list(cacheable), list(cacheable.values())
+                    )
+                    f_found.update(new)
+            rows = [[f_found[k] for k in keys] for f_found in found]
+        else:
+            rows = self._featurize_entries(
+                entries, featurizer_type, featurizers, pool
+            )
+
+        if inverse is not None:
+            rows = broadcast_rows(rows, inverse)
+
+        labels = [f.feature_labels() for f in featurizers]
+        sparse = [self._has_sparse_features(f) for f in featurizers]
+        return features_to_frame(rows, labels, column.index, sparse=sparse)
+
+    def _has_sparse_features(self, featurizer):
+        """
+        Whether the features of a featurizer are stored as sparse columns.
+
+        Args:
+            featurizer (BaseFeaturizer): The featurizer.
+
+        Returns:
+            (bool): True if the features are sparse.
+        """
+        if self.sparse_features is True:
+            sparse_fcls = StructureFeaturizers.sparse_names
+        else:
+            sparse_fcls = self.sparse_features or []
+        return featurizer.__class__.__name__ in sparse_fcls
+
+    def _featurize_entries(
+        self, entries, featurizer_type, featurizers, pool, which=None
+    ):
+        """
+        Featurize input objects with the pool, checkpointing the features of
+        each featurizer on each chunk of checkpoint_size entries if
+        checkpoint_dir is set. Chunks already checkpointed (e.g., by an
+        interrupted transform) are restored instead of featurized.
+
+        Args:
+            entries ([object]): The featurizer input objects.
+            featurizer_type (str): The featurizer type of the entries.
+            featurizers ([BaseFeaturizer]): The featurizers of the type.
+            pool (FeaturizerPool): The pool used to apply featurizers.
+            which ([[int]]): For each entry, the indices of the featurizers to
+                apply. If None, all featurizers are applied to all entries.
+
+        Returns:
+            ([[list]]): As returned by FeaturizerPool.featurize.
+        """
+        if not self.checkpoint_dir:
+            return pool.featurize(featurizer_type, entries, which)
+
+        checkpoint = FeaturizationCheckpoint(self.checkpoint_dir)
+        if which is None:
+            which = [list(range(len(featurizers)))] * len(entries)
+        fkeys = [hash_featurizer(f) for f in featurizers]
+        rows = [[] for _ in featurizers]
+        for start in range(0, len(entries), self.checkpoint_size):
+            chunk = entries[start:start + self.checkpoint_size]
+            chunk_which = which[start:start + self.checkpoint_size]
+            keys = [hash_entry(e) for e in chunk]
+            masks = [[i in w for w in chunk_which] for i in range(len(featurizers))]
+            units = [
+                checkpoint.load(fkey, keys, mask)
+                if any(mask)
+                else [None] * len(chunk)
+                for fkey, mask in zip(fkeys, masks)
+            ]
+            remaining = [[i for i in w if units[i] is None] for w in chunk_which]
+            if any(remaining):
+                results = pool.featurize(featurizer_type, chunk, remaining)
+                for i, unit in enumerate(units):
+                    if unit is None:
+                        units[i] = results[i]
+                        # Units with samples exceeding the limits are redone
+                        if not any(
+                            isinstance(r, LimitExceededRow) for r in units[i]
+                        ):
+                            checkpoint.save(fkeys[i], keys, masks[i], units[i])
+            for f_rows, unit in zip(rows, units):
+                f_rows.extend(unit)
+
+        if checkpoint.restored:
+            logger.info(
+                self._log_prefix + "Restored {} checkpointed chunks of {} "
+                "features from {}.".format(
+                    checkpoint.restored, featurizer_type, self.checkpoint_dir
+                )
+            )
+        return rows
 
     def _prescreen_df(self, df, inplace=True):
         """
@@ -545,7 +1426,8 @@ class AutoFeaturizer(DFTransformer):
 
         Returns:
             df (pandas.DataFrame): DataFrame with featurizer_type column
-                ready for featurization.
+                ready for featurization. Converted columns are replaced in a
+                copy, so the input dataframe is never modified.
         """
         # todo: Make the following conversions more robust (no [0] type checking)
         type_tester = df[featurizer_type].iloc[0]
@@ -565,7 +1447,7 @@ class AutoFeaturizer(DFTransformer):
                 df = stc.featurize_dataframe(
                     df,
                     featurizer_type,
-                    multiindex=self.multiindex,
+                    multiindex=False,
                     ignore_errors=True,
                     inplace=False,
                 )
@@ -575,9 +1457,13 @@ class AutoFeaturizer(DFTransformer):
                     self._log_prefix + "Compositions detected as dicts. Attempting "
                     "conversion to Composition objects..."
                 )
-                df[featurizer_type] = [
-                    Composition.from_dict(d) for d in df[featurizer_type]
-                ]
+                df = df.assign(
+                    **{
+                        featurizer_type: [
+                            Composition.from_dict(d) for d in df[featurizer_type]
+                        ]
+                    }
+                )
 
             # Convert non-oxidstate containing comps to oxidstate comps
             if self.guess_oxistates:
@@ -586,20 +1472,11 @@ class AutoFeaturizer(DFTransformer):
                     + "Guessing oxidation states of compositions, as"
                     " they were not present in input."
                 )
-                cto = CompositionToOxidComposition(
-                    target_col_id=featurizer_type,
-                    overwrite_data=True,
-                    return_original_on_error=True,
-                    max_sites=-50,
-                )
-                cto.set_n_jobs(self.n_jobs)
                 try:
-                    df = cto.featurize_dataframe(
-                        df,
-                        featurizer_type,
-                        multiindex=self.multiindex,
-                        inplace=False,
+                    decorated = self._guess_oxidation_states(
+                        df[featurizer_type], max_sites=-50
                     )
+                    df = df.assign(**{featurizer_type: decorated})
                 except Exception as e:
                     logger.warning(
                         self._log_prefix + "Could not decorate oxidation states due "
@@ -607,6 +1484,25 @@ class AutoFeaturizer(DFTransformer):
                         "may not work".format(e)
                     )
 
+        elif (
+            featurizer_type in (self.bandstruct_col, self.dos_col)
+            and self.compact_electronic
+        ):
+            if isinstance(type_tester, str):
+                raise ValueError(
+                    "{} column is type {}. Cannot convert."
+                    "".format(featurizer_type, type(type_tester))
+                )
+            logger.info(
+                self._log_prefix + "Compacting {} objects.".format(featurizer_type)
+            )
+            store_dir = self.compact_electronic
+            compacted = compact_electronic_structures(
+                df[featurizer_type],
+                store_dir=store_dir if isinstance(store_dir, str) else None,
+            )
+            df = df.assign(**{featurizer_type: compacted})
+
         else:
             # Convert structure/bs/dos dicts to objects (robust already)
             if isinstance(type_tester, (dict, str)):
@@ -634,20 +1530,11 @@ class AutoFeaturizer(DFTransformer):
                     + "Guessing oxidation states of structures if they were "
                     "not present in input."
                 )
-                sto = StructureToOxidStructure(
-                    target_col_id=featurizer_type,
-                    overwrite_data=True,
-                    return_original_on_error=True,
-                    max_sites=30,
-                )
-                sto.set_n_jobs(self.n_jobs)
                 try:
-                    df = sto.featurize_dataframe(
-                        df,
-                        featurizer_type,
-                        multiindex=self.multiindex,
-                        inplace=False,
+                    decorated = self._guess_oxidation_states(
+                        df[featurizer_type], max_sites=30
                     )
+                    df = df.assign(**{featurizer_type: decorated})
                 except Exception as e:
                     logger.info(
                         self._log_prefix
@@ -656,6 +1543,36 @@ class AutoFeaturizer(DFTransformer):
                     )
         return df
 
+    def _guess_oxidation_states(self, column, max_sites):
+        """
+        Guess oxidation states of compositions or structures, using the
+        oxidation state memo shared by this process so each formula is only
+        guessed once. If sample_cache_dir is set, the memo is also saved there,
+        so guesses persist between processes.
+
+        Args:
+            column (pandas.Series): The compositions or structures.
+            max_sites (int): Passed to the oxidation state guessing methods.
+
+        Returns:
+            ([Composition or Structure]): The decorated compositions or
+                structures.
+        """
+        memo = get_oxidation_state_memo()
+        memo_path = None
+        if self.sample_cache_dir:
+            memo_path = os.path.join(self.sample_cache_dir, AMM_OXI_MEMO_FILE)
+            if memo_path not in memo.loaded_paths:
+                memo.load(memo_path)
+
+        decorated = guess_oxidation_states(
+            column.tolist(), max_sites, n_jobs=self.n_jobs, memo=memo
+        )
+        if memo_path and memo.modified:
+            os.makedirs(self.sample_cache_dir, exist_ok=True)
+            memo.dump(memo_path)
+        return decorated
+
     def _add_composition_from_structure(self, df, overwrite=True):
         """
         Automatically deduce compositions from structures if:
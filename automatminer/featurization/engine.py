@@ -0,0 +1,975 @@
+"""
+The parallel featurization engine used by AutoFeaturizer.
+
+All featurizers of a featurizer type (e.g., all structure featurizers) are
+applied to an input object in a single task, by one pool of worker processes
+which lives for an entire transform. Compared to calling featurize_dataframe
+once per featurizer, each input object is sent to the workers once instead of
+once per featurizer, and the pool (and the pickled featurizers) is not
+recreated between featurizers.
+"""
+
+import time
+import signal
+import logging
+import threading
+import contextlib
+import multiprocessing
+import multiprocessing.connection
+from collections import Counter, deque
+
+try:
+    import resource
+except ImportError:
+    resource = None
+
+import numpy as np
+import pandas as pd
+from pymatgen import Specie, Structure
+
+from automatminer.utils.pkg import AutomatminerError
+from automatminer.featurization.cache import hash_entry
+from automatminer.featurization.compact import materialize
+from automatminer.featurization.vectorized import (
+    featurize_vectorized,
+    is_vectorizable,
+)
+
+__author__ = ["Alex Dunn <ardunn@lbl.gov>"]
+
+logger = logging.getLogger(__name__)
+
+# The StructureMatcher options of match_structures. Structures are not
+# rescaled and the tolerances are tight, so only structures identical up to
+# the choice of cell (e.g., supercells) are matched, and strained or
+# distorted copies of a structure are not.
+AMM_MATCHER_KWARGS = {
+    "scale": False,
+    "ltol": 1e-3,
+    "stol": 1e-3,
+    "angle_tol": 0.01,
+}
+
+# The extra time (s) a featurizer may take beyond the sample timeout before
+# its worker process is killed by the pool, for featurizers which are not
+# interrupted by the timeout (e.g., hung in a call to compiled code).
+AMM_WORKER_KILL_GRACE = 1.0
+
+# The featurizers and options of a worker process. Set once per worker when
+# it starts, so featurizers are not pickled for every task.
+_WORKER_STATE = {}
+
+
+class FeaturizationTimeoutError(AutomatminerError):
+    """
+    Raised when featurizing a sample takes longer than the sample timeout.
+
+    Like all AutomatminerErrors, it is not an Exception, so featurizers
+    catching Exception do not swallow it. It is raised in the worker process
+    between Python bytecodes; featurizers which are not interrupted by it
+    (e.g., hung in a single call to compiled code) are stopped by the pool
+    killing their worker process.
+    """
+
+    def __str__(self):
+        return "FeaturizationTimeoutError : " + self.msg
+
+
+class LimitExceededRow(list):
+    """
+    The NaN features of a featurizer which exceeded the sample timeout or the
+    memory limit on an entry. They depend on the limits (and the machine), so
+    they are not saved to per-sample caches or checkpoints.
+    """
+
+
+def _initialize_worker(
+    featurizers, ignore_errors, analysis_caches, sample_timeout, max_memory_mb
+):
+    _WORKER_STATE["featurizers"] = featurizers
+    _WORKER_STATE["ignore_errors"] = ignore_errors
+    _WORKER_STATE["analysis_caches"] = analysis_caches
+    _WORKER_STATE["sample_timeout"] = sample_timeout
+    if max_memory_mb:
+        _limit_memory(max_memory_mb)
+
+
+def _run_worker(conn, initargs):
+    """
+    Run the tasks sent by a FeaturizerPool through a pipe, until it sends
+    None. Messages sent back are ("start", i) when featurizer i starts on the
+    entry of the task, then ("result", result) or ("error", error).
+    """
+    _initialize_worker(*initargs)
+    while True:
+        task = conn.recv()
+        if task is None:
+            break
+        task_func, args = task
+        try:
+            conn.send(("result", task_func(args, conn.send)))
+        except (Exception, AutomatminerError) as e:
+            try:
+                conn.send(("error", e))
+            except Exception:
+                # The error cannot be pickled
+                conn.send(("error", AutomatminerError(repr(e))))
+
+
+def _featurize_task(task, send):
+    featurizer_type, entry, which = task
+    return _apply_and_measure(
+        _WORKER_STATE["featurizers"][featurizer_type],
+        entry,
+        which,
+        _WORKER_STATE["ignore_errors"],
+        _WORKER_STATE["analysis_caches"],
+        _WORKER_STATE["sample_timeout"],
+        on_start=lambda i: send(("start", i)),
+    )
+
+
+def _precheck_task(task, send):
+    featurizer_type, entry, which = task
+    return precheck_featurizers(
+        _WORKER_STATE["featurizers"][featurizer_type], entry, which=which
+    )
+
+
+def apply_featurizers(featurizers, entry, which=None, ignore_errors=True) -> list:
+    """
+    Apply several featurizers to a single input object.
+
+    Args:
+        featurizers ([BaseFeaturizer]): The (fitted) featurizers.
+        entry (object): The featurizer input, e.g., a pymatgen Structure.
+        which ([int]): Indices of the featurizers to apply. If None, all
+            featurizers are applied.
+        ignore_errors (bool): If True, featurizers failing on the entry return
+            NaN features instead of raising.
+
+    Returns:
+        ([list]): The feature vector of each featurizer, or None for
+            featurizers not in which.
+    """
+    return _apply_and_measure(featurizers, entry, which, ignore_errors)[0]
+
+
+def _apply_and_measure(
+    featurizers,
+    entry,
+    which,
+    ignore_errors,
+    analysis_caches=(),
+    sample_timeout=None,
+    on_start=None,
+):
+    """
+    Apply featurizers to an input object, and measure the time taken, whether
+    it failed, and the number of NaN features of each featurizer. If analysis
+    caches (e.g., a NeighborCache) are given, they are active for the entry,
+    so their analyses of the entry are shared by all featurizers. Featurizers
+    taking longer than sample_timeout seconds on the entry are interrupted,
+    and fail with a LimitExceededRow, as do featurizers running out of
+    memory. Compacted entries (e.g., CompactElectronicStructure) are
+    materialized once for all featurizers. If given, on_start is called with
+    the index of each featurizer before it is applied.
+
+    Returns:
+        rows ([list]): As returned by apply_featurizers.
+        measurements ([tuple]): For each featurizer applied, its index, the
+            time taken (s), 1 if it failed else 0, and the number of NaN
+            features.
+    """
+    entry = materialize(entry)
+    if analysis_caches:
+        with contextlib.ExitStack() as stack:
+            for cache in analysis_caches:
+                stack.enter_context(cache.activate(entry))
+            return _apply_and_measure(
+                featurizers,
+                entry,
+                which,
+                ignore_errors,
+                sample_timeout=sample_timeout,
+                on_start=on_start,
+            )
+
+    which = range(len(featurizers)) if which is None else which
+    rows = [None] * len(featurizers)
+    measurements = []
+    for i in which:
+        f = featurizers[i]
+        failed = 0
+        if on_start is not None:
+            on_start(i)
+        start = time.perf_counter()
+        try:
+            with _time_limit(sample_timeout):
+                rows[i] = f.featurize_wrapper((entry,), ignore_errors=False)
+        except (Exception, FeaturizationTimeoutError) as e:
+            if not ignore_errors:
+                raise
+            if isinstance(e, FeaturizationTimeoutError):
+                logger.debug(
+                    "{} timed out on {}.".format(f.__class__.__name__, entry)
+                )
+            nan_row = [float("nan")] * len(f.feature_labels())
+            if isinstance(e, (FeaturizationTimeoutError, MemoryError)):
+                rows[i] = LimitExceededRow(nan_row)
+            else:
+                rows[i] = nan_row
+            failed = 1
+        elapsed = time.perf_counter() - start
+        n_nan = sum(1 for v in rows[i] if isinstance(v, float) and v != v)
+        measurements.append((i, elapsed, failed, n_nan))
+    return rows, measurements
+
+
+@contextlib.contextmanager
+def _time_limit(seconds):
+    """
+    Raise FeaturizationTimeoutError in the enclosed block after a number of
+    seconds, using SIGALRM. No limit is set if seconds is None, or where
+    SIGALRM cannot be used (on Windows, or outside of the main thread).
+    """
+    if (
+        not seconds
+        or not hasattr(signal, "SIGALRM")
+        or threading.current_thread() is not threading.main_thread()
+    ):
+        yield
+        return
+
+    def handler(signum, frame):
+        raise FeaturizationTimeoutError(
+            "Featurization exceeded the sample timeout of {} s.".format(seconds)
+        )
+
+    previous = signal.signal(signal.SIGALRM, handler)
+    signal.setitimer(signal.ITIMER_REAL, seconds)
+    try:
+        yield
+    finally:
+        signal.setitimer(signal.ITIMER_REAL, 0)
+        signal.signal(signal.SIGALRM, previous)
+
+
+def _limit_memory(max_memory_mb):
+    """
+    Limit the address space of this (worker) process to its current size
+    plus max_memory_mb, so allocations beyond the limit raise MemoryError
+    instead of exhausting the memory of the node. The limit is relative, as
+    forked workers start with the (possibly large) address space of their
+    parent.
+    """
+    if resource is None:
+        logger.warning("Memory limits are not supported on this platform.")
+        return
+    limit = _address_space() + int(max_memory_mb * 1024 ** 2)
+    _, hard = resource.getrlimit(resource.RLIMIT_AS)
+    if hard != resource.RLIM_INFINITY:
+        limit = min(limit, hard)
+    resource.setrlimit(resource.RLIMIT_AS, (limit, hard))
+
+
+def _address_space():
+    """
+    The size (bytes) of the address space of this process, or 0 where /proc
+    is not available (e.g., on macOS, which does not enforce the limit).
+    """
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[0]) * resource.getpagesize()
+    except (OSError, ValueError, IndexError):
+        return 0
+
+
+def precheck_featurizers(featurizers, entry, which=None) -> list:
+    """
+    Precheck several featurizers on a single input object.
+
+    Args:
+        featurizers ([BaseFeaturizer]): The featurizers.
+        entry (object): The featurizer input, e.g., a pymatgen Structure.
+        which ([int]): Indices of the featurizers to precheck. If None, all
+            featurizers are prechecked.
+
+    Returns:
+        ([bool]): Whether the entry passes the precheck of each featurizer,
+            the error if prechecking raised an AttributeError, ValueError, or
+            KeyError, or None for featurizers not in which.
+    """
+    which = range(len(featurizers)) if which is None else which
+    entry = materialize(entry)
+    passed = [None] * len(featurizers)
+    for i in which:
+        try:
+            passed[i] = bool(featurizers[i].precheck(entry))
+        except (AttributeError, ValueError, KeyError) as e:
+            passed[i] = e
+    return passed
+
+
+def unique_entries(entries, key=hash_entry) -> tuple:
+    """
+    Find the unique input objects in a list of input objects.
+
+    Args:
+        entries ([object]): The input objects, e.g., pymatgen Compositions.
+        key (callable): Maps an input object to a hashable key; objects with
+            equal keys are considered identical. Defaults to the content hash
+            used by the per-sample feature cache.
+
+    Returns:
+        unique ([object]): The first occurrence of each unique input object.
+        inverse ([int]): For each entry, the index of its unique object, such
+            that entries[i] is equivalent to unique[inverse[i]].
+    """
+    positions = {}
+    unique, inverse = [], []
+    for e in entries:
+        k = key(e)
+        if k not in positions:
+            positions[k] = len(unique)
+            unique.append(e)
+        inverse.append(positions[k])
+    return unique, inverse
+
+
+def fit_representatives(featurizer, entries) -> list:
+    """
+    Get the entries a featurizer needs to be fit on to be fit exactly as if it
+    were fit on all entries.
+
+    BagofBonds, BondFractions and PartialRadialDistributionFunction are fit by
+    enumerating the bags, bond types or element pairs of every structure,
+    which only depend on the number of sites of each element (BagofBonds),
+    the species (BondFractions) or the elements
+    (PartialRadialDistributionFunction) of the structure. These featurizers
+    only need one structure per unique number of sites of each element,
+    species or elements, usually a small fraction of a large dataset. Other
+    featurizers need all entries.
+
+    Args:
+        featurizer (BaseFeaturizer): The featurizer to be fit.
+        entries ([object]): The input objects, e.g., pymatgen Structures.
+
+    Returns:
+        ([object]): The entries the featurizer should be fit on, in order.
+    """
+    key = _FIT_KEYS.get(featurizer.__class__.__name__)
+    if key is None:
+        return list(entries)
+
+    def safe_key(entry):
+        # Entries without a key (e.g., NaN) are all kept, so fitting on them
+        # fails like fitting on all entries would
+        try:
+            return key(entry)
+        except AttributeError:
+            return id(entry)
+
+    return unique_entries(entries, key=safe_key)[0]
+
+
+def _element(species):
+    """
+    The element of a species, as determined by the fittable featurizers.
+    """
+    return species.element if isinstance(species, Specie) else species
+
+
+# Map the class names of the fittable structure featurizers to functions of a
+# structure determining everything the featurizer is fit on.
+_FIT_KEYS = {
+    "BagofBonds": lambda s: frozenset(
+        Counter(_element(site.specie) for site in s.sites).items()
+    ),
+    "BondFractions": lambda s: frozenset(str(el) for el in s.composition.elements),
+    "PartialRadialDistributionFunction": lambda s: frozenset(
+        _element(sp) for sp in s.composition.keys()
+    ),
+}
+
+
+def match_structures(structures, **matcher_kwargs) -> tuple:
+    """
+    Find the symmetrically distinct structures in a list of structures.
+
+    Structures are first deduplicated by content hash, then the remaining
+    structures are grouped with pymatgen's StructureMatcher. Each group is
+    represented by its first structure. Entries which are not structures
+    (e.g., NaN for failed conversions) are only deduplicated by hash.
+
+    Args:
+        structures ([Structure]): The structures.
+        **matcher_kwargs: Keyword arguments passed to StructureMatcher,
+            overriding AMM_MATCHER_KWARGS.
+
+    Returns:
+        unique ([Structure]): One representative of each group of equivalent
+            structures.
+        inverse ([int]): For each structure, the index of its representative.
+    """
+    unique, inverse = unique_entries(structures)
+    candidates = [i for i, s in enumerate(unique) if isinstance(s, Structure)]
+    positions = {id(unique[i]): i for i in candidates}
+    representative = list(range(len(unique)))
+    if candidates:
+        from pymatgen.analysis.structure_matcher import StructureMatcher
+
+        matcher = StructureMatcher(**{**AMM_MATCHER_KWARGS, **matcher_kwargs})
+        groups = matcher.group_structures([unique[i] for i in candidates])
+        for group in groups:
+            first = positions[id(group[0])]
+            for s in group:
+                representative[positions[id(s)]] = first
+
+    matched_unique, matched_positions = [], {}
+    for i, rep in enumerate(representative):
+        if rep not in matched_positions:
+            matched_positions[rep] = len(matched_unique)
+            matched_unique.append(unique[rep])
+    matched_inverse = [matched_positions[representative[i]] for i in inverse]
+    return matched_unique, matched_inverse
+
+
+def broadcast_rows(rows, inverse) -> list:
+    """
+    Map the features of unique input objects back to all input objects.
+
+    Args:
+        rows ([[list]]): For each featurizer, the feature vector of each
+            unique input object.
+        inverse ([int]): The inverse index returned by unique_entries.
+
+    Returns:
+        ([[list]]): For each featurizer, the feature vector of each input
+            object.
+    """
+    return [[f_rows[i] for i in inverse] for f_rows in rows]
+
+
+def features_to_frame(rows, labels, index, sparse=None) -> pd.DataFrame:
+    """
+    Assemble the features of several featurizers into a single dataframe.
+
+    Features of consecutive featurizers giving only floats are written into
+    one contiguous float64 array, so a wide block of features (e.g., from
+    SineCoulombMatrix or XRDPowderPattern) becomes a single pandas block
+    instead of one column per feature. Featurizers giving any other types
+    (e.g., strings, bools, ints) are assembled with pandas type inference, so
+    their features keep their types.
+
+    Numeric features of featurizers giving many mostly-zero features (e.g.,
+    BagofBonds) may instead be stored as sparse columns, holding only their
+    nonzero (including NaN) values.
+
+    Args:
+        rows ([[list]]): For each featurizer, the feature vector of each entry,
+            as returned by FeaturizerPool.featurize.
+        labels ([[str]]): The feature labels of each featurizer.
+        index (pandas.Index): The index of the entries.
+        sparse ([bool]): For each featurizer, whether its numeric features are
+            stored as sparse columns with a fill value of 0. If None, all
+            features are dense.
+
+    Returns:
+        (pandas.DataFrame): The features, with columns in the order of labels.
+    """
+    n_samples = len(index)
+    pieces = []
+    numeric_run = []
+
+    def flush_numeric_run():
+        if numeric_run:
+            width = sum(a.shape[1] for a, _ in numeric_run)
+            data = np.empty((n_samples, width), dtype=np.float64)
+            columns = []
+            start = 0
+            for array, f_labels in numeric_run:
+                data[:, start:start + array.shape[1]] = array
+                start += array.shape[1]
+                columns += list(f_labels)
+            pieces.append(pd.DataFrame(data, index=index, columns=columns))
+            del numeric_run[:]
+
+    sparse = sparse or [False] * len(rows)
+    for f_rows, f_labels, f_sparse in zip(rows, labels, sparse):
+        if _all_floats(f_rows, n_samples, len(f_labels)):
+            if f_sparse:
+                flush_numeric_run()
+                pieces.append(_sparse_frame(f_rows, f_labels, index))
+            else:
+                array = np.array(f_rows, dtype=np.float64)
+                array = array.reshape(n_samples, len(f_labels))
+                numeric_run.append((array, f_labels))
+        else:
+            flush_numeric_run()
+            pieces.append(pd.DataFrame(f_rows, index=index, columns=f_labels))
+    flush_numeric_run()
+
+    if not pieces:
+        return pd.DataFrame(index=index)
+    elif len(pieces) == 1:
+        return pieces[0]
+    return pd.concat(pieces, axis=1)
+
+
+def _all_floats(f_rows, n_samples, n_labels):
+    """
+    Whether the feature vectors of a featurizer all have n_labels features,
+    and all features are floats (not, e.g., bools or ints, which would be
+    coerced to floats by NumPy).
+    """
+    if len(f_rows) != n_samples:
+        return False
+    for row in f_rows:
+        try:
+            if len(row) != n_labels:
+                return False
+        except TypeError:
+            return False
+        for v in row:
+            if not isinstance(v, (float, np.floating)):
+                return False
+    return True
+
+
+def _sparse_frame(f_rows, labels, index):
+    """
+    Assemble the float feature vectors of a featurizer into a dataframe of
+    sparse columns. Only the nonzero (including NaN) features of each row are
+    collected, so the dense array of all features is never built.
+    """
+    from scipy.sparse import csr_matrix
+
+    indptr, indices, data = [0], [np.empty(0, dtype=int)], [np.empty(0)]
+    for row in f_rows:
+        row = np.asarray(row, dtype=np.float64)
+        nonzero = np.flatnonzero(row)
+        indices.append(nonzero)
+        data.append(row[nonzero])
+        indptr.append(indptr[-1] + len(nonzero))
+    matrix = csr_matrix(
+        (np.concatenate(data), np.concatenate(indices), indptr),
+        shape=(len(f_rows), len(labels)),
+    )
+    # Columns of a CSC matrix are contiguous
+    matrix = matrix.tocsc()
+    columns = [
+        pd.arrays.SparseArray.from_spmatrix(matrix[:, [j]])
+        for j in range(matrix.shape[1])
+    ]
+    df = pd.DataFrame(dict(enumerate(columns)), index=index)
+    df.columns = list(labels)
+    return df
+
+
+class _Worker:
+    """
+    A featurization worker process of a FeaturizerPool, running one task at a
+    time, and the state of its task.
+    """
+
+    def __init__(self, initargs):
+        self.conn, child_conn = multiprocessing.Pipe()
+        self.process = multiprocessing.Process(
+            target=_run_worker, args=(child_conn, initargs), daemon=True
+        )
+        self.process.start()
+        child_conn.close()
+        self.n_tasks = 0
+        # The position and args of the running task, the featurizer running,
+        # and when it started
+        self.task = None
+        self.featurizer = None
+        self.started = None
+
+    def submit(self, task_func, position, args):
+        self.conn.send((task_func, args))
+        self.task = (position, args)
+        self.featurizer = None
+        self.started = None
+        self.n_tasks += 1
+
+    def receive(self):
+        """
+        Handle the messages sent by the worker, returning the result of its
+        task when finished, else None. Raises errors raised by the task, and
+        EOFError if the worker died.
+        """
+        while self.conn.poll():
+            kind, value = self.conn.recv()
+            if kind == "start":
+                self.featurizer = value
+                self.started = time.monotonic()
+            elif kind == "error":
+                raise value
+            else:
+                self.task = None
+                return value
+        return None
+
+    def close(self, terminate=False):
+        try:
+            if terminate:
+                self.process.kill()
+            else:
+                self.conn.send(None)
+        except OSError:
+            # The worker died
+            pass
+        self.process.join()
+        self.conn.close()
+
+
+class FeaturizerPool:
+    """
+    A persistent pool of worker processes applying all featurizers of a
+    featurizer type to each input object in one task.
+
+    The pool is started on first use and should be closed when featurization
+    is finished, preferably by using it as a context manager:
+
+        with FeaturizerPool({"structure": [DensityFeatures()]}) as pool:
+            rows = pool.featurize("structure", structures)
+
+    Args:
+        featurizers (dict): Keys are featurizer types (e.g., "structure"), and
+            values are lists of fitted featurizers for each type.
+        n_jobs (int): The number of worker processes. If None, the number of
+            cores is used. If 1, featurization runs serially in this process.
+        ignore_errors (bool): If True, featurizers failing on an entry return
+            NaN features instead of raising.
+        vectorize (bool): If True, featurizers with a vectorized version (see
+            automatminer.featurization.vectorized) featurize all entries at
+            once in this process, giving identical features much faster.
+        analysis_caches ([object]): Caches of analyses (see
+            automatminer.featurization.analysis), active while featurizing
+            each entry, so their analyses are computed once and shared by all
+            featurizers applied to it.
+        sample_timeout (float): If set, the maximum time (s) a featurizer
+            may take on a single entry. Featurizers exceeding it are
+            interrupted (see FeaturizationTimeoutError) and fail on the
+            entry. Featurizers not interrupted within AMM_WORKER_KILL_GRACE
+            seconds more (e.g., hung in compiled code, or on Windows, where
+            SIGALRM is not available) have their worker process killed and
+            replaced, and the other featurizers of the entry are rerun. As
+            this process cannot be killed, featurization always runs in
+            worker processes if set (even with n_jobs=1).
+        max_memory_mb (float): If set, the maximum memory (MB, as address
+            space) each worker process may allocate beyond its size at
+            startup. Featurizers exceeding it fail on the entry with a
+            MemoryError. Featurizers whose worker dies (e.g., killed by the
+            operating system on running out of memory) fail on the entry, and
+            the worker is replaced. As the memory of this process is not
+            limited, featurization always runs in worker processes if set.
+        max_tasks_per_worker (int): If set, each worker process is replaced by
+            a fresh one after featurizing this many entries, releasing any
+            memory leaked or fragmented by featurizers.
+
+    Attributes:
+        measurements (dict): Keys are featurizer types, and values are, for
+            each featurizer, the total time (s) spent featurizing, and the
+            numbers of samples featurized, of failed samples, and of NaN
+            features, accumulated over all calls to featurize.
+    """
+
+    def __init__(
+        self,
+        featurizers,
+        n_jobs=None,
+        ignore_errors=True,
+        vectorize=True,
+        analysis_caches=None,
+        sample_timeout=None,
+        max_memory_mb=None,
+        max_tasks_per_worker=None,
+    ):
+        self.featurizers = featurizers
+        self.n_jobs = multiprocessing.cpu_count() if n_jobs is None else n_jobs
+        self.ignore_errors = ignore_errors
+        self.vectorize = vectorize
+        self.analysis_caches = analysis_caches or []
+        self.sample_timeout = sample_timeout
+        self.max_memory_mb = max_memory_mb
+        self.max_tasks_per_worker = max_tasks_per_worker
+        self.measurements = {
+            ftype: [[0.0, 0, 0, 0] for _ in fs] for ftype, fs in featurizers.items()
+        }
+        self._workers = []
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close(terminate=exc_type is not None)
+
+    def featurize(self, featurizer_type, entries, which=None) -> list:
+        """
+        Featurize input objects with all featurizers of a featurizer type.
+
+        Args:
+            featurizer_type (str): The featurizer type, a key of featurizers.
+            entries ([object]): The input objects.
+            which ([[int]]): For each entry, the indices of the featurizers to
+                apply. If None, all featurizers are applied to all entries.
+
+        Returns:
+            ([[list]]): For each featurizer (in order), the feature vector of
+                each entry, or None for entries it was not applied to. Entries
+                on which a featurizer exceeded the sample timeout or memory
+                limit get a LimitExceededRow.
+        """
+        featurizers = self.featurizers[featurizer_type]
+        totals = self.measurements[featurizer_type]
+        all_featurizers = list(range(len(featurizers)))
+        which = [None] * len(entries) if which is None else which
+        which = [all_featurizers if w is None else w for w in which]
+        rows = [[None] * len(featurizers) for _ in entries]
+
+        # Vectorized featurizers are applied to all entries at once, in this
+        # process; the entries they cannot handle are featurized below
+        for i, f in enumerate(featurizers):
+            if not self.vectorize or not is_vectorizable(f):
+                continue
+            positions = [j for j, w in enumerate(which) if i in w]
+            start = time.perf_counter()
+            f_rows = featurize_vectorized(f, [entries[j] for j in positions])
+            totals[i][0] += time.perf_counter() - start
+            for j, row in zip(positions, f_rows):
+                if row is not None:
+                    rows[j][i] = row
+                    totals[i][1] += 1
+                    totals[i][3] += sum(1 for v in row if v != v)
+
+        remaining = [
+            [i for i in w if rows[j][i] is None] for j, w in enumerate(which)
+        ]
+        to_featurize = [j for j, w in enumerate(remaining) if w]
+        results = self._map(
+            _featurize_task,
+            lambda e, w: _apply_and_measure(
+                featurizers,
+                e,
+                w,
+                self.ignore_errors,
+                self.analysis_caches,
+                self.sample_timeout,
+            ),
+            featurizer_type,
+            [entries[j] for j in to_featurize],
+            [remaining[j] for j in to_featurize],
+        )
+        for j, (entry_rows, measurements) in zip(to_featurize, results):
+            for i, elapsed, failed, n_nan in measurements:
+                rows[j][i] = entry_rows[i]
+                totals[i][0] += elapsed
+                totals[i][1] += 1
+                totals[i][2] += failed
+                totals[i][3] += n_nan
+        return [[r[i] for r in rows] for i in range(len(featurizers))]
+
+    def precheck(self, featurizer_type, entries, which=None) -> list:
+        """
+        Precheck input objects with all featurizers of a featurizer type.
+
+        Args:
+            featurizer_type (str): The featurizer type, a key of featurizers.
+            entries ([object]): The input objects.
+            which ([[int]]): For each entry, the indices of the featurizers to
+                precheck. If None, all featurizers are prechecked.
+
+        Returns:
+            ([[bool]]): For each featurizer (in order), the precheck result of
+                each entry, as returned by precheck_featurizers.
+        """
+        featurizers = self.featurizers[featurizer_type]
+        results = self._map(
+            _precheck_task,
+            lambda e, w: precheck_featurizers(featurizers, e, w),
+            featurizer_type,
+            entries,
+            which,
+        )
+        return [[r[i] for r in results] for i in range(len(featurizers))]
+
+    def get_stats(self) -> dict:
+        """
+        Summarize the performance of each featurizer over all calls to
+        featurize.
+
+        Returns:
+            (dict): Keys are featurizer types, and values are dicts of stats for
+                each featurizer (keyed by class name) which featurized any
+                samples: the CPU time spent featurizing (s, summed over
+                workers, so greater than the elapsed time when n_jobs > 1),
+                the samples featurized per CPU second, the numbers of samples
+                featurized and failed, and the fraction of NaN features.
+        """
+        stats = {}
+        for ftype, featurizers in self.featurizers.items():
+            ftype_stats = {}
+            for f, totals in zip(featurizers, self.measurements[ftype]):
+                elapsed, n_samples, n_errors, n_nan = totals
+                if not n_samples:
+                    continue
+                name = f.__class__.__name__
+                if name in ftype_stats:
+                    name += " ({})".format(len(ftype_stats) + 1)
+                n_features = n_samples * len(f.feature_labels())
+                ftype_stats[name] = {
+                    "cpu_time_s": elapsed,
+                    "samples_per_cpu_s": n_samples / elapsed if elapsed else None,
+                    "n_samples": n_samples,
+                    "n_errors": n_errors,
+                    "nan_fraction": n_nan / n_features if n_features else 0.0,
+                }
+            if ftype_stats:
+                stats[ftype] = ftype_stats
+        return stats
+
+    def close(self, terminate=False) -> None:
+        """
+        Shut down the worker processes, if started.
+
+        Args:
+            terminate (bool): If True, stop workers immediately instead of
+                waiting for them to finish.
+
+        Returns:
+            None
+        """
+        for worker in self._workers:
+            worker.close(terminate=terminate or worker.task is not None)
+        self._workers = []
+
+    def _map(self, task_func, serial_func, featurizer_type, entries, which):
+        """
+        Run a task for each entry, in the worker processes if parallel.
+        """
+        which = [None] * len(entries) if which is None else which
+        if not entries or (
+            not self.max_memory_mb
+            and not self.sample_timeout
+            and (self.n_jobs == 1 or len(entries) <= 1)
+        ):
+            return [serial_func(e, w) for e, w in zip(entries, which)]
+        tasks = [(featurizer_type, e, w) for e, w in zip(entries, which)]
+        try:
+            return self._run(task_func, tasks)
+        except BaseException:
+            # Workers may still be running tasks of this call
+            self.close(terminate=True)
+            raise
+
+    def _run(self, task_func, tasks):
+        """
+        Run tasks in the worker processes, one at a time per worker. Workers
+        exceeding the sample timeout, or dying, while featurizing are
+        replaced; the featurizer running fails on the entry (or raises, if
+        not ignore_errors), and the other featurizers of the entry are rerun.
+        """
+        if not self._workers:
+            logger.debug(
+                "Starting pool of {} featurization workers.".format(self.n_jobs)
+            )
+            self._workers = [self._start_worker() for _ in range(self.n_jobs)]
+        queue = deque(enumerate(tasks))
+        results = [None] * len(tasks)
+        # The rows and measurements of featurizers failed by killed workers
+        failures = [[] for _ in tasks]
+        kill_after = (self.sample_timeout or 0) + AMM_WORKER_KILL_GRACE
+        while True:
+            for k, worker in enumerate(self._workers):
+                if worker.task is not None or not queue:
+                    continue
+                if (
+                    self.max_tasks_per_worker
+                    and worker.n_tasks >= self.max_tasks_per_worker
+                ):
+                    worker.close()
+                    worker = self._workers[k] = self._start_worker()
+                worker.submit(task_func, *queue.popleft())
+            busy = [w for w in self._workers if w.task is not None]
+            if not busy:
+                break
+
+            timeout = None
+            if self.sample_timeout:
+                deadlines = [
+                    w.started + kill_after for w in busy if w.started is not None
+                ]
+                if deadlines:
+                    timeout = max(min(deadlines) - time.monotonic(), 0)
+            multiprocessing.connection.wait(
+                [w.conn for w in busy] + [w.process.sentinel for w in busy],
+                timeout,
+            )
+
+            for worker in busy:
+                position, (featurizer_type, entry, which) = worker.task
+                try:
+                    result = worker.receive()
+                except EOFError:
+                    result = None
+                if result is not None:
+                    results[position] = result
+                    continue
+                if worker.process.is_alive():
+                    if (
+                        not self.sample_timeout
+                        or worker.started is None
+                        or time.monotonic() - worker.started < kill_after
+                    ):
+                        continue
+                    error = FeaturizationTimeoutError(
+                        "Featurization exceeded the sample timeout of {} s, and "
+                        "its worker was killed.".format(self.sample_timeout)
+                    )
+                else:
+                    error = AutomatminerError(
+                        "A featurization worker died (e.g., killed by the "
+                        "operating system on running out of memory)."
+                    )
+
+                i = worker.featurizer
+                elapsed = time.monotonic() - (worker.started or time.monotonic())
+                worker.close(terminate=True)
+                self._workers[self._workers.index(worker)] = self._start_worker()
+                if i is None or task_func is not _featurize_task:
+                    raise error
+                f = self.featurizers[featurizer_type][i]
+                if not self.ignore_errors:
+                    raise error
+                logger.debug(
+                    "{} failed on {}: {}".format(f.__class__.__name__, entry, error)
+                )
+                row = LimitExceededRow([float("nan")] * len(f.feature_labels()))
+                failures[position].append((i, row, (i, elapsed, 1, len(row))))
+                which = [j for j in which if j != i]
+                if which:
+                    queue.appendleft((position, (featurizer_type, entry, which)))
+                else:
+                    n_featurizers = len(self.featurizers[featurizer_type])
+                    results[position] = ([None] * n_featurizers, [])
+
+        for position, failed in enumerate(failures):
+            rows, measurements = results[position]
+            for i, row, measurement in failed:
+                rows[i] = row
+                measurements.append(measurement)
+        return results
+
+    def _start_worker(self):
+        return _Worker(
+            (
+                self.featurizers,
+                self.ignore_errors,
+                self.analysis_caches,
+                self.sample_timeout,
+                self.max_memory_mb,
+            )
+        )
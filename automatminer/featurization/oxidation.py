@@ -0,0 +1,294 @@
+"""
+A memo of oxidation state guesses shared by all AutoFeaturizers in a process.
+
+Guessing oxidation states (CompositionToOxidComposition and
+StructureToOxidStructure) is often the slowest step of featurizing with the
+express preset, and is repeated on every fit and transform. The guesses only
+depend on the (reduced) formula, so each formula needs to be guessed once.
+"""
+
+import os
+import pickle
+import logging
+import tempfile
+from collections import OrderedDict
+
+from pymatgen import Composition, Element, Structure
+from matminer.featurizers.conversions import (
+    CompositionToOxidComposition,
+    StructureToOxidStructure,
+)
+
+__author__ = ["Alex Dunn <ardunn@lbl.gov>"]
+
+logger = logging.getLogger(__name__)
+
+# The maximum number of formulas held by the process-wide memo
+AMM_OXI_MEMO_SIZE = 100000
+
+# The file name of the memo when saved in a sample cache directory
+AMM_OXI_MEMO_FILE = "oxidation_states.pkl"
+
+_MEMO = None
+
+# Returned by OxidationStateMemo.get for formulas not in the memo
+_NOT_FOUND = object()
+
+
+class OxidationStateMemo:
+    """
+    A size-bounded, least-recently-used memo of oxidation state guesses.
+
+    Args:
+        maxsize (int): The maximum number of guesses held. The least recently
+            used guesses are discarded first.
+
+    Attributes:
+        hits (int): The number of guesses found in the memo.
+        misses (int): The number of guesses not found in the memo.
+        modified (bool): True if guesses were added since the memo was last
+            loaded or dumped.
+        loaded_paths (set): The files the memo was loaded from.
+    """
+
+    def __init__(self, maxsize=AMM_OXI_MEMO_SIZE):
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self.modified = False
+        self.loaded_paths = set()
+        self._guesses = OrderedDict()
+
+    def __len__(self):
+        return len(self._guesses)
+
+    def __contains__(self, key):
+        return key in self._guesses
+
+    def get(self, key, default=None):
+        """
+        Get a guess, marking it as recently used.
+
+        Args:
+            key (tuple): The key of the guess.
+            default (object): Returned if the key is not in the memo.
+
+        Returns:
+            (object): The guess.
+        """
+        if key in self._guesses:
+            self.hits += 1
+            self._guesses.move_to_end(key)
+            return self._guesses[key]
+        self.misses += 1
+        return default
+
+    def put(self, key, guess) -> None:
+        """
+        Add a guess, discarding the least recently used guesses if full.
+
+        Args:
+            key (tuple): The key of the guess.
+            guess (object): The guess.
+
+        Returns:
+            None
+        """
+        self._guesses[key] = guess
+        self._guesses.move_to_end(key)
+        while len(self._guesses) > self.maxsize:
+            self._guesses.popitem(last=False)
+        self.modified = True
+
+    def dump(self, path) -> None:
+        """
+        Save the memo to a file, merged with guesses already in the file.
+
+        Args:
+            path (str): The path of the file.
+
+        Returns:
+            None
+        """
+        self.load(path)
+        path = os.path.abspath(path)
+        fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path))
+        try:
+            with os.fdopen(fd, "wb") as f:
+                pickle.dump(list(self._guesses.items()), f)
+            os.replace(tmp_path, path)
+        except BaseException:
+            os.remove(tmp_path)
+            raise
+        self.modified = False
+
+    def load(self, path) -> None:
+        """
+        Add the guesses saved in a file, if it exists, without overwriting
+        guesses already in the memo.
+
+        Args:
+            path (str): The path of the file.
+
+        Returns:
+            None
+        """
+        if os.path.exists(path):
+            with open(path, "rb") as f:
+                guesses = pickle.load(f)
+            modified = self.modified
+            for key, guess in guesses:
+                if key not in self._guesses:
+                    self.put(key, guess)
+            self.modified = modified
+        self.loaded_paths.add(path)
+
+
+def get_oxidation_state_memo() -> OxidationStateMemo:
+    """
+    Get the oxidation state memo shared by everything in this process.
+
+    Returns:
+        (OxidationStateMemo): The memo.
+    """
+    global _MEMO
+    if _MEMO is None:
+        _MEMO = OxidationStateMemo()
+    return _MEMO
+
+
+def guess_oxidation_states(entries, max_sites, n_jobs=None, memo=None) -> list:
+    """
+    Decorate compositions or structures with guessed oxidation states, like
+    CompositionToOxidComposition and StructureToOxidStructure (with
+    return_original_on_error=True), guessing each formula only once.
+
+    Compositions are keyed on their reduced formula, as their guesses are
+    made on the reduced formula. Structures are keyed on their formula, and
+    the guessed oxidation state of each element is applied to their sites.
+    Entries which already have oxidation states are passed to the matminer
+    converters directly, and other entries (e.g., NaN) are returned as is.
+
+    Args:
+        entries ([Composition or Structure]): The compositions or structures.
+        max_sites (int): Passed to the oxidation state guessing methods.
+        n_jobs (int): The number of parallel jobs used to guess oxidation
+            states of formulas not in the memo.
+        memo (OxidationStateMemo): The memo. If None, the memo shared by this
+            process is used.
+
+    Returns:
+        ([Composition or Structure]): The decorated entries.
+    """
+    memo = get_oxidation_state_memo() if memo is None else memo
+    keys = [_oxidation_key(e, max_sites) for e in entries]
+
+    # Take the guesses of the formulas in the memo before adding new guesses,
+    # which may evict them, and guess the others once per formula
+    guesses = {}
+    missing = OrderedDict()
+    for k, e in zip(keys, entries):
+        if k is None or k in guesses or k in missing:
+            continue
+        guess = memo.get(k, _NOT_FOUND)
+        if guess is _NOT_FOUND:
+            missing[k] = e
+        else:
+            guesses[k] = guess
+    if missing:
+        logger.debug(
+            "Guessing oxidation states of {} formulas.".format(len(missing))
+        )
+        converters = (CompositionToOxidComposition, StructureToOxidStructure)
+        for converter_cls in converters:
+            to_guess = [
+                (k, e) for k, e in missing.items() if k[0] == converter_cls.__name__
+            ]
+            if not to_guess:
+                continue
+            converter = converter_cls(
+                return_original_on_error=True, max_sites=max_sites
+            )
+            converter.set_n_jobs(n_jobs)
+            rows = converter.featurize_many(
+                [e for _, e in to_guess], ignore_errors=True, pbar=False
+            )
+            for (k, e), row in zip(to_guess, rows):
+                guesses[k] = _extract_guess(e, row[0])
+                memo.put(k, guesses[k])
+
+    decorated = []
+    for k, e in zip(keys, entries):
+        if k is None:
+            decorated.append(_guess_unmemoized(e, max_sites))
+        else:
+            decorated.append(_apply_guess(e, guesses[k]))
+    return decorated
+
+
+def _oxidation_key(entry, max_sites):
+    """
+    Get the memo key of a composition or structure without oxidation states,
+    or None if the entry cannot be memoized.
+    """
+    if isinstance(entry, Composition):
+        if all(isinstance(el, Element) for el in entry):
+            return (
+                CompositionToOxidComposition.__name__,
+                entry.reduced_formula,
+                max_sites,
+            )
+    elif isinstance(entry, Structure):
+        composition = entry.composition
+        if all(isinstance(el, Element) for el in composition):
+            return (
+                StructureToOxidStructure.__name__,
+                composition.formula,
+                max_sites,
+            )
+    return None
+
+
+def _extract_guess(entry, decorated):
+    """
+    Get the memoized form of a guess; None if no guess could be made.
+    """
+    # The converters return the original entry if guessing fails
+    if isinstance(decorated, Composition):
+        composition = decorated
+    elif isinstance(decorated, Structure):
+        composition = decorated.composition
+    else:
+        return None
+    if all(isinstance(el, Element) for el in composition):
+        return None
+    elif isinstance(entry, Composition):
+        return decorated
+    return {sp.symbol: sp.oxi_state for sp in composition}
+
+
+def _apply_guess(entry, guess):
+    """
+    Decorate a composition or structure with its memoized guess.
+    """
+    if guess is None:
+        return entry
+    elif isinstance(entry, Composition):
+        return guess
+    decorated = entry.copy()
+    decorated.add_oxidation_state_by_element(guess)
+    return decorated
+
+
+def _guess_unmemoized(entry, max_sites):
+    """
+    Guess oxidation states with the matminer converters, without the memo.
+    """
+    if isinstance(entry, Composition):
+        converter = CompositionToOxidComposition
+    elif isinstance(entry, Structure):
+        converter = StructureToOxidStructure
+    else:
+        return entry
+    converter = converter(return_original_on_error=True, max_sites=max_sites)
+    return converter.featurize_wrapper((entry,), ignore_errors=True)[0]
@@ -6,23 +6,16 @@ For example, the set of all express structure featurizers could be found with::
 
     StructureFeaturizers().express
 """
-import matminer.featurizers.composition as cf
-import matminer.featurizers.structure as sf
-import matminer.featurizers.dos as dosf
-import matminer.featurizers.bandstructure as bf
+import importlib
 
-try:
-    import torch
-    import cgcnn
-except ImportError:
-    torch, cgcnn = None, None
+from automatminer.utils.pkg import LazyModule
+from .base import FeaturizerSet, memoized_set
 
-try:
-    import dscribe
-except ImportError:
-    dscribe = None
-
-from .base import FeaturizerSet
+# The featurizer modules are only imported once a featurizer set is used
+cf = LazyModule("matminer.featurizers.composition")
+sf = LazyModule("matminer.featurizers.structure")
+dosf = LazyModule("matminer.featurizers.dos")
+bf = LazyModule("matminer.featurizers.bandstructure")
 
 __authors__ = ["Alex Dunn", "Alex Ganose"]
 
@@ -42,14 +35,36 @@ class CompositionFeaturizers(FeaturizerSet):
             will be excluded from the set of featurizers returned.
     """
 
+    featurizer_names = frozenset(
+        [
+            "AtomicOrbitals",
+            "AtomicPackingEfficiency",
+            "BandCenter",
+            "CationProperty",
+            "CohesiveEnergy",
+            "ElectronAffinity",
+            "ElectronegativityDiff",
+            "ElementFraction",
+            "ElementProperty",
+            "IonProperty",
+            "Meredig",
+            "Miedema",
+            "OxidationStates",
+            "Stoichiometry",
+            "TMetalFraction",
+            "ValenceOrbital",
+            "YangSolidSolution",
+        ]
+    )
+
     def __init__(self, exclude=None):
         super(CompositionFeaturizers, self).__init__(exclude=exclude)
 
-    @property
+    @memoized_set
     def debug(self):
-        return self._get_featurizers([cf.ElementProperty.from_preset("magpie")])
+        return [cf.ElementProperty.from_preset("magpie")]
 
-    @property
+    @memoized_set
     def express(self):
         fs = [
             cf.ElementProperty.from_preset("magpie"),
@@ -59,14 +74,13 @@ class CompositionFeaturizers(FeaturizerSet):
             cf.YangSolidSolution(),
             cf.Miedema(),
         ]
-        return self._get_featurizers(fs)
+        return fs
 
-    @property
+    @memoized_set
     def heavy(self):
-        fs = [cf.AtomicPackingEfficiency()] + self.express
-        return self._get_featurizers(fs)
+        return [cf.AtomicPackingEfficiency()] + self.express
 
-    @property
+    @memoized_set
     def all(self):
         fs = [
             cf.AtomicOrbitals(),
@@ -90,7 +104,7 @@ class CompositionFeaturizers(FeaturizerSet):
             cf.AtomicPackingEfficiency(),  # slower than the rest
             cf.CohesiveEnergy(),  # requires mpid present
         ]
-        return self._get_featurizers(fs)
+        return fs
 
 
 class StructureFeaturizers(FeaturizerSet):
@@ -108,6 +122,50 @@ class StructureFeaturizers(FeaturizerSet):
             will be excluded from the set of featurizers returned.
     """
 
+    featurizer_names = frozenset(
+        [
+            "BagofBonds",
+            "BondFractions",
+            "CGCNNFeaturizer",
+            "ChemicalOrdering",
+            "CoulombMatrix",
+            "DensityFeatures",
+            "Dimensionality",
+            "ElectronicRadialDistributionFunction",
+            "EwaldEnergy",
+            "GlobalInstabilityIndex",
+            "GlobalSymmetryFeatures",
+            "JarvisCFID",
+            "MaximumPackingEfficiency",
+            "MinimumRelativeDistances",
+            "OrbitalFieldMatrix",
+            "PartialRadialDistributionFunction",
+            "RadialDistributionFunction",
+            "SineCoulombMatrix",
+            "SiteStatsFingerprint",
+            "SOAP",
+            "StructuralComplexity",
+            "StructuralHeterogeneity",
+            "XRDPowderPattern",
+        ]
+    )
+
+    # The class names of the featurizers in need_fit
+    fittable_names = frozenset(
+        ["BagofBonds", "BondFractions", "PartialRadialDistributionFunction"]
+    )
+
+    # The class names of the featurizers giving many mostly-zero features
+    sparse_names = frozenset(
+        [
+            "BagofBonds",
+            "BondFractions",
+            "PartialRadialDistributionFunction",
+            "XRDPowderPattern",
+            "SOAP",
+        ]
+    )
+
     def __init__(self, exclude=None):
         super(StructureFeaturizers, self).__init__(exclude=exclude)
         self.ssf = sf.SiteStatsFingerprint
@@ -115,13 +173,13 @@ class StructureFeaturizers(FeaturizerSet):
     def _add_external(self, fset):
         # Prevent import errors
         require_external = []
-        if torch and cgcnn:
+        if _importable("torch", "cgcnn"):
             require_external.append(sf.CGCNNFeaturizer())
-        if dscribe:
+        if _importable("dscribe"):
             require_external.append(sf.SOAP())
         return fset + require_external
 
-    @property
+    @memoized_set
     def express(self):
         fs = [
             sf.DensityFeatures(),
@@ -131,9 +189,9 @@ class StructureFeaturizers(FeaturizerSet):
             sf.GlobalInstabilityIndex(),
             sf.StructuralComplexity(),
         ]
-        return self._get_featurizers(fs)
+        return fs
 
-    @property
+    @memoized_set
     def heavy(self):
         fs = [
             self.ssf.from_preset("CrystalNNFingerprint_ops"),
@@ -147,9 +205,9 @@ class StructureFeaturizers(FeaturizerSet):
         ]
         fs += self.express
         fs = self._add_external(fs)
-        return self._get_featurizers(fs)
+        return fs
 
-    @property
+    @memoized_set
     def all(self):
         fs = [
             # Vector
@@ -174,13 +232,13 @@ class StructureFeaturizers(FeaturizerSet):
             sf.PartialRadialDistributionFunction(),  # returns ??
         ]
         fs += self.heavy
-        return self._get_featurizers(fs)
+        return fs
 
-    @property
+    @memoized_set
     def debug(self):
-        return self._get_featurizers([sf.SineCoulombMatrix(flatten=True)])
+        return [sf.SineCoulombMatrix(flatten=True)]
 
-    @property
+    @memoized_set
     def need_fit(self):
         fs = [
             sf.PartialRadialDistributionFunction(),
@@ -188,7 +246,7 @@ class StructureFeaturizers(FeaturizerSet):
             sf.BagofBonds(coulomb_matrix=sf.CoulombMatrix()),
             sf.BagofBonds(coulomb_matrix=sf.SineCoulombMatrix()),
         ]
-        return self._get_featurizers(fs)
+        return fs
 
 
 class DOSFeaturizers(FeaturizerSet):
@@ -210,15 +268,19 @@ class DOSFeaturizers(FeaturizerSet):
             will be excluded from the set of featurizers returned.
     """
 
+    featurizer_names = frozenset(
+        ["DOSFeaturizer", "DopingFermi", "DosAsymmetry", "Hybridization", "SiteDOS"]
+    )
+
     def __init__(self, exclude=None):
         super(DOSFeaturizers, self).__init__(exclude=exclude)
 
-    @property
+    @memoized_set
     def all(self):
         """List of all density of states based featurizers."""
         return self.heavy + [dosf.SiteDOS()]
 
-    @property
+    @memoized_set
     def express(self):
         fs = [
             dosf.DOSFeaturizer(),
@@ -226,15 +288,15 @@ class DOSFeaturizers(FeaturizerSet):
             dosf.Hybridization(),
             dosf.DosAsymmetry(),
         ]
-        return self._get_featurizers(fs)
+        return fs
 
-    @property
+    @memoized_set
     def heavy(self):
         return self.express
 
-    @property
+    @memoized_set
     def debug(self):
-        return self._get_featurizers([dosf.DOSFeaturizer()])
+        return [dosf.DOSFeaturizer()]
 
 
 class BSFeaturizers(FeaturizerSet):
@@ -252,26 +314,28 @@ class BSFeaturizers(FeaturizerSet):
             will be excluded from the set of featurizers returned.
     """
 
+    featurizer_names = frozenset(["BandFeaturizer", "BranchPointEnergy"])
+
     def __init__(self, exclude=None):
         super(BSFeaturizers, self).__init__(exclude=exclude)
 
-    @property
+    @memoized_set
     def express(self):
         fs = [bf.BandFeaturizer(), bf.BranchPointEnergy()]
-        return self._get_featurizers(fs)
+        return fs
 
-    @property
+    @memoized_set
     def heavy(self):
         return self.express
 
-    @property
+    @memoized_set
     def all(self):
         """List of all band structure based featurizers."""
         return self.heavy
 
-    @property
+    @memoized_set
     def debug(self):
-        return self._get_featurizers([bf.BandFeaturizer()])
+        return [bf.BandFeaturizer()]
 
 
 class AllFeaturizers(FeaturizerSet):
@@ -339,3 +403,21 @@ class AllFeaturizers(FeaturizerSet):
     def debug(self):
         fs = [f.debug for f in self._featurizer_sets.values()]
         return self._get_featurizers(fs)
+
+
+def _importable(*names):
+    """
+    Check whether optional dependencies can be imported, importing them.
+
+    Args:
+        names (str): The names of the modules.
+
+    Returns:
+        (bool): True if all modules can be imported.
+    """
+    try:
+        for name in names:
+            importlib.import_module(name)
+    except ImportError:
+        return False
+    return True
@@ -0,0 +1,143 @@
+import os
+import shutil
+import unittest
+
+from pymatgen import Lattice, Structure
+from pymatgen.analysis.local_env import CrystalNN, VoronoiNN
+from pymatgen.symmetry.analyzer import SpacegroupAnalyzer
+from matminer.featurizers import structure as structure_featurizers
+from matminer.featurizers.structure import (
+    ChemicalOrdering,
+    GlobalSymmetryFeatures,
+    SiteStatsFingerprint,
+    StructuralComplexity,
+    StructuralHeterogeneity,
+)
+
+from automatminer.featurization.analysis import NeighborCache, SymmetryCache
+
+TEST_DIR = os.path.dirname(__file__)
+NEIGHBOR_CACHE_DIR = os.path.join(TEST_DIR, "neighbor_cache_test")
+SYMMETRY_CACHE_DIR = os.path.join(TEST_DIR, "symmetry_cache_test")
+
+__author__ = ["Alex Dunn <ardunn@lbl.gov>"]
+
+
+class TestNeighborCache(unittest.TestCase):
+    def setUp(self):
+        self.s = Structure(
+            Lattice.cubic(4.2), ["Cs", "Cl"], [[0, 0, 0], [0.5, 0.5, 0.5]]
+        )
+        self.featurizers = [
+            SiteStatsFingerprint.from_preset("CrystalNNFingerprint_ops"),
+            ChemicalOrdering(),
+            StructuralHeterogeneity(),
+        ]
+
+    def test_shared_analyses(self):
+        expected = [f.featurize(self.s) for f in self.featurizers]
+        cache = NeighborCache()
+        with cache.activate(self.s):
+            rows = [f.featurize(self.s) for f in self.featurizers]
+            # Identical analyses are reused
+            nn_info = VoronoiNN(weight="area").get_all_nn_info(self.s)
+            self.assertListEqual(
+                nn_info, VoronoiNN(weight="area").get_all_nn_info(self.s)
+            )
+        self.assertListEqual(rows, expected)
+        self.assertGreater(cache.hits, 0)
+
+        # Nothing is memoized outside of the context
+        hits = cache.hits
+        CrystalNN().get_nn_info(self.s, 0)
+        self.assertEqual(cache.hits, hits)
+        # The analysis methods are only wrapped while the cache is active
+        self.assertFalse(hasattr(CrystalNN.get_nn_info, "_amm_original"))
+        self.assertNotIn("get_all_nn_info", vars(VoronoiNN))
+
+    def test_nested_parameters(self):
+        class DelegatingNN(VoronoiNN):
+            def __init__(self, nn):
+                super().__init__()
+                self.nn = nn
+
+            def get_nn_info(self, structure, n):
+                return self.nn.get_nn_info(structure, n)
+
+        # Analyses of near neighbor methods configured differently, even in
+        # nested methods, are not shared
+        nns = [DelegatingNN(VoronoiNN(weight=w)) for w in ("area", "solid_angle")]
+        expected = [nn.get_all_nn_info(self.s) for nn in nns]
+        self.assertNotEqual(expected[0], expected[1])
+        with NeighborCache().activate(self.s):
+            nn_info = [nn.get_all_nn_info(self.s) for nn in nns]
+        self.assertListEqual(nn_info, expected)
+
+    def test_store(self):
+        cache = NeighborCache(store_dir=NEIGHBOR_CACHE_DIR)
+        with cache.activate(self.s):
+            expected = CrystalNN().get_nn_info(self.s, 0)
+        self.assertGreater(cache.misses, 0)
+
+        cache2 = NeighborCache(store_dir=NEIGHBOR_CACHE_DIR)
+        with cache2.activate(self.s.copy()):
+            nn_info = CrystalNN().get_nn_info(self.s, 0)
+        self.assertEqual(cache2.misses, 0)
+        self.assertEqual(len(nn_info), len(expected))
+
+    def tearDown(self):
+        if os.path.exists(NEIGHBOR_CACHE_DIR):
+            shutil.rmtree(NEIGHBOR_CACHE_DIR)
+
+
+class TestSymmetryCache(unittest.TestCase):
+    def setUp(self):
+        self.s = Structure(
+            Lattice.cubic(4.2), ["Cs", "Cl"], [[0, 0, 0], [0.5, 0.5, 0.5]]
+        )
+        self.featurizers = [
+            GlobalSymmetryFeatures(),
+            StructuralComplexity(symprec=0.01),
+        ]
+
+    def test_shared_analyses(self):
+        expected = [f.featurize_wrapper((self.s,)) for f in self.featurizers]
+        cache = SymmetryCache()
+        for _ in range(2):
+            with cache.activate(self.s.copy()):
+                rows = [f.featurize_wrapper((self.s,)) for f in self.featurizers]
+            self.assertListEqual(rows, expected)
+
+        # One analysis is shared by all featurizers and both structures
+        self.assertEqual(len(cache), 1)
+        self.assertEqual(cache.misses, 1)
+        self.assertGreater(cache.hits, 1)
+
+        # Analyses with other tolerances are not shared
+        with cache.activate():
+            StructuralComplexity(symprec=0.1).featurize(self.s)
+        self.assertEqual(len(cache), 2)
+
+        # Nothing is memoized outside of the context
+        GlobalSymmetryFeatures().featurize(self.s)
+        self.assertEqual(cache.misses, 2)
+        self.assertIs(structure_featurizers.SpacegroupAnalyzer, SpacegroupAnalyzer)
+
+    def test_store(self):
+        cache = SymmetryCache(store_dir=SYMMETRY_CACHE_DIR)
+        with cache.activate():
+            expected = GlobalSymmetryFeatures().featurize(self.s)
+
+        cache2 = SymmetryCache(store_dir=SYMMETRY_CACHE_DIR)
+        with cache2.activate():
+            features = GlobalSymmetryFeatures().featurize(self.s)
+        self.assertEqual(cache2.misses, 0)
+        self.assertListEqual(features, expected)
+
+    def tearDown(self):
+        if os.path.exists(SYMMETRY_CACHE_DIR):
+            shutil.rmtree(SYMMETRY_CACHE_DIR)
+
+
+if __name__ == "__main__":
+    unittest.main()
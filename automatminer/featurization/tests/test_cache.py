@@ -0,0 +1,186 @@
+import os
+import shutil
+import unittest
+from unittest import mock
+
+import numpy as np
+import pandas as pd
+from pymatgen import Composition, Lattice, Structure
+from pymatgen.analysis.local_env import VoronoiNN
+from matminer.featurizers.composition import ElementProperty
+from matminer.featurizers.site import CoordinationNumber
+from matminer.featurizers.structure import DensityFeatures
+
+from automatminer.featurization import cache
+from automatminer.featurization.cache import (
+    SampleFeatureCache,
+    hash_entry,
+    hash_featurizer,
+    get_cache_format,
+    load_feature_cache,
+    store_feature_cache,
+)
+
+try:
+    import pyarrow
+except ImportError:
+    pyarrow = None
+
+TEST_DIR = os.path.dirname(__file__)
+SAMPLE_CACHE_DIR = os.path.join(TEST_DIR, "sample_cache_test")
+
+__author__ = ["Alex Dunn <ardunn@lbl.gov>"]
+
+
+class TestHashing(unittest.TestCase):
+    def setUp(self):
+        self.lattice = Lattice.cubic(4.2)
+        self.s1 = Structure(self.lattice, ["Cs", "Cl"], [[0, 0, 0], [0.5, 0.5, 0.5]])
+
+    def test_hash_composition(self):
+        self.assertEqual(
+            hash_entry(Composition("Fe2O3")), hash_entry(Composition("O3Fe2"))
+        )
+        self.assertNotEqual(
+            hash_entry(Composition("Fe2O3")), hash_entry(Composition("Fe4O6"))
+        )
+        ox = Composition("Fe2O3").add_charges_from_oxi_state_guesses()
+        self.assertNotEqual(hash_entry(ox), hash_entry(Composition("Fe2O3")))
+
+    def test_hash_structure(self):
+        self.assertEqual(hash_entry(self.s1), hash_entry(self.s1.copy()))
+
+        s2 = Structure(self.lattice, ["Cs", "Cl"], [[0, 0, 0], [0.5, 0.5, 0.4]])
+        self.assertNotEqual(hash_entry(self.s1), hash_entry(s2))
+
+        # Per-site features depend on the order and properties of the sites
+        s3 = Structure(self.lattice, ["Cl", "Cs"], [[0.5, 0.5, 0.5], [0, 0, 0]])
+        self.assertNotEqual(hash_entry(self.s1), hash_entry(s3))
+        s4 = self.s1.copy(site_properties={"magmom": [1.0, 0.0]})
+        self.assertNotEqual(hash_entry(self.s1), hash_entry(s4))
+
+    def test_hash_featurizer_nested(self):
+        # Nested near neighbor methods are hashed on their parameters
+        hashes = {
+            hash_featurizer(CoordinationNumber(VoronoiNN(cutoff=cutoff)))
+            for cutoff in (5.0, 10.0, 10.0)
+        }
+        self.assertEqual(len(hashes), 2)
+
+    def test_hash_featurizer(self):
+        ep1 = ElementProperty.from_preset("magpie")
+        ep2 = ElementProperty.from_preset("magpie")
+        ep3 = ElementProperty.from_preset("matminer")
+        self.assertEqual(hash_featurizer(ep1), hash_featurizer(ep2))
+        self.assertNotEqual(hash_featurizer(ep1), hash_featurizer(ep3))
+
+
+class TestSampleFeatureCache(unittest.TestCase):
+    def test_lookup_update_flush(self):
+        f = DensityFeatures()
+        keys = ["a", "b"]
+        cache = SampleFeatureCache(SAMPLE_CACHE_DIR)
+        self.assertEqual(cache.lookup(f, keys), {})
+        self.assertEqual(cache.misses, 2)
+
+        cache.update(f, keys, [[1.0, 2.0, 3.0], [4.0, 5.0, 6.0]])
+        cache.flush()
+
+        # A new cache (e.g., in another process) sees the flushed features
+        cache2 = SampleFeatureCache(SAMPLE_CACHE_DIR)
+        found = cache2.lookup(f, ["b", "c"])
+        self.assertEqual(found, {"b": [4.0, 5.0, 6.0]})
+        self.assertEqual(cache2.hits, 1)
+        self.assertEqual(cache2.misses, 1)
+
+    def test_concurrent_flush(self):
+        f = DensityFeatures()
+        cache1 = SampleFeatureCache(SAMPLE_CACHE_DIR)
+        cache2 = SampleFeatureCache(SAMPLE_CACHE_DIR)
+        cache1.lookup(f, ["a"])
+        cache2.lookup(f, ["b"])
+        cache1.update(f, ["a"], [[1.0, 2.0, 3.0]])
+        cache2.update(f, ["b"], [[4.0, 5.0, 6.0]])
+        cache1.flush()
+        cache2.flush()
+        # Nothing is flushed twice
+        cache1.flush()
+
+        # Neither flush overwrites the features of the other
+        found = SampleFeatureCache(SAMPLE_CACHE_DIR).lookup(f, ["a", "b"])
+        self.assertListEqual(sorted(found), ["a", "b"])
+        shard_dir = os.path.join(SAMPLE_CACHE_DIR, hash_featurizer(f))
+        self.assertEqual(len(os.listdir(shard_dir)), 2)
+
+        # Shards are compacted once there are too many
+        with mock.patch.object(cache, "AMM_SAMPLE_CACHE_MAX_SHARDS", 1):
+            found = SampleFeatureCache(SAMPLE_CACHE_DIR).lookup(f, ["a", "b"])
+        self.assertListEqual(sorted(found), ["a", "b"])
+        self.assertEqual(len(os.listdir(shard_dir)), 1)
+        found = SampleFeatureCache(SAMPLE_CACHE_DIR).lookup(f, ["a", "b"])
+        self.assertListEqual(sorted(found), ["a", "b"])
+
+    def tearDown(self):
+        if os.path.exists(SAMPLE_CACHE_DIR):
+            shutil.rmtree(SAMPLE_CACHE_DIR)
+
+
+class TestFeatureCacheFiles(unittest.TestCase):
+    def setUp(self):
+        self.df = pd.DataFrame(
+            np.random.rand(10, 3),
+            columns=["f1", "f2", "f3"],
+            index=["mp-{}".format(i) for i in range(10)],
+        )
+        self.df["crystal_system"] = ["cubic"] * 10
+        self.paths = []
+
+    def test_get_cache_format(self):
+        self.assertEqual(get_cache_format("feats.json"), "json")
+        self.assertEqual(get_cache_format("feats.json.gz"), "json")
+        self.assertEqual(get_cache_format("feats.parquet"), "parquet")
+        self.assertEqual(get_cache_format("feats.feather"), "feather")
+        with self.assertRaises(ValueError):
+            get_cache_format("feats.csv")
+
+    def _test_roundtrip(self, ext):
+        path = os.path.join(TEST_DIR, "cache_file_test" + ext)
+        self.paths.append(path)
+        store_feature_cache(self.df, path)
+
+        df = load_feature_cache(path)
+        self.assertTupleEqual(df.shape, self.df.shape)
+        self.assertListEqual(df.index.tolist(), self.df.index.tolist())
+
+        # Only the requested rows and columns are loaded, in order of the
+        # requested index; missing index labels are skipped
+        df = load_feature_cache(
+            path, index=["mp-3", "mp-1", "mp-100"], columns=["f2", "crystal_system"]
+        )
+        self.assertListEqual(df.index.tolist(), ["mp-3", "mp-1"])
+        self.assertListEqual(df.columns.tolist(), ["f2", "crystal_system"])
+        self.assertListEqual(
+            df["f2"].tolist(), self.df.loc[["mp-3", "mp-1"], "f2"].tolist()
+        )
+
+    def test_json(self):
+        self._test_roundtrip(".json")
+
+    @unittest.skipIf(not pyarrow, "pyarrow not installed")
+    def test_parquet(self):
+        # The requested rows are in different row groups
+        with mock.patch.object(cache, "AMM_PARQUET_ROW_GROUP_SIZE", 3):
+            self._test_roundtrip(".parquet")
+
+    @unittest.skipIf(not pyarrow, "pyarrow not installed")
+    def test_feather(self):
+        self._test_roundtrip(".feather")
+
+    def tearDown(self):
+        for path in self.paths:
+            if os.path.exists(path):
+                os.remove(path)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,78 @@
+import os
+import pickle
+import shutil
+import unittest
+
+import numpy as np
+from matminer.featurizers.bandstructure import BandFeaturizer
+from matminer.featurizers.dos import DOSFeaturizer
+from matminer.utils.io import load_dataframe_from_json
+
+from automatminer.featurization.cache import hash_entry
+from automatminer.featurization.compact import (
+    CompactElectronicStructure,
+    compact_electronic_structures,
+)
+from automatminer.featurization.engine import apply_featurizers
+
+TEST_DIR = os.path.dirname(__file__)
+DATA_PATH = os.path.join(TEST_DIR, "mp_data_with_dos_bandstructure.pickle")
+STORE_DIR = os.path.join(TEST_DIR, "compact_test")
+
+__author__ = ["Alex Dunn <ardunn@lbl.gov>"]
+
+
+class TestCompactElectronicStructure(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        df = load_dataframe_from_json(DATA_PATH).dropna(axis=0)
+        cls.dos = df["dos"].iloc[0]
+        cls.bs = df["bandstructure_uniform"].iloc[0]
+
+    def test_round_trip(self):
+        for obj in (self.dos, self.bs):
+            compact = CompactElectronicStructure.from_object(obj)
+            self.assertEqual(compact.to_object().as_dict(), obj.as_dict())
+            # Dicts are compacted like their objects
+            from_dict = CompactElectronicStructure.from_object(obj.as_dict())
+            self.assertEqual(from_dict.content_hash(), compact.content_hash())
+            self.assertEqual(hash_entry(from_dict), hash_entry(compact))
+
+        compact = CompactElectronicStructure.from_object(self.dos)
+        np.testing.assert_array_equal(compact.energies, self.dos.energies)
+        self.assertEqual(compact.efermi, self.dos.efermi)
+        compact = CompactElectronicStructure.from_object(self.bs)
+        for spin, bands in self.bs.bands.items():
+            eigenvalues = compact.eigenvalues[str(int(spin))]
+            np.testing.assert_array_equal(eigenvalues, bands)
+
+    def test_featurize(self):
+        featurizers = [DOSFeaturizer()]
+        compact = CompactElectronicStructure.from_object(self.dos)
+        rows = apply_featurizers(featurizers, compact, ignore_errors=False)
+        self.assertEqual(rows, apply_featurizers(featurizers, self.dos))
+
+        featurizers = [BandFeaturizer()]
+        compact = CompactElectronicStructure.from_object(self.bs)
+        rows = apply_featurizers(featurizers, compact, ignore_errors=False)
+        self.assertEqual(rows, apply_featurizers(featurizers, self.bs))
+
+    def test_store(self):
+        entries = [self.dos, self.dos.as_dict(), float("nan")]
+        compacted = compact_electronic_structures(entries, store_dir=STORE_DIR)
+        self.assertIsInstance(compacted[0].data, np.memmap)
+        self.assertEqual(compacted[0].path, compacted[1].path)
+        self.assertTrue(np.isnan(compacted[2]))
+        # Only the path of the buffer is pickled
+        pickled = pickle.dumps(compacted[0])
+        self.assertLess(len(pickled), compacted[0].data.nbytes)
+        unpickled = pickle.loads(pickled).to_object()
+        self.assertEqual(unpickled.as_dict(), self.dos.as_dict())
+
+    def tearDown(self):
+        if os.path.exists(STORE_DIR):
+            shutil.rmtree(STORE_DIR)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -1,23 +1,34 @@
 import os
 import copy
+import shutil
 import unittest
+from unittest import mock
 
+import pandas as pd
 from pymatgen import Composition
 from matminer.data_retrieval.retrieve_MP import MPDataRetrieval
 from matminer.datasets.dataset_retrieval import load_dataset
-from matminer.featurizers.composition import ElementProperty
+from matminer.featurizers.bandstructure import BandFeaturizer
+from matminer.featurizers.composition import ElectronAffinity, ElementProperty
+from matminer.featurizers.dos import DOSFeaturizer
 from matminer.featurizers.structure import GlobalSymmetryFeatures, DensityFeatures
 from matminer.utils.io import load_dataframe_from_json, store_dataframe_as_json
 
+from automatminer.featurization.cache import SampleFeatureCache, hash_entry
 from automatminer.featurization.core import AutoFeaturizer
+from automatminer.featurization.engine import LimitExceededRow
 from automatminer.featurization.sets import (
     StructureFeaturizers,
     CompositionFeaturizers,
 )
+from automatminer.utils.pkg import AutomatminerError
 
 TEST_DIR = os.path.dirname(__file__)
 CACHE_FILE = "cache_test.json"
 CACHE_PATH = os.path.join(TEST_DIR, CACHE_FILE)
+SAMPLE_CACHE_DIR = os.path.join(TEST_DIR, "sample_cache_core_test")
+CHECKPOINT_DIR = os.path.join(TEST_DIR, "checkpoint_core_test")
+COMPACT_DIR = os.path.join(TEST_DIR, "compact_core_test")
 
 __author__ = [
     "Alex Dunn <ardunn@lbl.gov>",
@@ -52,6 +63,9 @@ class TestAutoFeaturizer(unittest.TestCase):
         df = af.fit_transform(df, target)
         self.assertAlmostEqual(df["MagpieData minimum Number"].iloc[2], 14.0)
         self.assertTrue("composition" not in df.columns)
+        # The fitted dataframes are released once transformed
+        self.assertIsNone(af.fitted_input_df)
+        self.assertIsNone(af.converted_input_df)
 
         # When compositions are Composition objects
         df = self.test_df[["composition", target]].iloc[: self.limit]
@@ -74,6 +88,10 @@ class TestAutoFeaturizer(unittest.TestCase):
         df = af.fit_transform(df, target)
         # Ensure there are some structure features created
         self.assertTrue("vpa" in df.columns)
+        self.assertEqual(
+            af.featurizer_stats["structure"]["DensityFeatures"]["n_samples"],
+            self.limit,
+        )
         # Ensure that composition features are automatically added without
         # explicit column
         self.assertTrue("MagpieData minimum Number" in df.columns)
@@ -201,6 +219,33 @@ class TestAutoFeaturizer(unittest.TestCase):
         # BranchPointEnergy:
         self.assertAlmostEqual(df["branch_point_energy"][0], 5.7677, 4)
 
+    def test_compact_electronic(self):
+        target = "color"
+        df = load_dataframe_from_json(
+            os.path.join(TEST_DIR, "mp_data_with_dos_bandstructure.pickle")
+        )
+        df = df[["dos", "bandstructure_uniform"]].dropna(axis=0)
+        df = df.rename(columns={"bandstructure_uniform": "bandstructure"})
+        df[target] = [["red"]]
+
+        featurizers = {
+            "dos": [DOSFeaturizer()],
+            "bandstructure": [BandFeaturizer()],
+        }
+        af = AutoFeaturizer(featurizers=featurizers, ignore_errors=False)
+        df_objects = af.fit_transform(copy.copy(df), target)
+        af = AutoFeaturizer(
+            featurizers=featurizers,
+            ignore_errors=False,
+            compact_electronic=COMPACT_DIR,
+        )
+        doses = df["dos"].tolist()
+        df_compact = af.fit_transform(df, target)
+        self.assertTrue(df_compact.equals(df_objects))
+        self.assertTrue(os.listdir(COMPACT_DIR))
+        # The objects are compacted into a copy of the input column
+        self.assertTrue(all(a is b for a, b in zip(df["dos"], doses)))
+
     def test_presets(self):
         target = "K_VRH"
         df = copy.copy(self.test_df.iloc[: self.limit])
@@ -292,15 +337,34 @@ class TestAutoFeaturizer(unittest.TestCase):
         self.assertTrue("structure" not in df.columns)
         self.assertTrue(custom_struc_key not in df.columns)
 
-    # todo: re-enable this test_functionalization
-    @unittest.skip("Functionalization part of autofeaturizer needs rewriting")
     def test_functionalization(self):
         target = "K_VRH"
-        flimit = 2
-        df = self.test_df[["composition", target]].iloc[:flimit]
+        flimit = 4
+        df = self.test_df[["composition", target]]
         af = AutoFeaturizer(functionalize=True, preset="express")
-        df = af.fit_transform(df, target)
-        self.assertTupleEqual(df.shape, (flimit, 1752))
+        df1 = af.fit_transform(df.iloc[:flimit], target)
+        ff = af.function_featurizer
+        n_function_features = len(ff.feature_labels())
+        self.assertGreater(n_function_features, 0)
+        self.assertEqual(df1.shape[1], len(af.features) + n_function_features + 1)
+        self.assertAlmostEqual(
+            df1["1/(MagpieData mean Number)"].iloc[0],
+            1 / df1["MagpieData mean Number"].iloc[0],
+        )
+        # The target is not functionalized
+        self.assertNotIn("1/({})".format(target), df1.columns)
+        self.assertNotIn(target, ff.columns)
+
+        # Other dataframes get the same function features
+        df2 = af.transform(df.iloc[-flimit:], target)
+        self.assertListEqual(df2.columns.tolist(), df1.columns.tolist())
+
+        # Function features are pruned on all chunks, as when not chunked
+        af = AutoFeaturizer(functionalize=True, preset="express")
+        af.fit(df.iloc[:flimit], target)
+        df3 = af.transform(df.iloc[:flimit], target, chunk_size=1)
+        self.assertListEqual(df3.columns.tolist(), df1.columns.tolist())
+        self.assertEqual(af.function_featurizer.n_pruned, ff.n_pruned)
 
     def test_StructureFeaturizers_needs_fitting(self):
         fset_nofit = StructureFeaturizers().express
@@ -324,6 +388,167 @@ class TestAutoFeaturizer(unittest.TestCase):
         self.assertAlmostEqual(
             df_feats.iloc[3, 0].tolist(), df_cache_feats.iloc[3, 0].tolist()
         )
+        # Nothing was featurized, so the stats of the first run are discarded
+        self.assertDictEqual(af.featurizer_stats, {})
+
+        # Columnar cache formats need string column names
+        with self.assertRaises(AutomatminerError):
+            AutoFeaturizer(cache_src="features.parquet", multiindex=True)
+
+    def test_input_unchanged(self):
+        target = "K_VRH"
+        df = self.test_df[["composition", "structure", target]].iloc[: self.limit]
+        df = df.copy()
+        compositions = df["composition"].tolist()
+        structures = df["structure"].tolist()
+        af = AutoFeaturizer(preset="debug")
+        af.fit(df, target)
+        af.transform(df, target)
+        df2 = df.copy()
+        af.transform(df2, target, chunk_size=2)
+
+        # Oxidation states are only guessed on copies of the input columns
+        for d in (df, df2):
+            self.assertListEqual(
+                d.columns.tolist(), ["composition", "structure", target]
+            )
+            self.assertTrue(
+                all(a is b for a, b in zip(d["composition"], compositions))
+            )
+            self.assertTrue(all(a is b for a, b in zip(d["structure"], structures)))
+
+    def test_chunked_transform(self):
+        target = "K_VRH"
+        df = self.test_df[["composition", target]].iloc[: self.limit]
+        af = AutoFeaturizer(preset="debug")
+        af.fit(copy.copy(df), target)
+        df_feats = af.transform(copy.copy(df), target)
+        df_chunked = af.transform(copy.copy(df), target, chunk_size=2)
+        self.assertTupleEqual(df_feats.shape, df_chunked.shape)
+        self.assertListEqual(df_feats.index.tolist(), df_chunked.index.tolist())
+        self.assertAlmostEqual(
+            df_feats["MagpieData mean Number"].iloc[4],
+            df_chunked["MagpieData mean Number"].iloc[4],
+        )
+
+        chunks = list(af.transform_iter(copy.copy(df), target, chunk_size=2))
+        self.assertListEqual([c.shape[0] for c in chunks], [2, 2, 1])
+        self.assertListEqual(
+            chunks[0].columns.tolist(), df_feats.columns.tolist()
+        )
+
+        with self.assertRaises(ValueError):
+            af.transform(copy.copy(df), target, chunk_size=0)
+
+    def test_caching_missing_entries(self):
+        target = "G_VRH"
+        df = self.test_df[["composition", target]].iloc[:10]
+        af = AutoFeaturizer(cache_src=CACHE_PATH, preset="debug")
+        df_feats = af.fit_transform(df, target)
+
+        # Only the 5 new entries are featurized and added to the cache
+        df_more = self.test_df[["composition", target]].iloc[5:15]
+        af2 = AutoFeaturizer(cache_src=CACHE_PATH, preset="debug")
+        df_more_feats = af2.fit_transform(df_more, target)
+        self.assertTrue(af2.fit_from_cache)
+        self.assertListEqual(df_more_feats.index.tolist(), df_more.index.tolist())
+        self.assertListEqual(
+            df_more_feats.columns.tolist(), df_feats.columns.tolist()
+        )
+        self.assertFalse(df_more_feats.isnull().any().any())
+        self.assertEqual(load_dataframe_from_json(CACHE_PATH).shape[0], 15)
+
+    def test_sample_caching(self):
+        target = "K_VRH"
+        df = self.test_df[["structure", target]].iloc[: self.limit]
+        af = AutoFeaturizer(sample_cache_dir=SAMPLE_CACHE_DIR, preset="debug")
+        df_feats = af.fit_transform(copy.copy(df), target)
+        self.assertEqual(af._sample_cache.hits, 0)
+
+        # Features of the same structures are restored from the cache, even
+        # with a different index
+        df2 = copy.copy(df).reset_index(drop=True)
+        af2 = AutoFeaturizer(sample_cache_dir=SAMPLE_CACHE_DIR, preset="debug")
+        df2_feats = af2.fit_transform(df2, target)
+        self.assertEqual(af2._sample_cache.misses, 0)
+        self.assertListEqual(
+            df_feats.columns.tolist(), df2_feats.columns.tolist()
+        )
+        self.assertListEqual(
+            df_feats.iloc[2].tolist(), df2_feats.iloc[2].tolist()
+        )
+
+    def test_limit_exceeded_rows(self):
+        f = DensityFeatures()
+        af = AutoFeaturizer(
+            featurizers={"structure": [f]}, sample_cache_dir=SAMPLE_CACHE_DIR
+        )
+        column = self.test_df["structure"].iloc[:2]
+        pool = mock.MagicMock()
+        pool.featurize.return_value = [
+            [[1.0, 2.0, 3.0], LimitExceededRow([float("nan")] * 3)]
+        ]
+        df = af._featurize_column(column, "structure", [f], pool)
+        af._sample_cache.flush()
+        self.assertTupleEqual(df.shape, (2, 3))
+
+        # Samples exceeding the limits are featurized again by later runs
+        keys = [hash_entry(s) for s in column]
+        found = SampleFeatureCache(SAMPLE_CACHE_DIR).lookup(f, keys)
+        self.assertListEqual(list(found), keys[:1])
+
+        # ...and their chunks are not checkpointed
+        af = AutoFeaturizer(
+            featurizers={"structure": [f]}, checkpoint_dir=CHECKPOINT_DIR
+        )
+        af._featurize_entries(column.tolist(), "structure", [f], pool)
+        self.assertFalse(
+            os.path.exists(CHECKPOINT_DIR) and os.listdir(CHECKPOINT_DIR)
+        )
+
+    def test_checkpointing(self):
+        target = "K_VRH"
+        df = self.test_df[["structure", target]].iloc[: self.limit]
+        af = AutoFeaturizer(
+            checkpoint_dir=CHECKPOINT_DIR, checkpoint_size=2, preset="debug"
+        )
+        df_feats = af.fit_transform(copy.copy(df), target)
+        # One checkpoint per featurizer per chunk of 2 unique entries; the 5
+        # structures are split into 3 chunks
+        n_structure = len(af.featurizers["structure"])
+        n_composition = len(af.featurizers["composition"])
+        self.assertGreater(n_structure, 0)
+        self.assertGreaterEqual(
+            len(os.listdir(CHECKPOINT_DIR)), 3 * n_structure + n_composition
+        )
+
+        # A restarted transform restores all features without featurizing
+        with mock.patch(
+            "automatminer.featurization.core.FeaturizerPool.featurize",
+            side_effect=RuntimeError("Featurized a checkpointed chunk."),
+        ):
+            df_restored = af.transform(copy.copy(df), target)
+        pd.testing.assert_frame_equal(df_feats, df_restored)
+
+    def test_dedupe_structures(self):
+        target = "K_VRH"
+        df = self.test_df[["structure", target]].iloc[:3]
+        # Repeat each structure, so half of the rows are duplicates
+        df = pd.concat([df, df.rename(index=lambda i: "dup-{}".format(i))])
+        af = AutoFeaturizer(preset="debug", n_jobs=1)
+        df_feats = af.fit_transform(copy.copy(df), target)
+        for method in ("hash", "matcher"):
+            af = AutoFeaturizer(preset="debug", n_jobs=1, dedupe_structures=method)
+            df_deduped = af.fit_transform(copy.copy(df), target)
+            self.assertListEqual(
+                df_feats.columns.tolist(), df_deduped.columns.tolist()
+            )
+            self.assertListEqual(
+                df_feats.iloc[4].tolist(), df_deduped.iloc[4].tolist()
+            )
+
+        with self.assertRaises(ValueError):
+            AutoFeaturizer(preset="debug", dedupe_structures="bad")
 
     def test_prechecking(self):
         target = "K_VRH"
@@ -344,9 +569,87 @@ class TestAutoFeaturizer(unittest.TestCase):
         # ElementProperty precheck is correct for all entries, so it should pass
         self.assertIn("ElementProperty", classes)
 
+        # The same featurizers are removed when prechecking a small sample
+        af = AutoFeaturizer(preset="express", precheck_sample_size=100)
+        af.min_precheck_frac = 0.99
+        af.fit(df, target)
+        classes = [f.__class__.__name__ for f in af.featurizers["composition"]]
+        self.assertNotIn("YangSolidSolution", classes)
+        self.assertNotIn("Miedema", classes)
+        self.assertIn("ElementProperty", classes)
+
+        # Featurizers are kept if prechecking all entries (after an
+        # inconclusive sample) fails
+        column = df["composition"].iloc[:50]
+        f = ElementProperty.from_preset("magpie")
+        af = AutoFeaturizer(preset="express", precheck_sample_size=10)
+        af.min_precheck_frac = 0.9
+        with mock.patch(
+            "automatminer.featurization.core.FeaturizerPool"
+        ) as pool_cls:
+            pool_cls.return_value.precheck.side_effect = [
+                [[True] * 9 + [False]],
+                [[True] * 49 + [ValueError("Not prechecked")]],
+            ]
+            invalid = af._precheck(column, "composition", [f])
+        self.assertEqual(pool_cls.return_value.precheck.call_count, 2)
+        self.assertListEqual(invalid, [])
+
+    def test_featurization_budget(self):
+        target = "K_VRH"
+        df = self.test_df[["composition", target]].iloc[:50]
+        n_featurizers = len(CompositionFeaturizers().debug)
+
+        af = AutoFeaturizer(preset="debug", max_featurization_mins=1e4)
+        af.fit(copy.copy(df), target)
+        self.assertEqual(len(af.featurizers["composition"]), n_featurizers)
+        self.assertEqual(
+            len(af.featurizer_time_estimates["composition"]), n_featurizers
+        )
+
+        # No featurizer can be applied within a tiny budget
+        af = AutoFeaturizer(preset="debug", max_featurization_mins=1e-9)
+        af.fit(copy.copy(df), target)
+        self.assertListEqual(af.featurizers["composition"], [])
+        self.assertEqual(len(af.removed_featurizers), n_featurizers)
+        self.assertListEqual(af.features, [])
+
+        # Times on 20 of the 50 rows (after a warm-up, which is not counted)
+        # are scaled by 2.5, and only divided by n_jobs for featurizers run by
+        # worker processes
+        featurizers = {
+            "composition": [
+                ElementProperty.from_preset("magpie"),
+                ElectronAffinity(),
+            ]
+        }
+        af = AutoFeaturizer(featurizers=featurizers, n_jobs=4)
+        af.removed_featurizers = []
+        with mock.patch(
+            "automatminer.featurization.core.FeaturizerPool"
+        ) as pool_cls:
+            totals = [[0.0, 0, 0, 0], [0.0, 0, 0, 0]]
+            pool_cls.return_value.measurements = {"composition": totals}
+
+            def featurize(featurizer_type, entries):
+                for t in totals:
+                    t[0] += 100.0 if len(entries) == 1 else 8.0
+
+            pool_cls.return_value.featurize.side_effect = featurize
+            af._remove_costly_featurizers(df)
+        estimates = af.featurizer_time_estimates["composition"]
+        self.assertAlmostEqual(estimates["ElementProperty"], 20.0)
+        self.assertAlmostEqual(estimates["ElectronAffinity"], 5.0)
+
     def tearDown(self):
         if os.path.exists(CACHE_PATH):
             os.remove(CACHE_PATH)
+        if os.path.exists(SAMPLE_CACHE_DIR):
+            shutil.rmtree(SAMPLE_CACHE_DIR)
+        if os.path.exists(CHECKPOINT_DIR):
+            shutil.rmtree(CHECKPOINT_DIR)
+        if os.path.exists(COMPACT_DIR):
+            shutil.rmtree(COMPACT_DIR)
 
 
 if __name__ == "__main__":
@@ -0,0 +1,271 @@
+import time
+import signal
+import unittest
+
+import numpy as np
+import pandas as pd
+from pymatgen import Composition, Lattice, Structure
+from matminer.featurizers.structure import (
+    BagofBonds,
+    BondFractions,
+    DensityFeatures,
+    GlobalSymmetryFeatures,
+    PartialRadialDistributionFunction,
+)
+
+from automatminer.featurization.engine import (
+    FeaturizationTimeoutError,
+    FeaturizerPool,
+    LimitExceededRow,
+    apply_featurizers,
+    broadcast_rows,
+    features_to_frame,
+    fit_representatives,
+    match_structures,
+    unique_entries,
+)
+
+__author__ = ["Alex Dunn <ardunn@lbl.gov>"]
+
+
+class HangingFeaturizer(DensityFeatures):
+    """
+    DensityFeatures, hanging on structures with a large lattice constant.
+    """
+
+    def featurize(self, s):
+        if s.lattice.a > 4.25:
+            time.sleep(600)
+        return super(HangingFeaturizer, self).featurize(s)
+
+
+class BlockingFeaturizer(DensityFeatures):
+    """
+    DensityFeatures, hanging on structures with a large lattice constant
+    without handling signals, like a featurizer hung in compiled code.
+    """
+
+    def featurize(self, s):
+        if s.lattice.a > 4.25:
+            signal.pthread_sigmask(signal.SIG_BLOCK, [signal.SIGALRM])
+            time.sleep(600)
+        return super(BlockingFeaturizer, self).featurize(s)
+
+
+class TestFeaturizerPool(unittest.TestCase):
+    def setUp(self):
+        self.structures = [
+            Structure(Lattice.cubic(a), ["Cs", "Cl"], [[0, 0, 0], [0.5, 0.5, 0.5]])
+            for a in (3.9, 4.0, 4.1, 4.2, 4.3)
+        ]
+        self.featurizers = {
+            "structure": [DensityFeatures(), GlobalSymmetryFeatures()]
+        }
+
+    def _check_rows(self, rows):
+        self.assertEqual(len(rows), 2)
+        for f, f_rows in zip(self.featurizers["structure"], rows):
+            expected = f.featurize_many(self.structures, pbar=False)
+            self.assertEqual(len(f_rows), len(self.structures))
+            for row, expected_row in zip(f_rows, expected):
+                self.assertListEqual(list(row), list(expected_row))
+
+    def test_serial(self):
+        with FeaturizerPool(self.featurizers, n_jobs=1) as pool:
+            self._check_rows(pool.featurize("structure", self.structures))
+
+    def test_parallel(self):
+        with FeaturizerPool(self.featurizers, n_jobs=2) as pool:
+            self._check_rows(pool.featurize("structure", self.structures))
+            # The same pool is reused for a second batch
+            self._check_rows(pool.featurize("structure", self.structures))
+
+    def test_stats(self):
+        with FeaturizerPool(self.featurizers, n_jobs=2) as pool:
+            pool.featurize("structure", self.structures + ["not a structure"])
+            stats = pool.get_stats()["structure"]
+        self.assertListEqual(
+            sorted(stats.keys()), ["DensityFeatures", "GlobalSymmetryFeatures"]
+        )
+        density_stats = stats["DensityFeatures"]
+        self.assertEqual(density_stats["n_samples"], 6)
+        self.assertEqual(density_stats["n_errors"], 1)
+        self.assertAlmostEqual(density_stats["nan_fraction"], 1 / 6)
+        self.assertGreater(density_stats["cpu_time_s"], 0)
+
+    def test_precheck(self):
+        with FeaturizerPool(self.featurizers, n_jobs=2) as pool:
+            results = pool.precheck("structure", self.structures)
+        self.assertEqual(len(results), 2)
+        for f, passed in zip(self.featurizers["structure"], results):
+            expected = [f.precheck(s) for s in self.structures]
+            self.assertListEqual(passed, expected)
+
+    def test_which(self):
+        with FeaturizerPool(self.featurizers, n_jobs=2) as pool:
+            rows = pool.featurize(
+                "structure", self.structures[:2], which=[[0], [0, 1]]
+            )
+        self.assertIsNotNone(rows[0][0])
+        self.assertIsNone(rows[1][0])
+        self.assertIsNotNone(rows[1][1])
+
+    def test_sample_timeout(self):
+        featurizers = {"structure": [HangingFeaturizer()]}
+        start = time.time()
+        with FeaturizerPool(
+            featurizers, n_jobs=2, sample_timeout=1, max_tasks_per_worker=2
+        ) as pool:
+            rows = pool.featurize("structure", self.structures)[0]
+            stats = pool.get_stats()["structure"]["HangingFeaturizer"]
+        self.assertLess(time.time() - start, 60)
+        self.assertTrue(all(np.isnan(rows[-1])))
+        self.assertFalse(any(np.isnan(rows[0])))
+        # Failures due to the timeout are marked, so they are not cached
+        self.assertIsInstance(rows[-1], LimitExceededRow)
+        self.assertNotIsInstance(rows[0], LimitExceededRow)
+        self.assertEqual(stats["n_errors"], 1)
+
+        for n_jobs in (1, 2):
+            with FeaturizerPool(
+                featurizers, n_jobs=n_jobs, ignore_errors=False, sample_timeout=1
+            ) as pool:
+                with self.assertRaises(FeaturizationTimeoutError):
+                    pool.featurize("structure", self.structures)
+
+    @unittest.skipIf(
+        not hasattr(signal, "pthread_sigmask"), "pthread_sigmask is not available"
+    )
+    def test_sample_timeout_kill(self):
+        featurizers = {"structure": [BlockingFeaturizer(), DensityFeatures()]}
+        start = time.time()
+        for n_jobs in (1, 2):
+            with FeaturizerPool(
+                featurizers, n_jobs=n_jobs, sample_timeout=1
+            ) as pool:
+                rows = pool.featurize("structure", self.structures)
+                # The pool keeps working with the replaced worker
+                again = pool.featurize("structure", self.structures[:2])
+            self.assertIsInstance(rows[0][-1], LimitExceededRow)
+            self.assertTrue(all(np.isnan(rows[0][-1])))
+            self.assertNotIsInstance(rows[0][0], LimitExceededRow)
+            # The other featurizers are still applied to the entry
+            self.assertFalse(any(np.isnan(rows[1][-1])))
+            self.assertListEqual(list(again[0][1]), list(rows[0][1]))
+
+            with FeaturizerPool(
+                featurizers, n_jobs=n_jobs, ignore_errors=False, sample_timeout=1
+            ) as pool:
+                with self.assertRaises(FeaturizationTimeoutError):
+                    pool.featurize("structure", self.structures)
+        self.assertLess(time.time() - start, 60)
+
+    def test_apply_featurizers_errors(self):
+        featurizers = self.featurizers["structure"]
+        rows = apply_featurizers(featurizers, "not a structure", ignore_errors=True)
+        self.assertTrue(all(np.isnan(rows[0])))
+        with self.assertRaises(Exception):
+            apply_featurizers(featurizers, "not a structure", ignore_errors=False)
+
+
+class TestDeduplication(unittest.TestCase):
+    def test_unique_entries(self):
+        entries = [Composition(c) for c in ("Fe2O3", "NaCl", "O3Fe2", "NaCl")]
+        unique, inverse = unique_entries(entries)
+        self.assertEqual(len(unique), 2)
+        self.assertListEqual(inverse, [0, 1, 0, 1])
+
+        rows = broadcast_rows([[[1.0], [2.0]]], inverse)
+        self.assertListEqual(rows, [[[1.0], [2.0], [1.0], [2.0]]])
+
+    def test_match_structures(self):
+        cscl = Structure(Lattice.cubic(4.2), ["Cs", "Cl"], [[0, 0, 0], [0.5] * 3])
+        # A supercell is equivalent, but not identical
+        supercell = cscl.copy()
+        supercell.make_supercell([2, 1, 1])
+        nacl = Structure(Lattice.cubic(4.2), ["Na", "Cl"], [[0, 0, 0], [0.5] * 3])
+        # A strained copy has different (e.g., density) features
+        strained = Structure(
+            Lattice.cubic(4.5), ["Cs", "Cl"], [[0, 0, 0], [0.5] * 3]
+        )
+        entries = [cscl, supercell, nacl, cscl.copy(), float("nan"), strained]
+
+        unique, inverse = unique_entries(entries)
+        self.assertEqual(len(unique), 5)
+        unique, inverse = match_structures(entries)
+        self.assertEqual(len(unique), 4)
+        self.assertListEqual(inverse, [0, 0, 1, 0, 2, 3])
+
+    def test_fit_representatives(self):
+        cscl = Structure(Lattice.cubic(4.2), ["Cs", "Cl"], [[0, 0, 0], [0.5] * 3])
+        strained = Structure(
+            Lattice.cubic(4.5), ["Cs", "Cl"], [[0, 0, 0], [0.5] * 3]
+        )
+        supercell = cscl.copy()
+        supercell.make_supercell([2, 1, 1])
+        nacl = Structure(Lattice.cubic(4.2), ["Na", "Cl"], [[0, 0, 0], [0.5] * 3])
+        entries = [cscl, strained, supercell, nacl]
+
+        n_representatives = {
+            BagofBonds: 3,
+            BondFractions: 2,
+            PartialRadialDistributionFunction: 2,
+            DensityFeatures: 4,
+        }
+        for fcls, n in n_representatives.items():
+            representatives = fit_representatives(fcls(), entries)
+            self.assertEqual(len(representatives), n)
+            self.assertListEqual(
+                fcls().fit(representatives).feature_labels(),
+                fcls().fit(entries).feature_labels(),
+            )
+
+
+class TestFeaturesToFrame(unittest.TestCase):
+    def test_features_to_frame(self):
+        index = pd.Index(["mp-1", "mp-2"])
+        rows = [
+            [[1.0, 2.0], [3.0, np.nan]],
+            [[4.0], [5.0]],
+            [["cubic", True], ["hexagonal", False]],
+            [[6.0], [7.0]],
+            [[True, 0.5, 1], [False, 0.25, 2]],
+        ]
+        labels = [
+            ["a", "b"],
+            ["c"],
+            ["crystal_system", "is_centrosymmetric"],
+            ["d"],
+            ["compound possible", "e", "n"],
+        ]
+        df = features_to_frame(rows, labels, index)
+        self.assertListEqual(
+            df.columns.tolist(),
+            [label for f_labels in labels for label in f_labels],
+        )
+        self.assertListEqual(df.index.tolist(), index.tolist())
+        self.assertEqual(df["c"].tolist(), [4.0, 5.0])
+        self.assertTrue(np.isnan(df.loc["mp-2", "b"]))
+        self.assertEqual(df["is_centrosymmetric"].dtype, bool)
+        self.assertEqual(df["a"].dtype, np.float64)
+        # Bools and ints given with floats are not coerced to floats
+        self.assertEqual(df["compound possible"].dtype, bool)
+        self.assertEqual(df["e"].dtype, np.float64)
+        self.assertEqual(df["n"].dtype, np.int64)
+
+    def test_sparse_features_to_frame(self):
+        index = pd.Index(["mp-1", "mp-2"])
+        rows = [[[0.0, 2.0, 0.0], [0.0, np.nan, 0.0]], [[4.0], [5.0]]]
+        labels = [["a", "b", "c"], ["d"]]
+        df = features_to_frame(rows, labels, index, sparse=[True, False])
+        self.assertListEqual(df.columns.tolist(), ["a", "b", "c", "d"])
+        self.assertIsInstance(df["a"].dtype, pd.SparseDtype)
+        self.assertEqual(df["d"].dtype, np.float64)
+        self.assertEqual(df["b"].array.npoints, 2)
+        self.assertEqual(df["c"].array.npoints, 0)
+        self.assertEqual(df.loc["mp-1", "b"], 2.0)
+        self.assertTrue(np.isnan(df.loc["mp-2", "b"]))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,98 @@
+import os
+import unittest
+
+from pymatgen import Composition, Lattice, Structure
+from matminer.featurizers.conversions import (
+    CompositionToOxidComposition,
+    StructureToOxidStructure,
+)
+
+from automatminer.featurization.oxidation import (
+    OxidationStateMemo,
+    guess_oxidation_states,
+)
+
+TEST_DIR = os.path.dirname(__file__)
+MEMO_PATH = os.path.join(TEST_DIR, "oxidation_memo_test.pkl")
+
+__author__ = ["Alex Dunn <ardunn@lbl.gov>"]
+
+
+class TestOxidationStateMemo(unittest.TestCase):
+    def test_lru(self):
+        memo = OxidationStateMemo(maxsize=2)
+        memo.put("a", 1)
+        memo.put("b", 2)
+        self.assertEqual(memo.get("a"), 1)
+        # "b" is now the least recently used guess
+        memo.put("c", 3)
+        self.assertNotIn("b", memo)
+        self.assertIn("a", memo)
+        self.assertEqual(len(memo), 2)
+        self.assertIsNone(memo.get("b"))
+        self.assertEqual(memo.hits, 1)
+        self.assertEqual(memo.misses, 1)
+
+    def test_dump_load(self):
+        memo = OxidationStateMemo()
+        memo.put("a", 1)
+        memo.dump(MEMO_PATH)
+        self.assertFalse(memo.modified)
+
+        memo2 = OxidationStateMemo()
+        memo2.put("b", 2)
+        memo2.dump(MEMO_PATH)
+        memo3 = OxidationStateMemo()
+        memo3.load(MEMO_PATH)
+        self.assertEqual(memo3.get("a"), 1)
+        self.assertEqual(memo3.get("b"), 2)
+
+    def tearDown(self):
+        if os.path.exists(MEMO_PATH):
+            os.remove(MEMO_PATH)
+
+
+class TestGuessOxidationStates(unittest.TestCase):
+    def test_compositions(self):
+        comps = [Composition(c) for c in ("Fe2O3", "NaCl", "Fe4O6", "CuZr")]
+        memo = OxidationStateMemo()
+        decorated = guess_oxidation_states(comps, -50, n_jobs=1, memo=memo)
+
+        # Fe2O3 and Fe4O6 have the same reduced formula
+        self.assertEqual(len(memo), 3)
+        cto = CompositionToOxidComposition(
+            return_original_on_error=True, max_sites=-50
+        )
+        for c, d in zip(comps, decorated):
+            self.assertEqual(d, cto.featurize_wrapper((c,), ignore_errors=True)[0])
+
+        # Guesses are now restored from the memo, once per formula
+        guess_oxidation_states(comps, -50, n_jobs=1, memo=memo)
+        self.assertEqual(memo.hits, 3)
+
+    def test_full_memo(self):
+        comps = [Composition(c) for c in ("Fe2O3", "NaCl", "CuZr")]
+        memo = OxidationStateMemo(maxsize=1)
+        guess_oxidation_states(comps[:1], -50, n_jobs=1, memo=memo)
+        # New guesses evict Fe2O3, which was in the memo at the start
+        decorated = guess_oxidation_states(comps, -50, n_jobs=1, memo=memo)
+        self.assertTrue(hasattr(decorated[0].elements[0], "oxi_state"))
+        self.assertEqual(memo.hits, 1)
+        self.assertEqual(memo.misses, 3)
+
+    def test_structures(self):
+        s = Structure(Lattice.cubic(4.2), ["Cs", "Cl"], [[0, 0, 0], [0.5] * 3])
+        memo = OxidationStateMemo()
+        decorated = guess_oxidation_states([s, s.copy()], 30, n_jobs=1, memo=memo)
+        self.assertEqual(len(memo), 1)
+
+        sto = StructureToOxidStructure(return_original_on_error=True, max_sites=30)
+        expected = sto.featurize(s)[0]
+        for d in decorated:
+            self.assertEqual(d, expected)
+        # The input structures are not modified
+        self.assertFalse(hasattr(s[0].specie, "oxi_state"))
+
+
+if __name__ == "__main__":
+    unittest.main()
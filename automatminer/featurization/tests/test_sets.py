@@ -108,6 +108,29 @@ class TestFeaturizerSets(unittest.TestCase):
         self.b = BSFeaturizers()
         self.d = DOSFeaturizers()
 
+    def test_featurizer_names(self):
+        external = {"CGCNNFeaturizer", "SOAP"}
+        for fset in [self.c, self.s, self.b, self.d]:
+            names = {f.__class__.__name__ for f in fset.all}
+            self.assertSetEqual(names, fset.featurizer_names - (external - names))
+        fittable = {f.__class__.__name__ for f in self.s.need_fit}
+        self.assertSetEqual(fittable, StructureFeaturizers.fittable_names)
+
+    def test_memoized_sets(self):
+        express = self.c.express
+        # Each access returns new copies of the featurizers
+        express2 = CompositionFeaturizers().express
+        self.assertEqual(len(express), len(express2))
+        for f, f2 in zip(express, express2):
+            self.assertIsNot(f, f2)
+            self.assertEqual(f.feature_labels(), f2.feature_labels())
+
+        excluded = CompositionFeaturizers(exclude=["ElementProperty"]).express
+        self.assertEqual(len(excluded), len(express) - 1)
+        self.assertNotIn(
+            "ElementProperty", [f.__class__.__name__ for f in excluded]
+        )
+
     def test_sets_not_empty(self):
         for attr in self.required_attrs:
             for ftype in [self.c, self.s, self.b, self.d]:
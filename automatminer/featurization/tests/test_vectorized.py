@@ -0,0 +1,105 @@
+import unittest
+
+import numpy as np
+import pandas as pd
+from pymatgen import Composition
+from matminer.featurizers.composition import ElementProperty
+
+from automatminer.featurization.engine import FeaturizerPool
+from automatminer.featurization.vectorized import (
+    VectorizedFunctionFeaturizer,
+    featurize_vectorized,
+    is_vectorizable,
+)
+
+__author__ = ["Alex Dunn <ardunn@lbl.gov>"]
+
+
+class TestVectorizedElementProperty(unittest.TestCase):
+    def setUp(self):
+        formulas = [
+            "Fe2O3",
+            "NaCl",
+            "Si",
+            "Al0.5Cu0.25Ni0.25",
+            "LiMn1.5Ni0.5O4",
+            "Ba2YCu3O7",
+            "HfNbTaTiZrVCrMoW",
+        ]
+        self.compositions = [Composition(f) for f in formulas]
+        self.compositions.append(
+            Composition("Fe2O3").add_charges_from_oxi_state_guesses()
+        )
+
+    def _check_identical(self, featurizer, entries):
+        rows = featurize_vectorized(featurizer, entries)
+        for entry, row in zip(entries, rows):
+            expected = featurizer.featurize(entry)
+            np.testing.assert_array_equal(np.array(row), np.array(expected))
+
+    def test_presets(self):
+        ep = ElementProperty.from_preset("magpie")
+        self.assertTrue(is_vectorizable(ep))
+        self._check_identical(ep, self.compositions)
+
+        # std_dev is not vectorized
+        self.assertFalse(is_vectorizable(ElementProperty.from_preset("deml")))
+
+    def test_invalid_entries(self):
+        ep = ElementProperty.from_preset("magpie")
+        rows = featurize_vectorized(ep, [Composition("NaCl"), "not a composition"])
+        self.assertIsNotNone(rows[0])
+        self.assertIsNone(rows[1])
+
+    def test_featurizer_pool(self):
+        featurizers = {"composition": [ElementProperty.from_preset("magpie")]}
+        entries = self.compositions + [float("nan")]
+        with FeaturizerPool(featurizers, n_jobs=1, vectorize=False) as pool:
+            expected = pool.featurize("composition", entries)
+        with FeaturizerPool(featurizers, n_jobs=1) as pool:
+            rows = pool.featurize("composition", entries)
+        np.testing.assert_array_equal(np.array(rows), np.array(expected))
+
+
+class TestVectorizedFunctionFeaturizer(unittest.TestCase):
+    def setUp(self):
+        self.df = pd.DataFrame(
+            {
+                "a b": [1.0, 2.0, 4.0],
+                "onehot": [0, 1, 1],
+                "constant": [3.0, 3.0, 3.0],
+                "c": [-1.0, 0.0, 2.0],
+                "label": ["x", "y", "z"],
+            }
+        )
+
+    def test_featurize(self):
+        ff = VectorizedFunctionFeaturizer(expressions=["1/x", "sqrt(x)", "x**2"])
+        features = ff.fit_transform(self.df)
+        self.assertListEqual(ff.columns, ["a b", "onehot", "constant", "c"])
+        np.testing.assert_array_equal(features["1/(a b)"], [1.0, 0.5, 0.25])
+        np.testing.assert_array_equal(features["sqrt(a b)"], np.sqrt([1, 2, 4]))
+        # Outputs which are not finite are NaN
+        np.testing.assert_array_equal(features["1/(c)"], [-1.0, np.nan, 0.5])
+        np.testing.assert_array_equal(features["sqrt(c)"], [np.nan, 0, np.sqrt(2)])
+
+    def test_prune(self):
+        ff = VectorizedFunctionFeaturizer(expressions=["x", "x**2", "x**3"])
+        features = ff.fit_transform(self.df)
+        # The identity, outputs of constant features, and powers of one-hot
+        # features duplicate other features; x**3 of "c" does not
+        self.assertListEqual(
+            features.columns.tolist(), ["(a b)**2", "(c)**2", "(a b)**3", "(c)**3"]
+        )
+        self.assertEqual(ff.n_pruned, 8)
+
+        # Transforming evaluates the same outputs, even if they are constant
+        features = ff.transform(self.df.iloc[:1])
+        self.assertListEqual(features.columns.tolist(), ff.feature_labels())
+
+        ff = VectorizedFunctionFeaturizer(expressions=["x"], prune=False)
+        self.assertEqual(ff.fit_transform(self.df).shape, (3, 4))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,387 @@
+"""
+Vectorized versions of featurizers, which featurize many samples at once with
+NumPy operations instead of one sample at a time.
+
+Each vectorized featurizer gives exactly the same features as the matminer
+featurizer it replaces. Samples which cannot be vectorized are left for the
+matminer featurizer.
+
+VectorizedFunctionFeaturizer replaces matminer's FunctionFeaturizer, applying
+functions to whole blocks of features instead of evaluating sympy expressions
+one value at a time.
+"""
+
+import re
+import hashlib
+import logging
+from collections import OrderedDict
+
+import numpy as np
+import pandas as pd
+
+from automatminer.utils.pkg import check_fitted, set_fitted
+
+__author__ = ["Alex Dunn <ardunn@lbl.gov>"]
+
+logger = logging.getLogger(__name__)
+
+# The statistics of PropertyStats which can be vectorized. std_dev is not, as
+# it uses np.dot, which may round differently than NumPy sums.
+VECTORIZED_STATS = ("minimum", "maximum", "range", "mean", "avg_dev", "mode")
+
+# The default expressions of VectorizedFunctionFeaturizer, i.e., the default
+# expressions of FunctionFeaturizer except the identity
+AMM_FUNCTION_EXPRESSIONS = (
+    "1/x",
+    "sqrt(x)",
+    "1/sqrt(x)",
+    "x**2",
+    "x**-2",
+    "x**3",
+    "x**-3",
+    "log(x)",
+    "1/log(x)",
+    "exp(x)",
+    "exp(-x)",
+)
+
+# Elemental property values, keyed by (data source, element, property)
+_PROPERTY_TABLE = {}
+
+# The functions and constants available to function featurizer expressions
+_FUNCTION_NAMESPACE = {
+    "sqrt": np.sqrt,
+    "log": np.log,
+    "exp": np.exp,
+    "abs": np.abs,
+    "sin": np.sin,
+    "cos": np.cos,
+    "tan": np.tan,
+    "tanh": np.tanh,
+    "pi": np.pi,
+    "E": np.e,
+}
+
+
+def is_vectorizable(featurizer) -> bool:
+    """
+    Whether a featurizer can be applied with featurize_vectorized.
+
+    Args:
+        featurizer (BaseFeaturizer): The featurizer.
+
+    Returns:
+        (bool): True if the featurizer has a vectorized version.
+    """
+    from matminer.featurizers.composition import ElementProperty
+
+    if type(featurizer) is ElementProperty:
+        return all(stat in VECTORIZED_STATS for stat in featurizer.stats)
+    return False
+
+
+def featurize_vectorized(featurizer, entries) -> list:
+    """
+    Featurize many samples at once with the vectorized version of a
+    featurizer.
+
+    Args:
+        featurizer (BaseFeaturizer): A featurizer for which is_vectorizable is
+            True.
+        entries ([object]): The featurizer inputs, e.g., Compositions.
+
+    Returns:
+        ([list]): The features of each entry, or None for entries which
+            could not be vectorized and should be featurized with the
+            featurizer itself (e.g., entries raising errors).
+    """
+    if is_vectorizable(featurizer):
+        return _element_property(featurizer, entries)
+    raise ValueError("{} cannot be vectorized.".format(featurizer))
+
+
+def _element_property(featurizer, compositions):
+    """
+    Vectorized ElementProperty.featurize.
+
+    Compositions with the same number of elements are stacked into dense
+    (n_compositions x n_elements) arrays of properties and amounts, and the
+    statistics of each property are computed along the element axis. Each
+    row is reduced exactly like the 1D arrays in PropertyStats, so the
+    features are identical.
+    """
+    source = featurizer.data_source
+    attrs = featurizer.features
+    groups = {}
+    for i, comp in enumerate(compositions):
+        try:
+            items = list(comp.element_composition.items())
+            values = [
+                _get_property(source, e, attr) for e, _ in items for attr in attrs
+            ]
+        except (KeyError, AttributeError, TypeError, ValueError):
+            continue
+        if items:
+            positions, group_values, group_amounts = groups.setdefault(
+                len(items), ([], [], [])
+            )
+            positions.append(i)
+            group_values.append(values)
+            group_amounts.append([amt for _, amt in items])
+
+    features = [None] * len(compositions)
+    for n_elements, (positions, values, amounts) in groups.items():
+        # data[p, i, j]: property p of the j-th element of the i-th composition
+        data = np.array(values, dtype=np.float64)
+        data = data.reshape(len(positions), n_elements, len(attrs))
+        data = np.ascontiguousarray(data.transpose(2, 0, 1))
+        weights = np.array(amounts, dtype=np.float64)
+        table = _element_property_stats(featurizer.stats, data, weights)
+        for i, row in zip(positions, table.tolist()):
+            features[i] = row
+    return features
+
+
+def _element_property_stats(stats, data, weights):
+    """
+    Compute PropertyStats statistics of each property of each composition.
+
+    Args:
+        stats ([str]): The statistics, all in VECTORIZED_STATS.
+        data (numpy.ndarray): The (n_properties x n_compositions x n_elements)
+            elemental properties.
+        weights (numpy.ndarray): The (n_compositions x n_elements) amounts of
+            each element.
+
+    Returns:
+        (numpy.ndarray): The (n_compositions x n_properties * n_stats) stats,
+            ordered like the features of ElementProperty.
+    """
+    total_weight = weights.sum(axis=1)
+    most_frequent = np.isclose(weights, weights.max(axis=1)[:, np.newaxis])
+    columns = []
+    for values in data:
+        has_nan = np.isnan(values).any(axis=1)
+        minimum = np.where(has_nan, np.nan, values.min(axis=1))
+        maximum = np.where(has_nan, np.nan, values.max(axis=1))
+        mean = (values * weights).sum(axis=1) / total_weight
+        for stat in stats:
+            if stat == "minimum":
+                columns.append(minimum)
+            elif stat == "maximum":
+                columns.append(maximum)
+            elif stat == "range":
+                columns.append(maximum - minimum)
+            elif stat == "mean":
+                columns.append(mean)
+            elif stat == "avg_dev":
+                deviation = np.abs(values - mean[:, np.newaxis])
+                columns.append((deviation * weights).sum(axis=1) / total_weight)
+            elif stat == "mode":
+                candidates = np.where(most_frequent, values, np.inf)
+                columns.append(candidates.min(axis=1))
+    return np.column_stack(columns)
+
+
+def _get_property(source, element, attr):
+    """
+    Get an elemental property from a data source, as a float, memoized.
+    """
+    key = (source.__class__.__name__, element, attr)
+    if key not in _PROPERTY_TABLE:
+        _PROPERTY_TABLE[key] = float(source.get_elemental_property(element, attr))
+    return _PROPERTY_TABLE[key]
+
+
+class VectorizedFunctionFeaturizer:
+    """
+    Features from functions applied to existing numeric features, e.g.,
+    "1/x", replacing matminer's FunctionFeaturizer.
+
+    Each expression is evaluated with NumPy on all features at once, instead
+    of with sympy on every value of every feature. Outputs which are not
+    finite (e.g., the sqrt of negative values or 1/0) are NaN.
+
+    When fitting, outputs which are constant or identical to a feature or to
+    another output (e.g., x**2 of one-hot features) are pruned before any of
+    them is added to a dataframe. Transforming only evaluates the outputs
+    retained by fitting, so all dataframes get the same function features.
+
+    Args:
+        expressions ([str]): The expressions, as functions of a single
+            variable x, using the Python arithmetic operators and the
+            functions and constants in _FUNCTION_NAMESPACE (e.g., sqrt, log,
+            exp). Defaults to AMM_FUNCTION_EXPRESSIONS.
+        prune (bool): If True, constant and duplicate outputs are pruned.
+
+    Attributes:
+        columns ([str]): The features the expressions were evaluated on, i.e.,
+            the dense numeric (but not bool) columns of the fitted dataframe.
+        retained (OrderedDict): Keys are expressions, and values are the
+            features whose outputs were retained.
+        n_pruned (int): The number of outputs pruned.
+    """
+
+    def __init__(self, expressions=None, prune=True):
+        self.expressions = expressions or list(AMM_FUNCTION_EXPRESSIONS)
+        self.prune = prune
+        self.columns = None
+        self.retained = None
+        self.n_pruned = 0
+        self.is_fit = False
+
+    @set_fitted
+    def fit(self, df):
+        """
+        Evaluate the expressions on the numeric features of a dataframe, and
+        find the outputs which are retained.
+
+        Args:
+            df (pandas.DataFrame): The features.
+
+        Returns:
+            (VectorizedFunctionFeaturizer): self
+        """
+        self.columns = [c for c in df.columns if _is_dense_numeric(df[c])]
+        X = _float_block(df, self.columns)
+        digests = set()
+        if self.prune:
+            for j in range(X.shape[1]):
+                digests.add(_column_digest(X[:, j]))
+
+        self.retained = OrderedDict()
+        self.n_pruned = 0
+        for expression in self.expressions:
+            outputs = self._evaluate(expression, X)
+            keep = []
+            for j in range(outputs.shape[1]):
+                if self.prune:
+                    digest = _column_digest(outputs[:, j])
+                    if _is_constant(outputs[:, j]) or digest in digests:
+                        self.n_pruned += 1
+                        continue
+                    digests.add(digest)
+                keep.append(self.columns[j])
+            if keep:
+                self.retained[expression] = keep
+        n_retained = sum(len(columns) for columns in self.retained.values())
+        logger.debug(
+            "Retained {} of {} function features.".format(
+                n_retained, n_retained + self.n_pruned
+            )
+        )
+        return self
+
+    @check_fitted
+    def transform(self, df):
+        """
+        Evaluate the retained outputs on a dataframe.
+
+        Args:
+            df (pandas.DataFrame): The features, containing the columns the
+                featurizer was fit on.
+
+        Returns:
+            (pandas.DataFrame): The function features, indexed like df.
+        """
+        needed = [c for cs in self.retained.values() for c in cs]
+        needed = list(OrderedDict.fromkeys(needed))
+        positions = {c: j for j, c in enumerate(needed)}
+        X = _float_block(df, needed)
+        blocks = [np.empty((df.shape[0], 0))]
+        for expression, columns in self.retained.items():
+            X_exp = X[:, [positions[c] for c in columns]]
+            blocks.append(self._evaluate(expression, X_exp))
+        return pd.DataFrame(
+            np.hstack(blocks), index=df.index, columns=self.feature_labels()
+        )
+
+    def fit_transform(self, df):
+        """
+        Fit to a dataframe, and evaluate the retained outputs on it.
+
+        Args:
+            df (pandas.DataFrame): The features.
+
+        Returns:
+            (pandas.DataFrame): The function features, indexed like df.
+        """
+        return self.fit(df).transform(df)
+
+    @check_fitted
+    def feature_labels(self) -> list:
+        """
+        Get the labels of the retained outputs, i.e., their expressions with
+        x replaced by the feature, e.g., "1/(MagpieData mean Number)".
+
+        Returns:
+            ([str]): The labels.
+        """
+        return [
+            _substitute(expression, c)
+            for expression, columns in self.retained.items()
+            for c in columns
+        ]
+
+    def _evaluate(self, expression, X):
+        """
+        Evaluate an expression on a block of features.
+        """
+        namespace = dict(_FUNCTION_NAMESPACE, x=X)
+        with np.errstate(all="ignore"):
+            outputs = eval(expression, {"__builtins__": {}}, namespace)
+            outputs = np.broadcast_to(np.asarray(outputs, dtype=np.float64), X.shape)
+            return np.where(np.isfinite(outputs), outputs, np.nan)
+
+
+def _substitute(expression, name):
+    """
+    Replace x by a feature name in an expression, in parentheses unless x
+    already is, e.g., "1/(a b)" and "sqrt(a b)".
+    """
+
+    def replace(match):
+        if match.group(1) and match.group(2):
+            return "({})".format(name)
+        return "{}({}){}".format(match.group(1), name, match.group(2))
+
+    return re.sub(r"(\(?)\bx\b(\)?)", replace, expression)
+
+
+def _is_dense_numeric(column):
+    """
+    Whether a column holds dense, numeric (but not bool) values.
+    """
+    dtype = column.dtype
+    return (
+        pd.api.types.is_numeric_dtype(dtype)
+        and not pd.api.types.is_bool_dtype(dtype)
+        and not isinstance(dtype, pd.SparseDtype)
+    )
+
+
+def _float_block(df, columns):
+    """
+    Get columns of a dataframe as a (n_samples x n_columns) float64 array.
+    """
+    if not columns:
+        return np.empty((df.shape[0], 0))
+    return np.column_stack([np.asarray(df[c], dtype=np.float64) for c in columns])
+
+
+def _is_constant(values):
+    """
+    Whether all non-NaN values of an array are equal.
+    """
+    values = values[~np.isnan(values)]
+    return values.size == 0 or values.min() == values.max()
+
+
+def _column_digest(values):
+    """
+    Get a hash of the values of an array, equal for arrays with equal values
+    and NaNs in the same positions.
+    """
+    # Normalize the NaN payloads and the sign of zeros
+    values = np.ascontiguousarray(np.where(np.isnan(values), np.nan, values) + 0.0)
+    return hashlib.sha1(values.tobytes()).hexdigest()
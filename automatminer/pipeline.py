@@ -143,6 +143,8 @@ class MatPipe(DFTransformer):
                 Current powerups are:
                  - cache_src (str): The cache source if you want to save
                     features.
+                 - sample_cache_dir (str): The directory of a per-sample
+                    feature cache shared between pipelines.
                  - n_jobs (int): The number of parallel process to use when
                     running.
         """
@@ -394,6 +396,7 @@ class MatPipe(DFTransformer):
 
         attrs = {
             "featurizers": self.autofeaturizer.featurizers,
+            "featurizer_stats": self.autofeaturizer.featurizer_stats,
             "ml_model": str(self.learner.best_pipeline),
             "feature_reduction": reducer_data,
             "data_cleaning": cleaner_data,
@@ -20,7 +20,14 @@ from automatminer.utils.log import (
     AMM_LOG_TRANSFORM_STR,
     AMM_LOG_FIT_STR,
 )
-from automatminer.utils.ml import regression_or_classification, AMM_REG_NAME
+from automatminer.utils.ml import (
+    regression_or_classification,
+    downcast,
+    is_sparse,
+    to_matrix,
+    AMM_PRECISIONS,
+    AMM_REG_NAME,
+)
 from automatminer.base import DFTransformer
 from automatminer.preprocessing.feature_selection import (
     TreeFeatureReducer,
@@ -71,6 +78,11 @@ class DataCleaner(DFTransformer):
             Alternatively, specify a number to replace the nans, e.g. 0.
         na_method_transform (str, float, int): The same as na_method_fit, but
             for transform.
+        precision (str): If set, the precision ("float32" or "float64") of
+            the cleaned float features. Integer and one-hot encoded features
+            are also downcast to the most compact types holding their values.
+            The target is not downcast. If None, the types of the features are
+            kept as they are (bools are converted to ints).
 
     Attributes:
         max_problem_col_warning_threshold (float): The max number of
@@ -97,7 +109,13 @@ class DataCleaner(DFTransformer):
         drop_na_targets=True,
         na_method_fit="drop",
         na_method_transform="fill",
+        precision=None,
     ):
+        if precision not in (None,) + AMM_PRECISIONS:
+            raise ValueError(
+                "precision must be None or one of {}, not {}."
+                "".format(AMM_PRECISIONS, precision)
+            )
         self.max_na_frac = max_na_frac
         self.feature_na_method = feature_na_method
         self.encoder = encoder
@@ -105,6 +123,7 @@ class DataCleaner(DFTransformer):
         self.drop_na_targets = drop_na_targets
         self.na_method_fit = na_method_fit
         self.na_method_transform = na_method_transform
+        self.precision = precision
         self._reset_attrs()
         self.dropped_features = None
         self.object_cols = None
@@ -152,6 +171,8 @@ class DataCleaner(DFTransformer):
         self._reset_attrs()
         df = self.to_numerical(df, target)
         df = self.handle_na(df, target, self.na_method_fit)
+        if self.precision:
+            df = downcast(df, self.precision, ignore=[target])
         self.fitted_df = df
         self.fitted_target = target
         return self
@@ -196,6 +217,8 @@ class DataCleaner(DFTransformer):
             )
             reordered_cols = self.fitted_df.drop(columns=[target]).columns
             df = df[reordered_cols]
+        if self.precision:
+            df = downcast(df, self.precision, ignore=[target])
         return df
 
     def fit_transform(self, df, target, **fit_kwargs):
@@ -249,7 +272,9 @@ class DataCleaner(DFTransformer):
                 "with method '{}'.".format(self.max_na_frac, self.feature_na_method)
             )
             threshold = int((1 - self.max_na_frac) * len(df))
-            all_problem_cols = df.columns[df.isnull().mean() > self.max_na_frac]
+            all_problem_cols = df.columns[
+                _reduce_columns(df.isnull(), "mean") > self.max_na_frac
+            ]
             n_problem_cols = all_problem_cols.shape[0]
             n_total_cols = df.shape[1]
             problem_col_frac = n_problem_cols / n_total_cols
@@ -266,10 +291,11 @@ class DataCleaner(DFTransformer):
                 logger.error(self._log_prefix + warning)
                 self.warnings.append(warning)
             if self.feature_na_method == "drop":
-                df = df.dropna(axis=1, thresh=threshold)
+                df = _dropna_features(df, threshold)
             else:
-                df = df.dropna(axis=1, thresh=1)
-                problem_cols = df.columns[df.isnull().mean() > self.max_na_frac]
+                df = _dropna_features(df, 1)
+                na_frac = _reduce_columns(df.isnull(), "mean")
+                problem_cols = df.columns[na_frac > self.max_na_frac]
                 dfp = df[problem_cols]
                 if self.feature_na_method == "fill":
                     dfp = dfp.fillna(method="ffill")
@@ -279,7 +305,7 @@ class DataCleaner(DFTransformer):
                     dfpn = dfp[
                         [ncol for ncol in dfp.columns if ncol in self.number_cols]
                     ]
-                    dfpn = dfpn.fillna(value=dfpn.mean())
+                    dfpn = dfpn.fillna(value=_reduce_columns(dfpn, "mean"))
                     dfp[dfpn.columns] = dfpn
 
                     # Simply fill one hot encoded columns
@@ -324,7 +350,8 @@ class DataCleaner(DFTransformer):
                         for c in self.fitted_df.columns:
                             if c not in df.columns and c != target:
                                 # Interpret as one-hot problems...
-                                df[c] = np.zeros((df.shape[0]))
+                                dtype = self.fitted_df[c].dtype
+                                df[c] = np.zeros((df.shape[0]), dtype=dtype)
                     if mismatch["df2_not_in_df1"]:  # arg cols not in fitted
                         logger.warning(
                             self._log_prefix
@@ -376,7 +403,7 @@ class DataCleaner(DFTransformer):
         elif na_method == "mean":
             # Samples belonging in number columns are averaged to replace na
             dfn = df[[ncol for ncol in df.columns if ncol in self.number_cols]]
-            dfn = dfn.fillna(value=dfn.mean())
+            dfn = dfn.fillna(value=_reduce_columns(dfn, "mean"))
             df[dfn.columns] = dfn
 
             # the rest are simply filled
@@ -673,8 +700,11 @@ class FeatureReducer(DFTransformer):
                     self._pca = PCA(
                         n_components=self.n_pca_features, svd_solver="auto"
                     )
-                self._pca.fit(X.values, y.values)
-                matrix = self._pca.transform(X.values)
+                # PCA requires dense features
+                X_matrix = to_matrix(X, sparse=False)
+                self._pca.fit(X_matrix, y.values)
+                matrix = self._pca.transform(X_matrix)
+                matrix = matrix.astype(_float_dtype(X), copy=False)
                 pca_feats = ["PCA {}".format(i) for i in range(matrix.shape[1])]
                 self._pca_feats = pca_feats
                 reduced_df = pd.DataFrame(
@@ -730,7 +760,8 @@ class FeatureReducer(DFTransformer):
             X = df.drop(columns=target)
         for r, f in self.removed_features.items():
             if r == "pca":
-                matrix = self._pca.transform(X)
+                matrix = self._pca.transform(to_matrix(X, sparse=False))
+                matrix = matrix.astype(_float_dtype(X), copy=False)
                 X = pd.DataFrame(columns=self._pca_feats, data=matrix, index=X.index)
             else:
                 X = X.drop(columns=[c for c in f if c not in self._keep_features])
@@ -753,7 +784,7 @@ class FeatureReducer(DFTransformer):
             the dataframe with the highly cross-correlated features removed.
         """
         mode = regression_or_classification(df[target])
-        corr = abs(df.corr())
+        corr = _abs_correlation(df)
         if mode == AMM_REG_NAME:
             corr = corr.sort_values(by=target)
         rm_feats = []
@@ -798,3 +829,61 @@ class FeatureReducer(DFTransformer):
                 "".format(rm_feats)
             )
         return df
+
+
+def _float_dtype(df):
+    """
+    Get the smallest float type holding all features of a dataframe, so
+    features downcast to float32 (see DataCleaner's precision) are not upcast.
+    """
+    dtypes = [getattr(dtype, "subtype", dtype) for dtype in df.dtypes]
+    return np.result_type(np.float32, *set(dtypes))
+
+
+def _abs_correlation(df):
+    """
+    Get the absolute (Pearson) correlation matrix of the numeric columns of a
+    dataframe, like abs(df.corr()). For dataframes with sparse columns and no
+    missing values, it is computed from a sparse matrix of the columns (see
+    to_matrix), so the sparse columns are never densified.
+    """
+    numeric = [c for c in df.columns if pd.api.types.is_numeric_dtype(df[c])]
+    df = df[numeric]
+    if not is_sparse(df) or _reduce_columns(df.isnull(), "sum").any():
+        return abs(df.corr())
+
+    X = to_matrix(df).astype(np.float64)
+    n_samples = X.shape[0]
+    mean = np.asarray(X.mean(axis=0)).ravel()
+    cov = (X.T @ X).toarray() - n_samples * np.outer(mean, mean)
+    std = np.sqrt(np.clip(np.diag(cov), 0, None))
+    with np.errstate(divide="ignore", invalid="ignore"):
+        corr = cov / np.outer(std, std)
+    np.fill_diagonal(corr, 1.0)
+    # Constant columns have no correlation, as with DataFrame.corr
+    corr[std == 0, :] = np.nan
+    corr[:, std == 0] = np.nan
+    return pd.DataFrame(np.abs(corr), index=df.columns, columns=df.columns)
+
+
+def _reduce_columns(df, method):
+    """
+    Reduce each column of a dataframe, e.g., with "mean". Dataframes with
+    sparse columns are reduced column by column, as some pandas versions fail
+    to reduce dataframes mixing sparse and dense columns at once.
+    """
+    if not is_sparse(df):
+        return getattr(df, method)()
+    reduced = [getattr(df.iloc[:, j], method)() for j in range(df.shape[1])]
+    return pd.Series(reduced, index=df.columns)
+
+
+def _dropna_features(df, thresh):
+    """
+    Drop the features with less than thresh non-nan values, like
+    df.dropna(axis=1, thresh=thresh), also for dataframes with sparse columns.
+    """
+    if not is_sparse(df):
+        return df.dropna(axis=1, thresh=thresh)
+    counts = _reduce_columns(df.notnull(), "sum")
+    return df.iloc[:, (counts >= thresh).values]
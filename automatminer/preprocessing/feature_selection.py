@@ -18,12 +18,9 @@ from sklearn.linear_model import SGDClassifier
 from sklearn.preprocessing import LabelEncoder
 
 from automatminer.utils.pkg import AutomatminerError
+from automatminer.utils.ml import to_matrix
 from automatminer.base import DFTransformer
 
-with warnings.catch_warnings():
-    warnings.simplefilter("ignore", category=DeprecationWarning)
-    from skrebate import MultiSURFstar
-
 __authors__ = ["Alireza Faghaninia <alireza@lbl.gov>", "Alex Dunn <ardunn@lbl.gov>"]
 
 
@@ -81,7 +78,8 @@ class TreeFeatureReducer(DFTransformer):
 
         Args:
             tree_model (instantiated sklearn tree-based model):
-            X (pandas.dataframe):
+            X (pandas.dataframe): sparse features are passed to the model as a
+                sparse matrix
             y (pandas.Series or numpy.ndarray): the target column
             recursive (bool):
 
@@ -91,7 +89,7 @@ class TreeFeatureReducer(DFTransformer):
         m_curr = 0  # current number of top/important features
         m_prev = len(X.columns)
         while m_curr < m_prev:
-            tree_model.fit(X, y)
+            tree_model.fit(to_matrix(X), y)
             fimportance = sorted(
                 zip(X.columns, tree_model.feature_importances_),
                 key=lambda x: x[1],
@@ -185,6 +183,10 @@ def rebate(df, target, n_features):
         pd.DataFrame The dataframe with fewer features, and no target
 
     """
+    with warnings.catch_warnings():
+        warnings.simplefilter("ignore", category=DeprecationWarning)
+        from skrebate import MultiSURFstar
+
     X = df.drop(target, axis=1)
     y = df[target]
     rf = MultiSURFstar(n_features_to_select=n_features, n_jobs=-1)
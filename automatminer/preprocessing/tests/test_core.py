@@ -198,6 +198,67 @@ class TestPreprocess(unittest.TestCase):
         dc.fit(df, "D")
         self.assertEqual(len(dc.warnings), 1)
 
+    def test_DataCleaner_precision(self):
+        df = self.test_df
+        df["onehot"] = ["a" if i % 2 else "b" for i in range(df.shape[0])]
+        dc = DataCleaner(precision="float32")
+        cleaned = dc.fit_transform(df, self.target)
+        features = cleaned.drop(columns=[self.target])
+        self.assertEqual(cleaned[self.target].dtype, np.float64)
+        self.assertEqual(cleaned["HOMO_energy"].dtype, np.float32)
+        self.assertEqual(cleaned["onehot_a"].dtype, np.uint8)
+        self.assertTrue(all(dt.itemsize <= 4 for dt in features.dtypes))
+
+        transformed = dc.transform(self.test_df, self.target)
+        self.assertEqual(transformed["HOMO_energy"].dtype, np.float32)
+
+        # The reducer does not upcast float32 features
+        fr = FeatureReducer(reducers=("pca",), n_pca_features=10)
+        reduced = fr.fit_transform(cleaned, self.target)
+        self.assertEqual(reduced["PCA 0"].dtype, np.float32)
+
+        with self.assertRaises(ValueError):
+            DataCleaner(precision="float16")
+
+    def test_DataCleaner_sparse(self):
+        df = self.test_df
+        df["sparse"] = pd.arrays.SparseArray(
+            [1.0 if i % 10 == 0 else 0.0 for i in range(df.shape[0])],
+            fill_value=0.0,
+        )
+        df["sparse_nan"] = pd.arrays.SparseArray(
+            [np.nan] * 100 + [0.0] * (df.shape[0] - 100), fill_value=0.0
+        )
+        dc = DataCleaner()
+        cleaned = dc.fit_transform(df, self.target)
+        self.assertIsInstance(cleaned["sparse"].dtype, pd.SparseDtype)
+        self.assertNotIn("sparse_nan", cleaned.columns)
+        self.assertEqual(cleaned["sparse"].sum(), 20.0)
+
+        # The tree reducer fits on the sparse features without densifying
+        fr = FeatureReducer(reducers=("tree",))
+        reduced = fr.fit_transform(cleaned, self.target)
+        self.assertTrue(reduced.shape[1] < cleaned.shape[1])
+
+        # The corr reducer finds correlated sparse features without
+        # densifying, giving the same results as for dense features
+        cleaned["sparse_copy"] = cleaned["sparse"] * 2.0
+        fr = FeatureReducer(reducers=("corr",))
+        reduced = fr.fit_transform(cleaned, self.target)
+        self.assertEqual(
+            len({"sparse", "sparse_copy"} & set(fr.removed_features["corr"])), 1
+        )
+        self.assertTrue(
+            any(isinstance(dtype, pd.SparseDtype) for dtype in reduced.dtypes)
+        )
+        dense = cleaned.astype(
+            {c: np.float64 for c in ("sparse", "sparse_copy")}
+        )
+        fr_dense = FeatureReducer(reducers=("corr",)).fit(dense, self.target)
+        self.assertEqual(
+            len(fr.removed_features["corr"]), len(fr_dense.removed_features["corr"])
+        )
+
     def test_FeatureReducer_basic(self):
         fr = FeatureReducer(reducers=("corr", "tree"))
 
@@ -9,8 +9,6 @@ import os
 from automatminer.automl import SinglePipelineAdaptor, TPOTAdaptor
 from automatminer.featurization import AutoFeaturizer
 from automatminer.preprocessing import DataCleaner, FeatureReducer
-from sklearn.ensemble import RandomForestClassifier, RandomForestRegressor
-from xgboost import XGBClassifier, XGBRegressor
 
 
 def get_preset_config(preset: str = "express", **powerups) -> dict:
@@ -37,14 +35,47 @@ def get_preset_config(preset: str = "express", **powerups) -> dict:
             cache_src (str): A file path. If specified, Autofeaturizer will use
                 feature caching with a file stored at this location. See
                 Autofeaturizer's cache_src argument for more information.
+            sample_cache_dir (str): A directory path. If specified,
+                AutoFeaturizer will reuse per-sample features stored in this
+                directory. See AutoFeaturizer's sample_cache_dir argument for
+                more information.
+            neighbor_cache_dir (str): A directory path. If specified,
+                AutoFeaturizer will save and reuse the neighbor analyses of
+                structures in this directory. See AutoFeaturizer's
+                neighbor_cache_dir argument for more information.
+            symmetry_cache_dir (str): A directory path. If specified,
+                AutoFeaturizer will save and reuse the symmetry analyses of
+                structures in this directory. See AutoFeaturizer's
+                symmetry_cache_dir argument for more information.
+            checkpoint_dir (str): A directory path. If specified,
+                AutoFeaturizer will checkpoint featurization progress in this
+                directory, so interrupted featurizations can be resumed. See
+                AutoFeaturizer's checkpoint_dir argument for more information.
+            precision (str): If "float32", features are stored as float32 (and
+                integer and one-hot features as compact integers) from
+                featurization through learning, halving the memory of wide
+                featurized dataframes. See AutoFeaturizer's precision argument
+                for more information.
+            sparse_features (bool): If True, the many mostly-zero features of
+                featurizers such as BagofBonds are stored as sparse columns.
+                See AutoFeaturizer's sparse_features argument for more
+                information.
             n_jobs (int): The number of parallel process to use when running.
                 Particularly important for AutoFeaturixer and TPOTAdaptor.
 
     Returns:
         (dict) The desired preset config.
     """
-    caching_kwargs = {"cache_src": powerups.get("cache_src", None)}
+    caching_kwargs = {
+        "cache_src": powerups.get("cache_src", None),
+        "sample_cache_dir": powerups.get("sample_cache_dir", None),
+        "neighbor_cache_dir": powerups.get("neighbor_cache_dir", None),
+        "symmetry_cache_dir": powerups.get("symmetry_cache_dir", None),
+        "checkpoint_dir": powerups.get("checkpoint_dir", None),
+    }
     n_jobs_kwargs = {"n_jobs": powerups.get("n_jobs", os.cpu_count())}
+    precision_kwargs = {"precision": powerups.get("precision", None)}
+    sparse_kwargs = {"sparse_features": powerups.get("sparse_features", False)}
 
     if preset not in get_available_presets():
         raise ValueError("{} unknown preset.".format(preset))
@@ -58,18 +89,26 @@ def get_preset_config(preset: str = "express", **powerups) -> dict:
                 reducers=("corr", "tree"), tree_importance_percentile=0.99
             ),
             "autofeaturizer": AutoFeaturizer(
-                preset="express", **caching_kwargs, **n_jobs_kwargs
+                preset="express",
+                **caching_kwargs,
+                **n_jobs_kwargs,
+                **precision_kwargs,
+                **sparse_kwargs
             ),
-            "cleaner": DataCleaner(),
+            "cleaner": DataCleaner(**precision_kwargs),
         }
     elif preset == "heavy":
         config = {
             "learner": TPOTAdaptor(max_time_mins=2880, **n_jobs_kwargs),
             "reducer": FeatureReducer(reducers=("corr", "rebate")),
             "autofeaturizer": AutoFeaturizer(
-                preset="heavy", **caching_kwargs, **n_jobs_kwargs
+                preset="heavy",
+                **caching_kwargs,
+                **n_jobs_kwargs,
+                **precision_kwargs,
+                **sparse_kwargs
             ),
-            "cleaner": DataCleaner(),
+            "cleaner": DataCleaner(**precision_kwargs),
         }
     elif preset == "express":
         config = {
@@ -80,22 +119,33 @@ def get_preset_config(preset: str = "express", **powerups) -> dict:
                 reducers=("corr", "tree"), tree_importance_percentile=0.99
             ),
             "autofeaturizer": AutoFeaturizer(
-                preset="express", **caching_kwargs, **n_jobs_kwargs
+                preset="express",
+                **caching_kwargs,
+                **n_jobs_kwargs,
+                **precision_kwargs,
+                **sparse_kwargs
             ),
-            "cleaner": DataCleaner(),
+            "cleaner": DataCleaner(**precision_kwargs),
         }
     elif preset == "express_single":
+        from xgboost import XGBClassifier, XGBRegressor
+
         xgb_kwargs = {"n_estimators": 300, "max_depth": 3, "n_jobs": n_jobs_kwargs}
         config = {
             "learner": SinglePipelineAdaptor(
                 regressor=XGBRegressor(**xgb_kwargs),
                 classifier=XGBClassifier(**xgb_kwargs),
+                accepts_sparse=True,
             ),
             "reducer": FeatureReducer(reducers=("corr",)),
             "autofeaturizer": AutoFeaturizer(
-                preset="express", **caching_kwargs, **n_jobs_kwargs
+                preset="express",
+                **caching_kwargs,
+                **n_jobs_kwargs,
+                **precision_kwargs,
+                **sparse_kwargs
             ),
-            "cleaner": DataCleaner(),
+            "cleaner": DataCleaner(**precision_kwargs),
         }
     elif preset == "debug":
         if "n_jobs" not in powerups:
@@ -110,22 +160,33 @@ def get_preset_config(preset: str = "express", **powerups) -> dict:
             ),
             "reducer": FeatureReducer(reducers=("corr", "tree")),
             "autofeaturizer": AutoFeaturizer(
-                preset="debug", **caching_kwargs, **n_jobs_kwargs
+                preset="debug",
+                **caching_kwargs,
+                **n_jobs_kwargs,
+                **precision_kwargs,
+                **sparse_kwargs
             ),
-            "cleaner": DataCleaner(),
+            "cleaner": DataCleaner(**precision_kwargs),
         }
     elif preset == "debug_single":
+        from sklearn.ensemble import RandomForestClassifier, RandomForestRegressor
+
         rf_kwargs = {"n_estimators": 10, "n_jobs": n_jobs_kwargs["n_jobs"]}
         config = {
             "learner": SinglePipelineAdaptor(
                 classifier=RandomForestClassifier(**rf_kwargs),
                 regressor=RandomForestRegressor(**rf_kwargs),
+                accepts_sparse=True,
             ),
             "reducer": FeatureReducer(reducers=("corr",)),
             "autofeaturizer": AutoFeaturizer(
-                preset="debug", **caching_kwargs, **n_jobs_kwargs
+                preset="debug",
+                **caching_kwargs,
+                **n_jobs_kwargs,
+                **precision_kwargs,
+                **sparse_kwargs
             ),
-            "cleaner": DataCleaner(),
+            "cleaner": DataCleaner(**precision_kwargs),
         }
     return config
 
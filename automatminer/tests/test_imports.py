@@ -0,0 +1,40 @@
+"""
+Tests for deferring the imports of heavy modules until they are used.
+"""
+import sys
+import json
+import unittest
+import subprocess
+
+# Modules which should not be imported by "import automatminer"
+AMM_DEFERRED_MODULES = [
+    "tpot",
+    "xgboost",
+    "skrebate",
+    "torch",
+    "cgcnn",
+    "dscribe",
+    "matminer.featurizers.structure",
+    "matminer.featurizers.dos",
+    "matminer.featurizers.bandstructure",
+    "matminer.featurizers.function",
+]
+
+
+class TestImports(unittest.TestCase):
+    def test_deferred_imports(self):
+        code = "import sys, json, automatminer; print(json.dumps(list(sys.modules)))"
+        output = subprocess.check_output([sys.executable, "-c", code])
+        imported = set(json.loads(output.decode("utf-8").splitlines()[-1]))
+        for module in AMM_DEFERRED_MODULES:
+            self.assertNotIn(module, imported)
+
+    def test_lazy_featurizer_sets(self):
+        from automatminer.featurization.sets import StructureFeaturizers
+
+        featurizers = StructureFeaturizers().express
+        self.assertEqual(featurizers[0].__class__.__name__, "DensityFeatures")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -219,6 +219,7 @@ def make_matpipe_test(config_preset, skip=None):
                 digest = self.pipe.summarize(filename=DIGEST_PATH + ext)
                 self.assertTrue(os.path.isfile(DIGEST_PATH + ext))
                 self.assertTrue(isinstance(digest, dict))
+                self.assertIn("featurizer_stats", digest)
 
         def _run_benchmark(self, cache, pipe):
             # Test static, regular benchmark (no fittable featurizers)
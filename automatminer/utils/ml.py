@@ -4,12 +4,16 @@ Tools and utils for machine learning.
 
 import warnings
 
+import numpy as np
 import pandas as pd
 from automatminer.utils.pkg import AutomatminerError
 
 AMM_REG_NAME = "regression"
 AMM_CLF_NAME = "classification"
 
+# The float precisions features may be stored with
+AMM_PRECISIONS = ("float32", "float64")
+
 
 def is_greater_better(scoring_function) -> bool:
     """
@@ -98,3 +102,106 @@ def regression_or_classification(series) -> str:
                 return AMM_REG_NAME
             except (ValueError, TypeError):
                 return AMM_CLF_NAME
+
+
+def downcast(df, precision="float32", ignore=None) -> pd.DataFrame:
+    """
+    Downcast the numerical columns of a dataframe to compact types.
+
+    Float columns are cast to the given precision, integer columns to the
+    smallest integer type holding their values, and bool columns (e.g.,
+    one-hot encodings) to uint8. Sparse float columns stay sparse, and other
+    columns are left as they are.
+
+    Args:
+        df (pandas.DataFrame): The dataframe.
+        precision (str): The precision of float columns, either "float32" or
+            "float64".
+        ignore ([str]): Columns which are not downcast, e.g., the target.
+
+    Returns:
+        (pandas.DataFrame): The downcast dataframe.
+    """
+    if precision not in AMM_PRECISIONS:
+        raise ValueError(
+            "precision must be one of {}, not {}.".format(AMM_PRECISIONS, precision)
+        )
+    ignore = set(ignore or [])
+    casts = {}
+    for c, dtype in df.dtypes.items():
+        if c in ignore:
+            continue
+        if isinstance(dtype, pd.SparseDtype):
+            subtype = dtype.subtype
+            if pd.api.types.is_float_dtype(subtype) and subtype != precision:
+                casts[c] = pd.SparseDtype(precision, dtype.fill_value)
+        elif pd.api.types.is_bool_dtype(dtype):
+            casts[c] = np.uint8
+        elif pd.api.types.is_float_dtype(dtype):
+            if dtype != precision:
+                casts[c] = precision
+        elif pd.api.types.is_integer_dtype(dtype):
+            if pd.api.types.is_unsigned_integer_dtype(dtype):
+                compact = pd.to_numeric(df[c], downcast="unsigned").dtype
+            else:
+                compact = pd.to_numeric(df[c], downcast="integer").dtype
+            if compact != dtype:
+                casts[c] = compact
+    return df.astype(casts) if casts else df
+
+
+def is_sparse(df) -> bool:
+    """
+    Whether a dataframe has sparse columns.
+
+    Args:
+        df (pandas.DataFrame): The dataframe.
+
+    Returns:
+        (bool): True if any column of the dataframe is sparse.
+    """
+    return any(isinstance(dtype, pd.SparseDtype) for dtype in df.dtypes)
+
+
+def to_matrix(df, sparse=True):
+    """
+    Get the feature matrix of a dataframe of numerical features, to be passed
+    to an estimator.
+
+    Args:
+        df (pandas.DataFrame): The features.
+        sparse (bool): If True and the dataframe has sparse columns, the
+            matrix is a scipy CSR matrix, so the features are never densified.
+            Otherwise (e.g., for estimators requiring dense input), the matrix
+            is a dense numpy array.
+
+    Returns:
+        (numpy.ndarray or scipy.sparse.csr_matrix): The (n_samples x
+            n_features) matrix.
+    """
+    if not sparse or not is_sparse(df):
+        return df.to_numpy()
+
+    from scipy.sparse import coo_matrix
+
+    rows, cols, data = [], [], []
+    for j in range(df.shape[1]):
+        column = df.iloc[:, j]
+        dtype = column.dtype
+        if isinstance(dtype, pd.SparseDtype) and dtype.fill_value == 0:
+            nonzero = column.array.sp_index.to_int_index().indices
+            values = column.array.sp_values
+        else:
+            values = np.asarray(column, dtype=np.float64)
+            nonzero = np.flatnonzero(values)
+            values = values[nonzero]
+        rows.append(nonzero)
+        cols.append(np.full(len(nonzero), j))
+        data.append(values)
+    dtypes = [getattr(dt, "subtype", dt) for dt in df.dtypes]
+    matrix = coo_matrix(
+        (np.concatenate(data), (np.concatenate(rows), np.concatenate(cols))),
+        shape=df.shape,
+        dtype=np.result_type(np.float32, *set(dtypes)),
+    )
+    return matrix.tocsr()
@@ -3,6 +3,7 @@ Utils specific to this package.
 """
 import json
 import os
+import importlib
 from pprint import pformat
 
 import pandas as pd
@@ -176,6 +177,33 @@ def save_dict_to_file(d, filename) -> None:
         f.write(digest)
 
 
+class LazyModule:
+    """
+    A stand-in for a module, which imports the module on first attribute
+    access. Used to defer importing heavy modules until they are needed.
+
+    Example usage::
+
+        sf = LazyModule("matminer.featurizers.structure")
+        sf.DensityFeatures()  # matminer.featurizers.structure is imported here
+
+    Args:
+        name (str): The full name of the module.
+    """
+
+    def __init__(self, name):
+        self.__dict__["_name"] = name
+        self.__dict__["_module"] = None
+
+    def __getattr__(self, attr):
+        if self._module is None:
+            self.__dict__["_module"] = importlib.import_module(self._name)
+        return getattr(self._module, attr)
+
+    def __repr__(self):
+        return "<LazyModule '{}'>".format(self._name)
+
+
 def get_version():
     """
     Get the version of automatminer without worrying about circular imports in
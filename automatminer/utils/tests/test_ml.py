@@ -4,12 +4,16 @@ Tests for machine learning related utils.
 
 import unittest
 
+import numpy as np
 import pandas as pd
 from automatminer.utils.ml import (
     AMM_CLF_NAME,
     AMM_REG_NAME,
+    downcast,
     is_greater_better,
+    is_sparse,
     regression_or_classification,
+    to_matrix,
 )
 
 
@@ -43,6 +47,54 @@ class TestMLTools(unittest.TestCase):
         s = pd.Series(data=[0, 1, 0, 0, 2])
         self.assertTrue(regression_or_classification(s) == AMM_REG_NAME)
 
+    def test_downcast(self):
+        df = pd.DataFrame(
+            {
+                "float": [0.5, 1.5, np.nan],
+                "int": [1, 2, 300],
+                "onehot": [True, False, True],
+                "str": ["a", "b", "c"],
+                "target": [0.1, 0.2, 0.3],
+            }
+        )
+        df32 = downcast(df, "float32", ignore=["target"])
+        self.assertEqual(df32["float"].dtype, np.float32)
+        self.assertEqual(df32["int"].dtype, np.int16)
+        self.assertEqual(df32["onehot"].dtype, np.uint8)
+        self.assertEqual(df32["str"].dtype, df["str"].dtype)
+        self.assertEqual(df32["target"].dtype, np.float64)
+        self.assertTrue(np.isnan(df32["float"].iloc[2]))
+        self.assertListEqual(df32["int"].tolist(), [1, 2, 300])
+
+        df64 = downcast(df, "float64")
+        self.assertEqual(df64["float"].dtype, np.float64)
+        self.assertEqual(df64["int"].dtype, np.int16)
+
+        with self.assertRaises(ValueError):
+            downcast(df, "float16")
+
+    def test_sparse(self):
+        df = pd.DataFrame(
+            {
+                "sparse": pd.arrays.SparseArray([0.0, 1.5, 0.0], fill_value=0.0),
+                "dense": [0.0, 2.0, 3.0],
+            }
+        )
+        self.assertTrue(is_sparse(df))
+        self.assertFalse(is_sparse(df[["dense"]]))
+
+        df32 = downcast(df, "float32")
+        self.assertEqual(df32["sparse"].dtype, pd.SparseDtype(np.float32, 0.0))
+
+        matrix = to_matrix(df32)
+        self.assertEqual(matrix.format, "csr")
+        self.assertEqual(matrix.dtype, np.float32)
+        self.assertEqual(matrix.nnz, 3)
+        np.testing.assert_array_equal(matrix.toarray(), [[0, 0], [1.5, 2], [0, 3]])
+        dense = to_matrix(df32, sparse=False)
+        self.assertIsInstance(dense, np.ndarray)
+        np.testing.assert_array_equal(dense, matrix.toarray())
+
 
 if __name__ == "__main__":
     unittest.main()
@@ -0,0 +1,112 @@
+"""
+Benchmark the time taken to import automatminer, and optionally to load a
+saved MatPipe and predict with it, as a short-lived prediction worker would.
+
+Each measurement runs in a fresh interpreter, so modules imported by earlier
+runs are not reused.
+
+Usage:
+
+    python dev_scripts/benchmark_import_time.py
+    python dev_scripts/benchmark_import_time.py --pipe pipe.p --df df.json.gz \
+        --target K_VRH
+
+With --modules, the modules taking the longest to import (cumulatively) are
+listed, using python -X importtime.
+"""
+import sys
+import argparse
+import subprocess
+import statistics
+
+IMPORT_CODE = "import automatminer"
+
+PREDICT_CODE = """
+from automatminer import MatPipe
+from matminer.utils.io import load_dataframe_from_json
+pipe = MatPipe.load({pipe!r})
+df = load_dataframe_from_json({df!r})
+pipe.predict(df.drop(columns=[{target!r}], errors="ignore"))
+"""
+
+TIMED_CODE = """
+import time
+start = time.perf_counter()
+{code}
+print(time.perf_counter() - start)
+"""
+
+
+def time_code(code, repeats):
+    """
+    Time a snippet of code, each time in a fresh interpreter.
+
+    Args:
+        code (str): The code.
+        repeats (int): The number of runs.
+
+    Returns:
+        ([float]): The time taken (s) by each run.
+    """
+    times = []
+    for _ in range(repeats):
+        output = subprocess.check_output(
+            [sys.executable, "-c", TIMED_CODE.format(code=code)]
+        )
+        times.append(float(output.decode("utf-8").split()[-1]))
+    return times
+
+
+def slowest_imports(code, n):
+    """
+    Get the modules taking the longest to import (including their own
+    imports) when running a snippet of code.
+
+    Args:
+        code (str): The code.
+        n (int): The number of modules.
+
+    Returns:
+        ([(float, str)]): The cumulative import time (s) and name of the n
+            slowest modules.
+    """
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", code],
+        stderr=subprocess.PIPE,
+        stdout=subprocess.DEVNULL,
+        check=True,
+    )
+    imports = []
+    for line in result.stderr.decode("utf-8").splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative, name = line[len("import time:"):].split("|")
+        imports.append((int(cumulative) / 1e6, name.strip()))
+    return sorted(imports, reverse=True)[:n]
+
+
+def report(name, times):
+    print(
+        "{}: median {:.2f} s, min {:.2f} s, max {:.2f} s over {} runs".format(
+            name, statistics.median(times), min(times), max(times), len(times)
+        )
+    )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--repeats", type=int, default=5)
+    parser.add_argument("--pipe", help="A MatPipe saved with MatPipe.save.")
+    parser.add_argument("--df", help="A dataframe json file to predict on.")
+    parser.add_argument("--target", default=None, help="Dropped from --df.")
+    parser.add_argument("--modules", type=int, default=0)
+    args = parser.parse_args()
+
+    report("import automatminer", time_code(IMPORT_CODE, args.repeats))
+    if args.modules:
+        for seconds, module in slowest_imports(IMPORT_CODE, args.modules):
+            print("    {:8.3f} s  {}".format(seconds, module))
+
+    if args.pipe and args.df:
+        code = PREDICT_CODE.format(pipe=args.pipe, df=args.df, target=args.target)
+        report("MatPipe.load + predict", time_code(code, args.repeats))